@@ -0,0 +1,68 @@
+import io
+import os
+import typing as t
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+
+from influxio.io import polars_to_lineprotocol
+
+
+def sizes(name: str, default: str) -> t.List[int]:
+    """
+    Decode list of benchmark dimensions from environment variable, e.g. `INFLUXIO_BENCH_ROWS=1000,100000`.
+    """
+    return [int(value) for value in os.environ.get(name, default).split(",")]
+
+
+@pytest.fixture(scope="session", params=sizes("INFLUXIO_BENCH_ROWS", "1000,10000"), ids=lambda value: f"rows={value}")
+def rows(request) -> int:
+    return request.param
+
+
+@pytest.fixture(scope="session", params=sizes("INFLUXIO_BENCH_COLUMNS", "4,16"), ids=lambda value: f"columns={value}")
+def columns(request) -> int:
+    return request.param
+
+
+@pytest.fixture(
+    scope="session", params=sizes("INFLUXIO_BENCH_MEASUREMENTS", "1,10"), ids=lambda value: f"measurements={value}"
+)
+def measurements(request) -> int:
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def frame(rows, columns, measurements) -> pl.DataFrame:
+    """
+    Generate a data frame with `columns` float fields, one tag, and `measurements` distinct measurement names.
+    """
+    rng = np.random.default_rng(seed=42)
+    data = {
+        "measurement": rng.choice([f"measurement{index}" for index in range(measurements)], size=rows),
+        "time": pd.date_range("2024-01-01", periods=rows, freq="s").to_numpy(),
+        "sensor": rng.choice(["sensor-a", "sensor-b", "sensor-c"], size=rows),
+    }
+    for index in range(columns):
+        data[f"field{index}"] = rng.standard_normal(size=rows)
+    return pl.DataFrame(data)
+
+
+@pytest.fixture(scope="session")
+def frame_pandas(frame) -> pd.DataFrame:
+    return frame.to_pandas()
+
+
+@pytest.fixture(scope="session")
+def lineprotocol(frame) -> bytes:
+    return ("\n".join(polars_to_lineprotocol(frame)) + "\n").encode("utf-8")
+
+
+@pytest.fixture
+def lineprotocol_stream(lineprotocol) -> t.Callable[[], io.BytesIO]:
+    """
+    Factory for fresh line protocol streams, because each benchmark round consumes one.
+    """
+    return lambda: io.BytesIO(lineprotocol)
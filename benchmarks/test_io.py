@@ -0,0 +1,53 @@
+"""
+Microbenchmarks for the functions in `influxio.io`.
+
+Run them using `poe benchmark`, and compare against a stored baseline using `poe benchmark-check`.
+"""
+
+from collections import deque
+
+import pytest
+
+from influxio.io import (
+    adbc_driver,
+    dataframe_to_lineprotocol,
+    dataframe_to_sql,
+    dataframes_from_lineprotocol,
+    polars_to_lineprotocol,
+    read_lineprotocol,
+    records_from_lineprotocol,
+)
+
+
+def exhaust(iterable):
+    deque(iterable, maxlen=0)
+
+
+def test_read_lineprotocol(benchmark, lineprotocol_stream):
+    benchmark(lambda: exhaust(read_lineprotocol(lineprotocol_stream())))
+
+
+def test_records_from_lineprotocol(benchmark, lineprotocol_stream):
+    benchmark(lambda: exhaust(records_from_lineprotocol(lineprotocol_stream())))
+
+
+def test_dataframes_from_lineprotocol(benchmark, lineprotocol_stream, measurements):
+    frames = benchmark(lambda: dataframes_from_lineprotocol(lineprotocol_stream()))
+    assert len(frames) == measurements
+
+
+def test_dataframe_to_lineprotocol(benchmark, frame_pandas):
+    benchmark(lambda: exhaust(dataframe_to_lineprotocol(frame_pandas)))
+
+
+def test_polars_to_lineprotocol(benchmark, frame):
+    lines = benchmark(polars_to_lineprotocol, frame)
+    assert len(lines) == len(frame)
+
+
+@pytest.mark.parametrize("engine", ["adbc", "arrow", "threads", "dask"])
+def test_dataframe_to_sql_sqlite(benchmark, frame, tmp_path, engine):
+    dburi = f"sqlite:///{tmp_path / 'benchmark.sqlite'}"
+    if engine == "adbc" and adbc_driver(dburi) is None:
+        pytest.skip("ADBC driver for SQLite not installed")
+    benchmark(dataframe_to_sql, frame, dburi=dburi, tablename="benchmark", if_exists="replace", engine=engine)
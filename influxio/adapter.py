@@ -1,3 +1,6 @@
+import contextlib
+import contextvars
+import functools
 import io
 import json
 import logging
@@ -5,26 +8,53 @@ import sys
 import typing as t
 from pathlib import Path
 
-import influxdb_client.rest
-import pandas as pd
-import polars as pl
-import psycopg2
-import sqlalchemy
-import sqlalchemy as sa
-from fsspec import filesystem
-from influxdb_client import InfluxDBClient
-from sqlalchemy_utils import create_database
-from upath import UPath
 from yarl import URL
 
-from influxio.io import dataframe_to_lineprotocol, dataframe_to_sql, dataframes_from_lineprotocol
-from influxio.model import CommandResult, DataFormat, OutputFile
-from influxio.util.common import run_command, url_fullpath
+from influxio.io import (
+    DEFAULT_BATCH_SIZE,
+    WindowAggregator,
+    arrow_to_cratedb_type,
+    arrow_to_sqlalchemy_type,
+    cache_resource,
+    cratedb_table_ddl,
+    dataframe_batches_from_lineprotocol,
+    dataframe_to_annotated_csv,
+    dataframe_to_arrow,
+    dataframe_to_lineprotocol,
+    dataframe_to_sql,
+    is_dataframe,
+    open_lineprotocol,
+    partition_measurements,
+    polars_to_lineprotocol,
+    read_annotated_csv,
+    read_arrow_ipc,
+    read_parquet,
+    sql_engine,
+)
+from influxio.io import open as open_resource
+from influxio.model import CommandResult, DataFormat, OutputFile, Rollup, Selection
+from influxio.util.common import format_rfc3339, run_command, stream_command, url_fullpath
+from influxio.util.metrics import dataframe_size, get_metrics
+from influxio.util.pipeline import DEFAULT_QUEUE_DEPTH, pipeline, pipelined
+
+if t.TYPE_CHECKING:
+    import influxdb_client
+    import pandas as pd
+    import polars as pl
+    import pyarrow as pa
+
+    from influxio.testdata import SyntheticDataGenerator
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_TIMEOUT = 60.0
 
+# Number of tables loaded concurrently into SQL databases, see `SqlAlchemyAdapter.write_tables`.
+DEFAULT_TABLE_CONCURRENCY = 4
+
+# Suffix of shadow tables, see `SqlAlchemyAdapter.swap_table`.
+SHADOW_TABLE_SUFFIX = "__influxio_tmp"
+
 
 class InfluxDbApiAdapter:
     def __init__(
@@ -34,16 +64,25 @@ class InfluxDbApiAdapter:
         org: str,
         bucket: str,
         measurement: str,
+        progress: bool = False,
         debug: bool = False,
         timeout: float = DEFAULT_TIMEOUT,
+        selection: t.Optional[Selection] = None,
+        rollup: t.Optional[Rollup] = None,
     ):
         self.url = url
         self.token = token
         self.org = org
         self.bucket = bucket
         self.measurement = measurement
+        self.progress = progress
         self.debug = debug
         self.timeout = timeout
+        self.selection = selection or Selection()
+        self.rollup = rollup or Rollup()
+
+        from influxdb_client import InfluxDBClient
+
         self.client = InfluxDBClient(
             url=self.url, org=self.org, token=self.token, debug=self.debug, timeout=int(self.timeout * 1000.0)
         )
@@ -61,12 +100,16 @@ class InfluxDbApiAdapter:
             measurement = None
         bare_url = f"{url.scheme}://{url.host}:{url.port}"
         kwargs.setdefault("timeout", float(url.query.get("timeout", DEFAULT_TIMEOUT)))
+        kwargs.setdefault("selection", Selection.from_url(url))
+        kwargs.setdefault("rollup", Rollup.from_url(url))
         return cls(url=bare_url, token=token, org=org, bucket=bucket, measurement=measurement, **kwargs)
 
     def delete_measurement(self):
         """
         https://docs.influxdata.com/influxdb/v2/write-data/delete-data/
         """
+        from influxdb_client.rest import ApiException
+
         try:
             return self.client.delete_api().delete(
                 start="1677-09-21T00:12:43.145224194Z",
@@ -74,21 +117,48 @@ class InfluxDbApiAdapter:
                 predicate=f'_measurement="{self.measurement}"',
                 bucket=self.bucket,
             )
-        except influxdb_client.rest.ApiException as ex:
+        except ApiException as ex:
             if ex.status != 404:
                 raise
 
     def read_df(self):
-        """ """
+        """
+        Read measurement, or all measurements of bucket, pushing down the selection into the Flux query.
+        """
+        return self.query_df(self.flux_query())
+
+    def read_rollup(self) -> t.Generator[t.Tuple[str, "pd.DataFrame"], None, None]:
+        """
+        Read aggregates per window duration of the rollup, computed by InfluxDB using `aggregateWindow()`.
+        """
+        for window in self.rollup.windows:
+            for df in self.query_df(self.flux_query(window=window)):
+                yield window, df
+
+    def flux_query(self, window: t.Optional[str] = None) -> str:
+        """
+        Render Flux query reading the selected data, optionally aggregated into windows of the given duration.
+        """
         filter_expression = ""
         if self.measurement is not None:
             filter_expression = f'|> filter(fn: (r) => r._measurement == "{self.measurement}")'
-        query = f"""
-        from(bucket:"{self.bucket}")
-            |> range(start: 0, stop: now())
-            {filter_expression}
+        selection = self.selection.flux().replace("\n", "\n            ")
+        data = f"""from(bucket:"{self.bucket}")
+            {selection}
+            {filter_expression}"""
+        if window is not None:
+            rollup = self.rollup.flux("data", window).replace("\n", "\n        ")
+            return f"""
+        data = {data}
+        {rollup}
+            |> pivot(rowKey:["_time"], columnKey: ["_field"], valueColumn: "_value")
+        """
+        return f"""
+        {data}
             |> pivot(rowKey:["_time"], columnKey: ["_field"], valueColumn: "_value")
         """
+
+    def query_df(self, query: str) -> t.Generator["pd.DataFrame", None, None]:
         for df in self.client.query_api().query_data_frame_stream(query=query):
             df = df.drop(["result", "table", "_start", "_stop"], axis=1)
             df = df.rename(columns={"_time": "time", "_measurement": "measurement"})
@@ -106,9 +176,11 @@ class InfluxDbApiAdapter:
         return json.loads(result.to_json())
 
     def ensure_bucket(self):
+        from influxdb_client.rest import ApiException
+
         try:
             self.client.buckets_api().create_bucket(bucket_name=self.bucket)
-        except influxdb_client.rest.ApiException as ex:
+        except ApiException as ex:
             if ex.status == 422:
                 pass
             else:
@@ -119,6 +191,8 @@ class InfluxDbApiAdapter:
         """
         https://docs.influxdata.com/influxdb/v2/admin/buckets/delete-bucket/
         """
+        from influxdb_client.rest import ApiException
+
         try:
             bucket_id = self.get_bucket_id()
         except KeyError:
@@ -128,13 +202,13 @@ class InfluxDbApiAdapter:
                 raise
         try:
             self.client.buckets_api().delete_bucket(bucket_id)
-        except influxdb_client.rest.ApiException as ex:
+        except ApiException as ex:
             if ex.status == 404 and missing_ok:
                 pass
             else:
                 raise
 
-    def write_df(self, df: pd.DataFrame):
+    def write_df(self, df: "pd.DataFrame"):
         """
         Use batching API to import data frame into InfluxDB.
 
@@ -143,18 +217,53 @@ class InfluxDbApiAdapter:
         TODO: Add precision.
         """
         logger.info(f"Importing data frame to InfluxDB. bucket={self.bucket}, measurement={self.measurement}")
+        metrics = get_metrics()
         self.ensure_bucket()
-        with self.client.write_api() as write_api:
-            write_api.write(
-                bucket=self.bucket,
-                record=df,
-                data_frame_measurement_name=self.measurement,
-                # TODO: Add more parameters.
-                # write_precision=WritePrecision.MS,  # noqa: ERA001
-                # data_frame_tag_columns=['tag'],  # noqa: ERA001
-            )
+        write_api = self.client.write_api()
+        try:
+            with metrics.measure("write", rows=len(df), bytes=functools.partial(dataframe_size, df)):
+                write_api.write(
+                    bucket=self.bucket,
+                    record=df,
+                    data_frame_measurement_name=self.measurement,
+                    # TODO: Add more parameters.
+                    # write_precision=WritePrecision.MS,  # noqa: ERA001
+                    # data_frame_tag_columns=['tag'],  # noqa: ERA001
+                )
+        finally:
+            # Flush pending batches.
+            with metrics.measure("commit"):
+                write_api.close()
+
+    def write(self, source: "ArrowFileAdapter"):
+        """
+        Import data from a source adapter yielding Polars DataFrames into InfluxDB.
 
-    def from_lineprotocol(self, source: t.Union[Path, str], precision: str = "ns"):
+        Data frames are converted to line protocol using the vectorized encoder,
+        and submitted using the batching API.
+        """
+        logger.info(f"Importing data frames to InfluxDB. bucket={self.bucket}, measurement={self.measurement}")
+        metrics = get_metrics()
+        self.ensure_bucket()
+        write_api = self.client.write_api()
+        try:
+            for df in metrics.iterate(source.read_df(), "read", consumer="transform", rows=len, bytes=dataframe_size):
+                with metrics.measure("transform", rows=len(df), bytes=functools.partial(dataframe_size, df)):
+                    lines = polars_to_lineprotocol(
+                        df, measurement=self.measurement or source.measurement, tag_columns=source.tag_columns
+                    )
+                with metrics.measure(
+                    "write", rows=len(lines), bytes=lambda lines=lines: int(lines.str.len_bytes().sum() or 0)
+                ):
+                    write_api.write(bucket=self.bucket, record=lines.to_list())
+        finally:
+            # Flush pending batches.
+            with metrics.measure("commit"):
+                write_api.close()
+
+    def from_lineprotocol(
+        self, source: t.Union[Path, str], precision: str = "ns", selection: t.Optional[Selection] = None
+    ):
         """
         Import data from file in lineprotocol format (ILP) by invoking `influx write`.
 
@@ -171,6 +280,9 @@ class InfluxDbApiAdapter:
 
         -- https://docs.influxdata.com/influxdb/v2/reference/syntax/line-protocol/
         """
+        if selection:
+            raise NotImplementedError("Selecting data is not supported when importing line protocol into InfluxDB")
+        source = cache_resource(source)
         is_url = False
         try:
             URL(source)
@@ -213,7 +325,14 @@ class InfluxDbApiAdapter:
 
 
 class InfluxDbEngineAdapter:
-    def __init__(self, path: t.Union[Path, str], bucket_id: str, measurement: str, debug: bool = False):
+    def __init__(
+        self,
+        path: t.Union[Path, str],
+        bucket_id: str,
+        measurement: str,
+        debug: bool = False,
+        selection: t.Optional[Selection] = None,
+    ):
 
         if isinstance(path, str):
             path: Path = Path(path)
@@ -222,6 +341,7 @@ class InfluxDbEngineAdapter:
         self.bucket_id = bucket_id
         self.measurement = measurement
         self.debug = debug
+        self.selection = selection or Selection()
 
     @classmethod
     def from_url(cls, url: t.Union[URL, str], **kwargs) -> "InfluxDbEngineAdapter":
@@ -231,9 +351,36 @@ class InfluxDbEngineAdapter:
             path=url_fullpath(url),
             bucket_id=url.query.get("bucket-id"),
             measurement=url.query.get("measurement"),
+            selection=Selection.from_url(url),
             **kwargs,
         )
 
+    def export_command(self, output_path: str) -> str:
+        """
+        Render `influxd inspect export-lp` command, exporting the selected data to line protocol.
+        """
+        command = f"""
+        influxd inspect export-lp \
+            --engine-path '{self.path}' \
+            --bucket-id '{self.bucket_id}' \
+            --measurement '{self.measurement}' \
+            --output-path '{output_path}'
+        """.rstrip()
+        if self.selection.fields or self.selection.tags or self.selection.where:
+            raise NotImplementedError("Exporting from InfluxDB data directory only supports selecting a time range")
+        # The time range of `export-lp` includes its end.
+        if self.selection.start is not None:
+            command += f" --start '{format_rfc3339(self.selection.start)}'"
+        if self.selection.stop is not None:
+            command += f" --end '{format_rfc3339(self.selection.stop - 1)}'"
+        return command
+
+    def read_lineprotocol(self) -> t.Generator[bytes, None, None]:
+        """
+        Export data by invoking `influxd inspect export-lp`, yielding lines of line protocol while it is running.
+        """
+        return stream_command(self.export_command(output_path="-"))
+
     def to_lineprotocol(self, url: t.Union[URL, str]) -> CommandResult:
         """
         Export data into lineprotocol format (ILP) by invoking `influxd inspect export-lp`.
@@ -243,7 +390,6 @@ class InfluxDbEngineAdapter:
         TODO: By default, it will *append* to the .lp file.
               Make it configurable to "replace" data.
         TODO: Make it configurable to use compression, or not.
-        TODO: Propagate `--start` and `--end` parameters.
         TODO: Capture stderr messages, and forward user admonition.
               »detected deletes in WAL file, some deleted data may be brought back by replaying this export«
               -- https://github.com/influxdata/influxdb/issues/24456
@@ -254,13 +400,7 @@ class InfluxDbEngineAdapter:
             url: URL = URL(url)
         format_ = DataFormat.from_url(url)
         logger.info(f"Exporting data to InfluxDB line protocol format (ILP): {format_}")
-        command = f"""
-        influxd inspect export-lp \
-            --engine-path '{self.path}' \
-            --bucket-id '{self.bucket_id}' \
-            --measurement '{self.measurement}' \
-            --output-path '{url_fullpath(url)}'
-        """.rstrip()
+        command = self.export_command(output_path=url_fullpath(url))
         if format_ is DataFormat.LINE_PROTOCOL_COMPRESSED:
             command += " --compress"
         out = run_command(command)
@@ -274,6 +414,8 @@ class InfluxDbEngineAdapter:
         {"level":"info","ts":1712536769.3783438,"caller":"export_lp/export_lp.go:204","msg":"export complete"}
         """  # noqa: E501
         if format_ in [DataFormat.LINE_PROTOCOL_UNCOMPRESSED, DataFormat.LINE_PROTOCOL_COMPRESSED]:
+            import pandas as pd
+
             report = pd.read_json(path_or_buf=io.StringIO(stderr), lines=True).to_dict(orient="records")
             tsm_file_count = report[0]["file_count"]
             wal_file_count = report[1]["file_count"]
@@ -286,6 +428,151 @@ class InfluxDbEngineAdapter:
         return CommandResult(stderr=stderr, exitcode=out.returncode)
 
 
+class ArrowFileAdapter:
+    """
+    Adapter for reading data from files using Apache Arrow.
+
+    Supported formats are Apache Parquet, Apache Arrow IPC/Feather, and InfluxDB annotated CSV.
+    """
+
+    QUERY_PARAMETERS = ["format", "measurement", "columns", "batch-size"]
+
+    def __init__(
+        self,
+        path: t.Union[Path, str],
+        format: DataFormat,  # noqa: A002
+        measurement: t.Optional[str] = None,
+        columns: t.Optional[t.List[str]] = None,
+        batch_size: t.Optional[int] = None,
+        progress: bool = False,
+        selection: t.Optional[Selection] = None,
+        rollup: t.Optional[Rollup] = None,
+    ):
+        self.path = path
+        self.format = format
+        self.measurement = measurement or Path(str(path)).name.split(".")[0]
+        self.columns = columns
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.progress = progress
+        self.selection = selection or Selection()
+        self.rollup = rollup or Rollup()
+        # Columns to encode as tags, when exporting to line protocol. By default, all string columns.
+        self.tag_columns: t.Optional[t.List[str]] = None
+
+    @classmethod
+    def from_url(cls, url: t.Union[URL, str], **kwargs) -> "ArrowFileAdapter":
+        """
+        Factory to create an `ArrowFileAdapter` instance from a URL.
+
+        Supported query parameters are `measurement`, `columns`, and `batch-size`,
+        and the ones of `Selection` and `Rollup`.
+        """
+        if isinstance(url, str):
+            url: URL = URL(url)
+        if url.scheme == "file":
+            path = url_fullpath(url)
+        else:
+            # Retain query parameters of remote resources, except the ones consumed here.
+            query = {
+                key: value
+                for key, value in url.query.items()
+                if key not in cls.QUERY_PARAMETERS and not Selection.is_parameter(key) and not Rollup.is_parameter(key)
+            }
+            path = str(url.with_query(query or None))
+        columns = url.query.get("columns")
+        batch_size = url.query.get("batch-size")
+        return cls(
+            path=path,
+            format=DataFormat.from_url(url),
+            measurement=url.query.get("measurement"),
+            columns=columns and columns.split(",") or None,
+            batch_size=batch_size and int(batch_size) or None,
+            selection=Selection.from_url(url),
+            rollup=Rollup.from_url(url),
+            **kwargs,
+        )
+
+    def read_rollup(self) -> t.Generator[t.Tuple[str, "pl.DataFrame"], None, None]:
+        """
+        Read data once, aggregating it into windows of each duration of the rollup, see `WindowAggregator`.
+        """
+        aggregators = {
+            window: self.rollup.aggregator(window, tag_columns=self.tag_columns) for window in self.rollup.windows
+        }
+        for df in self.read_df():
+            for aggregator in aggregators.values():
+                aggregator.add(df)
+        for window, aggregator in aggregators.items():
+            df = aggregator.result()
+            if not df.is_empty():
+                yield window, df
+
+    def read_df(self) -> t.Generator["pl.DataFrame", None, None]:
+        """
+        Read data in batches, yielding Polars DataFrames.
+
+        Column names `_time` and `_measurement` are converted to `time` and `measurement`.
+        Batches are reduced to the selected rows and columns. Parquet row groups outside
+        of the selected time range are not read at all.
+        """
+        logger.info(f"Reading {self.format.value} data. source={self.path}")
+        if self.format is DataFormat.PARQUET:
+            frames = read_parquet(
+                self.path,
+                columns=self.columns,
+                batch_size=self.batch_size,
+                start=self.selection.start,
+                stop=self.selection.stop,
+            )
+        elif self.format is DataFormat.ARROW_IPC:
+            frames = read_arrow_ipc(self.path, columns=self.columns)
+        elif self.format is DataFormat.ANNOTATED_CSV:
+            frames = read_annotated_csv(open_resource(self.path))
+            if self.columns:
+                frames = (df.select([name for name in df.columns if name in self.columns]) for df in frames)
+        else:
+            raise NotImplementedError(f"File input format not implemented: {self.format}")
+        for df in frames:
+            df = df.rename({name: name.lstrip("_") for name in ["_time", "_measurement"] if name in df.columns})
+            if self.selection:
+                df = self.selection.apply(df, tag_columns=self.tag_columns)
+            yield df
+
+
+class SyntheticDataAdapter(ArrowFileAdapter):
+    """
+    Adapter for streaming synthetic data, generated in chunks by `SyntheticDataGenerator`.
+
+    It is addressed by `testdata://synthetic/` URLs, see `SyntheticDataGenerator.from_url`
+    for supported query parameters. Like other `ArrowFileAdapter`s, it yields Polars
+    DataFrames, so data can be streamed to any sink.
+    """
+
+    def __init__(self, generator: "SyntheticDataGenerator", progress: bool = False):
+        self.generator = generator
+        self.path = "testdata://synthetic/"
+        self.format = None
+        self.measurement = generator.measurements[0]
+        self.columns = None
+        self.batch_size = generator.chunk_size
+        self.progress = progress
+        self.tag_columns = generator.tag_columns
+        self.selection = Selection()
+        self.rollup = Rollup()
+
+    @classmethod
+    def from_url(cls, url: t.Union[URL, str], **kwargs) -> "SyntheticDataAdapter":
+        from influxio.testdata import SyntheticDataGenerator
+
+        if isinstance(url, str):
+            url: URL = URL(url)
+        return cls(generator=SyntheticDataGenerator.from_url(url), **kwargs)
+
+    def read_df(self) -> t.Generator["pl.DataFrame", None, None]:
+        logger.info(f"Generating synthetic data. {self.generator}")
+        return self.generator.frames()
+
+
 class SqlAlchemyAdapter:
     """
     Adapter to talk to SQLAlchemy-compatible databases.
@@ -305,6 +592,18 @@ class SqlAlchemyAdapter:
             self.table_fqn = self.table
             self.table_fqn_quoted = f'"{self.table}"'
         self.if_exists = url.query.get("if-exists") or "fail"
+        self.write_engine = url.query.get("engine")
+        keys = url.query.get("keys")
+        self.keys = keys and keys.split(",") or None
+        self.queue_depth = int(url.query.get("queue-depth", DEFAULT_QUEUE_DEPTH))
+        self.table_concurrency = int(url.query.get("table-concurrency", DEFAULT_TABLE_CONCURRENCY))
+        shards = url.query.get("shards")
+        self.shards = shards and int(shards) or None
+        self.replicas = url.query.get("replicas")
+        self.partition = url.query.get("partition")
+        self.tables_loaded: t.Set[str] = set()
+        # Shadow tables by target table, to be swapped in at the end of a stream, see `replacing_tables`.
+        self.shadow_tables: t.Optional[t.Dict[str, str]] = None
 
         # Special handling for SQLite and CrateDB databases.
         self.dburi = str(url.with_query(None))
@@ -330,74 +629,287 @@ class SqlAlchemyAdapter:
     def from_url(cls, url: t.Union[URL, str], **kwargs) -> "SqlAlchemyAdapter":
         return cls(url=url, **kwargs)
 
-    def write(self, source: t.Union[pd.DataFrame, InfluxDbApiAdapter], table: t.Optional[str] = None):
+    def write(
+        self, source: t.Union["pd.DataFrame", InfluxDbApiAdapter, ArrowFileAdapter], table: t.Optional[str] = None
+    ):
         table = table or self.table
+
+        if isinstance(source, (InfluxDbApiAdapter, ArrowFileAdapter)) and source.rollup:
+            self.write_rollup(source, table=table)
+            return
+
+        # When no target table is selected, load data from files into one table per measurement.
+        metrics = get_metrics()
+        if isinstance(source, ArrowFileAdapter) and table is None:
+            frames = metrics.iterate(source.read_df(), "read", rows=len, bytes=dataframe_size)
+            with self.replacing_tables():
+                for df in pipelined(frames, depth=self.queue_depth, consumer="write"):
+                    if "measurement" not in df.columns:
+                        self.write(df, table=source.measurement)
+                        continue
+                    for (measurement,), frame in df.partition_by("measurement", as_dict=True).items():
+                        self.write(frame, table=measurement)
+            return
+
         table_fqn = f"{self.database}.{table}"
         table_fqn_quoted = f'"{self.database}"."{table}"'
-        logger.info("Loading dataframes into RDBMS/SQL database using pandas/Dask")
+        logger.info("Loading dataframes into RDBMS/SQL database")
         logger.info(f"Target table: {table_fqn_quoted}")
 
-        # For CrateDB, converge `if-exists={fail,replace}` to `if-exists=append`, and create the table manually.
-        if self.dburi.startswith("crate") and self.if_exists in ["fail", "replace"]:
+        # When loading data in multiple batches, only the first one obeys `if-exists`, except for upserts.
+        if_exists = self.if_exists
+        if table in self.tables_loaded and if_exists != "upsert":
+            if_exists = "append"
+
+        # Replace a table by loading data into a shadow table, and swapping it in at the end, see `swap_table`.
+        # Within `replacing_tables`, later batches are appended to the shadow table of the first one.
+        target = table
+        if self.shadow_tables is not None and target in self.shadow_tables:
+            table = self.shadow_tables[target]
+            if_exists = "append"
+        elif if_exists == "replace":
+            table = f"{target}{SHADOW_TABLE_SUFFIX}"
+            logger.info(f"Loading data into shadow table: {table}")
+
+        # For CrateDB, converge `if-exists={fail,replace}` to `if-exists=append`, and create the table manually,
+        # using the schema of the first data frame, see `create_table_cratedb`.
+        create_table = False
+        if self.dburi.startswith("crate") and if_exists in ["fail", "replace"]:
 
             # Prevent overwriting existing table when `if-exists=fail`.
-            if self.if_exists == "fail" and self.table_exists():
+            if if_exists == "fail" and self.table_exists(table):
                 raise ValueError(f"Table '{table_fqn}' already exists.")
 
-            # Create table with dynamic column policy, to accompany new tags that
-            # progressively drop in while processing the whole dataset.
-            engine = sa.create_engine(self.dburi, echo=True)
-            with engine.connect() as connection:
-                connection.execute(sa.text(f"DROP TABLE IF EXISTS {table_fqn_quoted}"))
-                connection.execute(
-                    sa.text(f"CREATE TABLE {table_fqn_quoted} (dummy int) WITH (column_policy='dynamic')")
-                )
+            create_table = True
+            if_exists = "append"
 
-            # Because the table has been created already, switch to `append` mode.
-            self.if_exists = "append"
+        loaded = False
 
-        if isinstance(source, InfluxDbApiAdapter):
-            logger.info("Loading data from InfluxDB API")
-            has_data = False
-            for df in source.read_df():
-                has_data = True
+        def load(df: t.Union["pd.DataFrame", "pl.DataFrame", "pa.Table"]):
+            nonlocal create_table, if_exists, loaded
+            if create_table:
+                self.create_table_cratedb(table, df)
+                create_table = False
+            if if_exists in ["append", "upsert"]:
+                self.add_columns(table, df)
+            with metrics.measure("write", rows=len(df), bytes=functools.partial(dataframe_size, df)):
                 dataframe_to_sql(
                     df,
                     dburi=self.dburi,
                     tablename=table,
                     schema=self.database,
-                    if_exists=self.if_exists,
+                    if_exists=if_exists,
                     progress=self.progress,
+                    engine=self.write_engine,
+                    keys=self.keys,
                 )
-            if not has_data:
-                msg = "No data has been loaded from InfluxDB"
-                logger.error(msg)
-                raise IOError(msg)
-        elif isinstance(source, (pd.DataFrame, pl.DataFrame)):
-            logger.info("Loading data from dataframe")
-            dataframe_to_sql(
-                source,
-                dburi=self.dburi,
-                tablename=table,
-                schema=self.database,
-                if_exists=self.if_exists,
-                progress=self.progress,
-            )
+            if if_exists != "upsert":
+                if_exists = "append"
+            loaded = True
+
+        try:
+            if isinstance(source, (InfluxDbApiAdapter, ArrowFileAdapter)):
+                if isinstance(source, InfluxDbApiAdapter):
+                    logger.info("Loading data from InfluxDB API")
+                else:
+                    logger.info("Loading data from file")
+
+                # Read, transform, and write data frames concurrently, see `pipeline`.
+                has_data = False
+                frames = metrics.iterate(source.read_df(), "read", rows=len, bytes=dataframe_size)
+                for df in pipeline(frames, self.transform, depth=self.queue_depth, stage="transform", consumer="write"):
+                    has_data = True
+                    load(df)
+                if not has_data and isinstance(source, InfluxDbApiAdapter):
+                    msg = "No data has been loaded from InfluxDB"
+                    logger.error(msg)
+                    raise IOError(msg)
+            elif is_dataframe(source):
+                logger.info("Loading data from dataframe")
+                load(source)
+            else:
+                raise NotImplementedError(f"Failed handling source: {source}")
+        except BaseException:
+            # Keep the target table untouched.
+            if table != target:
+                self.drop_table(table)
+            raise
+        if table != target and loaded:
+            if self.shadow_tables is not None:
+                self.shadow_tables[target] = table
+            else:
+                self.swap_table(table, target)
+
+        self.tables_loaded.add(target)
+
+    @contextlib.contextmanager
+    def replacing_tables(self):
+        """
+        Keep one shadow table per target table while loading a stream of batches, and swap them in at the end.
+
+        Without it, each call to `write` swaps in its shadow table, so a stream of batches,
+        loaded using one call per batch, would replace the table by its first batch only.
+        When loading fails, all shadow tables are dropped, keeping the target tables untouched.
+        """
+        if self.shadow_tables is not None:
+            yield
+            return
+        self.shadow_tables = {}
+        try:
+            yield
+        except BaseException:
+            for table in self.shadow_tables.values():
+                self.drop_table(table)
+            raise
+        finally:
+            shadow_tables, self.shadow_tables = self.shadow_tables, None
+        for target, table in shadow_tables.items():
+            self.swap_table(table, target)
+
+    def write_rollup(self, source: t.Union[InfluxDbApiAdapter, ArrowFileAdapter], table: t.Optional[str] = None):
+        """
+        Load aggregates of the source into one table per window duration, named like `<table>_<window>`.
+
+        Without a target table, tables are named after the measurements, like when loading files.
+        """
+        logger.info(f"Loading rollups. functions={source.rollup.functions}, windows={source.rollup.windows}")
+        metrics = get_metrics()
+        rollups = metrics.iterate(
+            source.read_rollup(), "read", rows=lambda item: len(item[1]), bytes=lambda item: dataframe_size(item[1])
+        )
+        with self.replacing_tables():
+            for window, df in rollups:
+                if table is None and is_dataframe(df, pandas=False) and "measurement" in df.columns:
+                    for (measurement,), frame in df.partition_by("measurement", as_dict=True).items():
+                        self.write(frame, table=source.rollup.table(measurement, window))
+                else:
+                    self.write(df, table=source.rollup.table(table or source.measurement, window))
+
+    def transform(self, df: t.Union["pd.DataFrame", "pl.DataFrame"]) -> t.Union["pd.DataFrame", "pa.Table"]:
+        """
+        Convert data frame to Arrow table, ahead of writing it. The Dask write engine uses pandas data frames.
+        """
+        if self.write_engine == "dask":
+            return df
+        with get_metrics().measure("transform", rows=len(df), bytes=functools.partial(dataframe_size, df)):
+            return dataframe_to_arrow(df)
+
+    def create_table_cratedb(self, table: str, df: t.Union["pd.DataFrame", "pl.DataFrame", "pa.Table"]):
+        """
+        Create CrateDB table with columns typed after the data frame, replacing an existing table.
+
+        The table is configured by the `shards`, `replicas`, and `partition` URL query parameters.
+        """
+        import pyarrow as pa
+        import sqlalchemy as sa
+
+        if is_dataframe(df, polars=False):
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+        else:
+            schema = dataframe_to_arrow(df).schema
+        ddl = cratedb_table_ddl(
+            schema,
+            tablename=table,
+            schemaname=self.database,
+            shards=self.shards,
+            replicas=self.replicas,
+            partition=self.partition,
+        )
+        logger.info(f"Creating table: {ddl}")
+        with sql_engine(self.dburi).connect() as connection:
+            sa.Table(table, sa.MetaData(schema=self.database)).drop(connection, checkfirst=True)
+            connection.exec_driver_sql(ddl)
+
+    def add_columns(self, table: str, df: t.Union["pd.DataFrame", "pl.DataFrame", "pa.Table"]):
+        """
+        Add columns of the data frame missing from an existing table, before appending the data frame to it.
+
+        Line protocol is schemaless, so tags and fields may first appear in later batches of a measurement.
+        """
+        import pyarrow as pa
+        import sqlalchemy as sa
+
+        if is_dataframe(df, polars=False):
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
         else:
-            raise NotImplementedError(f"Failed handling source: {source}")
+            schema = dataframe_to_arrow(df).schema
+        engine = sql_engine(self.dburi)
+        preparer = engine.dialect.identifier_preparer
+        sql_table = sa.Table(table, sa.MetaData(schema=self.database))
+        with engine.begin() as connection:
+            inspector = sa.inspect(connection)
+            if not inspector.has_table(table, schema=self.database):
+                return
+            columns = {column["name"] for column in inspector.get_columns(table, schema=self.database)}
+            for field in schema:
+                if field.name in columns or field.name == "measurement":
+                    continue
+                if self.dburi.startswith("crate"):
+                    column_type = arrow_to_cratedb_type(field.type) or "TEXT"
+                else:
+                    column_type = arrow_to_sqlalchemy_type(field.type).compile(dialect=engine.dialect)
+                logger.info(f"Adding column to table {table}: {field.name} {column_type}")
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(sql_table)} "
+                    f"ADD COLUMN {preparer.quote(field.name)} {column_type}"
+                )
+
+    def swap_table(self, source: str, target: str):
+        """
+        Replace the target table by the source table, and drop the former target table.
+
+        CrateDB swaps tables atomically using `ALTER CLUSTER SWAP TABLE`. Other databases drop
+        the target table, and rename the source table, within a single transaction, which is
+        atomic for databases supporting transactional DDL, like PostgreSQL.
+        """
+        import sqlalchemy as sa
+
+        engine = sql_engine(self.dburi)
+        preparer = engine.dialect.identifier_preparer
+        source_table = sa.Table(source, sa.MetaData(schema=self.database))
+        target_table = sa.Table(target, sa.MetaData(schema=self.database))
+        logger.info(f"Swapping table {source} to {target}")
+        with engine.begin() as connection:
+            exists = sa.inspect(connection).has_table(target, schema=self.database)
+            if exists and self.dburi.startswith("crate"):
+                connection.exec_driver_sql(
+                    f"ALTER CLUSTER SWAP TABLE {preparer.format_table(source_table)} "
+                    f"TO {preparer.format_table(target_table)} WITH (drop_source = true)"
+                )
+                return
+            if exists:
+                target_table.drop(connection)
+            connection.exec_driver_sql(
+                f"ALTER TABLE {preparer.format_table(source_table)} RENAME TO {preparer.quote(target)}"
+            )
+
+    def drop_table(self, table: str):
+        import sqlalchemy as sa
+
+        with sql_engine(self.dburi).begin() as connection:
+            sa.Table(table, sa.MetaData(schema=self.database)).drop(connection, checkfirst=True)
 
     def refresh_table(self):
+        import sqlalchemy as sa
+
         engine = sa.create_engine(self.dburi)
         with engine.connect() as connection:
             return connection.execute(sa.text(f"REFRESH TABLE {self.table_fqn_quoted};"))
 
-    def table_exists(self):
+    def table_exists(self, table: t.Optional[str] = None):
+        import sqlalchemy as sa
+
+        table_fqn = self.table_fqn
+        if table is not None:
+            table_fqn = f"{self.database}.{table}" if self.database else table
         engine = sa.create_engine(self.dburi)
         metadata = sa.MetaData()
         metadata.reflect(bind=engine, schema=self.database)
-        return self.table_fqn in metadata.tables
+        return table_fqn in metadata.tables
 
     def read_records(self, table: t.Optional[str] = None) -> t.List[t.Dict]:
+        import sqlalchemy as sa
+
         table = table or self.table_fqn_quoted
         engine = sa.create_engine(self.dburi)
         with engine.connect() as connection:
@@ -406,23 +918,34 @@ class SqlAlchemyAdapter:
             return records
 
     def create_database(self):
+        import sqlalchemy as sa
+        import sqlalchemy_utils
+
         try:
-            return create_database(self.dburi)
-        except sqlalchemy.exc.ProgrammingError as ex:
+            return sqlalchemy_utils.create_database(self.dburi)
+        except sa.exc.ProgrammingError as ex:
             if "psycopg2.errors.DuplicateDatabase" not in str(ex):
                 raise
 
     def run_sql(self, sql: str):
+        import sqlalchemy as sa
+
         engine = sa.create_engine(self.dburi)
         with engine.connect() as connection:
             if hasattr(connection.connection, "set_isolation_level"):
+                import psycopg2.extensions
+
                 connection.connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
             return connection.execute(sa.text(sql))
 
     def run_sql_raw(self, sql: str):
+        import sqlalchemy as sa
+
         engine = sa.create_engine(self.dburi)
         connection = engine.raw_connection()
         if hasattr(connection, "set_isolation_level"):
+            import psycopg2.extensions
+
             connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
         cursor = connection.cursor()
         cursor.execute(sql)
@@ -459,17 +982,113 @@ class SqlAlchemyAdapter:
                 database = url.query.get("schema", database)
         return database, table
 
-    def from_lineprotocol(self, source: t.Union[Path, str], precision: str = "ns"):
+    def from_lineprotocol(
+        self,
+        source: t.Union[Path, str],
+        precision: str = "ns",
+        selection: t.Optional[Selection] = None,
+        rollup: t.Optional[Rollup] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
         """
         Load data from file or resource in lineprotocol format (ILP).
+
+        Data is decoded and loaded in batches of `batch_size` records, so memory usage does not
+        depend on the size of the input.
+        When a `selection` is given, only selected records, tags, and fields are loaded.
+        When a `rollup` is given, aggregates are loaded into one table per measurement and window duration.
         """
         logger.info(f"Loading line protocol data. source={source}")
-        p = UPath(source)
-        fs = filesystem(p.protocol, **p.storage_options)  # equivalent to p.fs
-        with fs.open(p.path) as fp:
-            frames = dataframes_from_lineprotocol(fp)
+        fp = open_lineprotocol(source)
+        metrics = get_metrics()
+        with fp:
+            # Measure reading lines in batches, because timing each line costs more than reading it.
+            lines = metrics.iterate(
+                fp, "read", consumer="decode", rows=len, bytes=lambda batch: sum(map(len, batch)), batch=10_000
+            )
+            if rollup:
+                self.write_tables(self.rollup_lineprotocol(lines, rollup, selection=selection, batch_size=batch_size))
+                return
+            # Decode and load batches concurrently, appending batches of each measurement to its table.
+            batches = metrics.iterate(
+                dataframe_batches_from_lineprotocol(lines, batch_size=batch_size, selection=selection),
+                "decode",
+                rows=lambda item: len(item[0]),
+                bytes=lambda item: dataframe_size(item[0]),
+            )
+            with self.replacing_tables():
+                for df, _ in pipelined(batches, depth=self.queue_depth, consumer="write"):
+                    self.write_tables(partition_measurements(df))
+
+    def rollup_lineprotocol(
+        self,
+        lines: t.Iterable[bytes],
+        rollup: Rollup,
+        selection: t.Optional[Selection] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> t.Dict[str, "pl.DataFrame"]:
+        """
+        Decode line protocol in batches, and aggregate them into one data frame per measurement and window duration.
+
+        Each batch is added to one `WindowAggregator` per measurement and window duration, so memory
+        usage is bounded by the size of a batch, and the size of the aggregates, like `Rollup.aggregate_tables`
+        would compute them from all data at once.
+        """
+        metrics = get_metrics()
+        batches = metrics.iterate(
+            dataframe_batches_from_lineprotocol(lines, batch_size=batch_size, selection=selection),
+            "decode",
+            consumer="transform",
+            rows=lambda item: len(item[0]),
+            bytes=lambda item: dataframe_size(item[0]),
+        )
+        aggregators: t.Dict[t.Tuple[str, str], WindowAggregator] = {}
+        for df, _ in batches:
+            with metrics.measure("transform", rows=len(df)):
+                for measurement, frame in partition_measurements(df).items():
+                    for window in rollup.windows:
+                        if (measurement, window) not in aggregators:
+                            aggregators[(measurement, window)] = rollup.aggregator(window)
+                        aggregators[(measurement, window)].add(frame)
+        tables = {}
+        with metrics.measure("transform") as stage:
+            for (measurement, window), aggregator in aggregators.items():
+                df = aggregator.result()
+                if not df.is_empty():
+                    tables[rollup.table(measurement, window)] = df
+            stage.add(batches=0)
+        return tables
+
+    def write_tables(self, frames: t.Dict[str, t.Union["pd.DataFrame", "pl.DataFrame"]]):
+        """
+        Load data frames into one table each, loading up to `table-concurrency` tables concurrently.
+
+        Tables are independent, so loading them concurrently uses more of the database's write
+        capacity. Connections are shared using the connection pool of `sql_engine`. SQLite
+        permits a single writer only, so tables are loaded one after another.
+        """
+        concurrency = self.table_concurrency
+        if self.dburi.startswith("sqlite"):
+            concurrency = 1
+        if concurrency <= 1 or len(frames) <= 1:
             for table, df in frames.items():
                 self.write(df, table=table)
+            return
+
+        from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+        logger.info(f"Loading {len(frames)} tables, {concurrency} at a time")
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="influxio-table") as executor:
+            # Run workers within a copy of the current context, to report to the active metrics collector.
+            futures = [
+                executor.submit(contextvars.copy_context().run, self.write, df, table) for table, df in frames.items()
+            ]
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            # Do not start loading more tables after an error.
+            for future in pending:
+                future.cancel()
+            for future in done:
+                future.result()
 
 
 class FileAdapter:
@@ -492,21 +1111,53 @@ class FileAdapter:
         """
         return cls(url=url, **kwargs)
 
-    def write(self, source: t.Union[pd.DataFrame, InfluxDbApiAdapter]):
+    def write(self, source: t.Union["pd.DataFrame", InfluxDbApiAdapter, ArrowFileAdapter]):
         """
-        Export data from a pandas DataFrame or from an API-connected InfluxDB database into lineprotocol format (ILP).
+        Export data from a pandas DataFrame, from an API-connected InfluxDB database,
+        or from a file, into lineprotocol format (ILP) or annotated CSV format.
         """
         logger.info(f"Exporting dataframes in {self.output.format.value} format to {self.output.path}")
-        generators = []
+        metrics = get_metrics()
+        stream = self.output.stream
         if self.output.format is DataFormat.LINE_PROTOCOL_UNCOMPRESSED:
             if isinstance(source, InfluxDbApiAdapter):
-                for df in source.read_df():
-                    generators.append(dataframe_to_lineprotocol(df, progress=self.progress))
-            elif isinstance(source, pd.DataFrame):
-                generators.append(dataframe_to_lineprotocol(source, progress=self.progress))
+                frames = source.read_df()
+                encode = functools.partial(dataframe_to_lineprotocol, progress=self.progress)
+            elif isinstance(source, ArrowFileAdapter):
+                frames = source.read_df()
+                encode = functools.partial(
+                    polars_to_lineprotocol, measurement=source.measurement, tag_columns=source.tag_columns
+                )
+            elif is_dataframe(source, polars=False):
+                frames = [source]
+                encode = functools.partial(dataframe_to_lineprotocol, progress=self.progress)
+            else:
+                raise NotImplementedError(f"Unknown data source: {source}")
+            for df in metrics.iterate(frames, "read", consumer="transform", rows=len, bytes=dataframe_size):
+                with metrics.measure("transform", rows=len(df), bytes=functools.partial(dataframe_size, df)):
+                    text = "\n".join(encode(df))
+                if not text:
+                    continue
+                with metrics.measure("write", rows=len(df), bytes=len(text) + 1):
+                    print(text, file=stream)
+        elif self.output.format is DataFormat.ANNOTATED_CSV:
+            measurement = None
+            tag_columns = None
+            if isinstance(source, (InfluxDbApiAdapter, ArrowFileAdapter)):
+                frames = source.read_df()
+                measurement = source.measurement
+                tag_columns = getattr(source, "tag_columns", None)
+            elif is_dataframe(source):
+                frames = [source]
             else:
                 raise NotImplementedError(f"Unknown data source: {source}")
+            frames = metrics.iterate(frames, "read", consumer="transform", rows=len, bytes=dataframe_size)
+            for index, df in enumerate(frames):
+                with metrics.measure("transform", rows=len(df), bytes=functools.partial(dataframe_size, df)):
+                    text = dataframe_to_annotated_csv(df, table=index, measurement=measurement, tag_columns=tag_columns)
+                with metrics.measure("write", rows=len(df), bytes=len(text)):
+                    stream.write(text)
         else:
             raise NotImplementedError(f"File output format not implemented: {self.output.format}")
-        for generator in generators:
-            print("\n".join(generator), file=self.output.stream)
+        with metrics.measure("commit"):
+            stream.flush()
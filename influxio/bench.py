@@ -0,0 +1,296 @@
+import contextlib
+import dataclasses
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import typing as t
+from pathlib import Path
+
+if t.TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BENCH_ROWS = 100_000
+DEFAULT_BENCH_SEED = 42
+MEASUREMENT = "bench"
+
+# Libraries used by the scenarios, imported before measuring, so their import time is not accounted for.
+PRELOAD_MODULES = ["pandas", "polars", "pyarrow", "sqlalchemy", "influxio.adapter", "influxio.core", "influxio.io"]
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    """
+    Measurements of a single benchmark scenario.
+
+    `bytes` is the size of the data processed by the scenario, i.e. the size of the input
+    file, or of the line protocol produced or transferred. `peak_rss` is the peak resident
+    set size of the process running the scenario, in bytes, including its input data.
+    """
+
+    name: str
+    status: str = "ok"
+    rows: int = 0
+    bytes: int = 0
+    duration: float = 0.0
+    cpu_time: float = 0.0
+    peak_rss: int = 0
+    message: t.Optional[str] = None
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        data = dataclasses.asdict(self)
+        data["rows_per_second"] = self.duration and round(self.rows / self.duration, 1)
+        data["mb_per_second"] = self.duration and round(self.bytes / self.duration / 1024**2, 3)
+        data["peak_rss_mb"] = round(self.peak_rss / 1024**2, 1)
+        data["duration"] = round(self.duration, 4)
+        data["cpu_time"] = round(self.cpu_time, 4)
+        return data
+
+
+class Benchmark:
+    """
+    Run reproducible throughput benchmarks on the data paths of influxio.
+
+    Input data is generated by `DataFrameFactory` using a fixed random seed, and
+    prepared as fixture files in the working directory before any measurement.
+    By default, each scenario runs in a separate process, so peak memory usage
+    is accounted for each scenario individually.
+
+    The InfluxDB API scenarios use a local stub server, which discards writes and
+    answers queries with a static response, so they measure the client side only.
+    The `engine-export` scenario needs the `influxd` program, and an engine URL like
+    `file:///var/lib/influxdb2/engine?bucket-id=372d1908eab801a6&measurement=demo`.
+    """
+
+    SCENARIOS = ["ilp-to-sqlite", "ilp-to-parquet", "dataframe-to-ilp", "api-read", "api-write", "engine-export"]
+
+    def __init__(
+        self,
+        rows: int = DEFAULT_BENCH_ROWS,
+        seed: int = DEFAULT_BENCH_SEED,
+        workdir: t.Optional[t.Union[Path, str]] = None,
+        engine: t.Optional[str] = None,
+    ):
+        self.rows = int(rows)
+        self.seed = int(seed)
+        self.workdir = workdir and Path(workdir) or None
+        self.engine = engine
+
+    def run(self, scenarios: t.Optional[t.List[str]] = None, isolate: bool = True) -> t.Dict[str, t.Any]:
+        """
+        Run selected scenarios, or all of them, and return a report.
+        """
+        scenarios = scenarios or self.SCENARIOS
+        for name in scenarios:
+            if name not in self.SCENARIOS:
+                raise ValueError(f"Unknown benchmark scenario: {name}")
+
+        cleanup = self.workdir is None
+        workdir = self.workdir or Path(tempfile.mkdtemp(prefix="influxio-bench-"))
+        try:
+            # Keep stdout clean for the report, because some code paths print diagnostic output.
+            with contextlib.redirect_stdout(sys.stderr):
+                self.prepare(workdir)
+            results = []
+            for name in scenarios:
+                logger.info(f"Running benchmark scenario: {name}")
+                if isolate:
+                    result = self.run_isolated(name, workdir)
+                else:
+                    result = self.run_scenario(name, workdir)
+                logger.info(f"Benchmark result: {result}")
+                results.append(result.to_dict())
+        finally:
+            if cleanup:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        from influxio import __version__
+
+        return {
+            "influxio": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "rows": self.rows,
+            "seed": self.seed,
+            "scenarios": results,
+        }
+
+    def run_isolated(self, name: str, workdir: Path) -> BenchmarkResult:
+        """
+        Run scenario in a separate process, using the `spawn` start method for a pristine interpreter.
+        """
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(processes=1) as pool:
+            return pool.apply(self.run_scenario, (name, workdir))
+
+    def run_scenario(self, name: str, workdir: Path) -> BenchmarkResult:
+        """
+        Run scenario, and measure wall time, CPU time, and peak memory usage.
+        Libraries are imported up front, so only the data path is measured.
+        """
+        fun: t.Callable = getattr(self, f"bench_{name.replace('-', '_')}")
+        output = workdir / "output" / name
+        shutil.rmtree(output, ignore_errors=True)
+        output.mkdir(parents=True)
+        result = BenchmarkResult(name=name)
+        for module in PRELOAD_MODULES:
+            importlib.import_module(module)
+        started = time.perf_counter()
+        started_cpu = time.process_time()
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                result.rows, result.bytes = fun(workdir, output)
+        except SkipScenario as ex:
+            result.status = "skipped"
+            result.message = str(ex)
+        except Exception as ex:
+            logger.exception(f"Benchmark scenario failed: {name}")
+            result.status = "failed"
+            result.message = f"{ex.__class__.__name__}: {ex}"
+        result.duration = time.perf_counter() - started
+        result.cpu_time = time.process_time() - started_cpu
+        result.peak_rss = peak_rss()
+        return result
+
+    def prepare(self, workdir: Path):
+        """
+        Generate input data, and store it as fixture files in the working directory.
+        """
+        import numpy as np
+        import polars as pl
+
+        from influxio.io import dataframe_to_annotated_csv, polars_to_lineprotocol
+        from influxio.testdata import DataFrameFactory
+
+        workdir.mkdir(parents=True, exist_ok=True)
+        marker = workdir / f"fixture-{self.rows}-{self.seed}"
+        if marker.exists():
+            return
+        logger.info(f"Preparing benchmark fixtures in {workdir}")
+
+        random.seed(self.seed)
+        np.random.seed(self.seed)
+        df = DataFrameFactory(rows=self.rows).make("dateindex")
+        df = df.reset_index(names="time")
+        df.insert(0, "measurement", MEASUREMENT)
+        df.insert(1, "sensor", np.random.choice(["sensor-a", "sensor-b", "sensor-c"], size=len(df)))
+        df.to_parquet(workdir / "frame.parquet", index=False)
+
+        frame = pl.from_pandas(df)
+        with open(workdir / "data.lp", "w") as f:
+            for line in polars_to_lineprotocol(frame):
+                f.write(line + "\n")
+
+        # The response to a Flux query, as emitted by `InfluxDbApiAdapter.read_df`.
+        response = frame.drop("measurement").with_columns(
+            pl.lit(0).cast(pl.Datetime("ns")).alias("_start"),
+            pl.col("time").max().dt.offset_by("1s").alias("_stop"),
+        )
+        (workdir / "query.csv").write_text(dataframe_to_annotated_csv(response, measurement=MEASUREMENT))
+        marker.touch()
+
+    @staticmethod
+    def read_frame(workdir: Path) -> "pd.DataFrame":
+        import pandas as pd
+
+        return pd.read_parquet(workdir / "frame.parquet")
+
+    def bench_ilp_to_sqlite(self, workdir: Path, output: Path) -> t.Tuple[int, int]:
+        import influxio.core
+
+        source = workdir / "data.lp"
+        influxio.core.copy(f"file://{source}", f"sqlite:///{output / 'bench.sqlite'}")
+        return self.rows, source.stat().st_size
+
+    def bench_ilp_to_parquet(self, workdir: Path, output: Path) -> t.Tuple[int, int]:
+        from influxio.io import MappedLineReader, dataframes_from_lineprotocol
+
+        source = workdir / "data.lp"
+        rows = 0
+        with MappedLineReader(source) as reader:
+            for measurement, df in dataframes_from_lineprotocol(reader).items():
+                df.write_parquet(output / f"{measurement}.parquet")
+                rows += len(df)
+        return rows, source.stat().st_size
+
+    def bench_dataframe_to_ilp(self, workdir: Path, output: Path) -> t.Tuple[int, int]:
+        from influxio.adapter import FileAdapter
+
+        df = self.read_frame(workdir)
+        target = output / "bench.lp"
+        FileAdapter.from_url(f"file://{target}").write(df)
+        return len(df), target.stat().st_size
+
+    def bench_api_read(self, workdir: Path, output: Path) -> t.Tuple[int, int]:
+        from influxio.adapter import InfluxDbApiAdapter
+        from influxio.util.stub import InfluxDbStub
+
+        with InfluxDbStub() as stub:
+            stub.query_response = (workdir / "query.csv").read_bytes()
+            adapter = InfluxDbApiAdapter.from_url(f"http://example:token@{stub.address}/testdrive/{MEASUREMENT}")
+            rows = sum(len(df) for df in adapter.read_df())
+            return rows, len(stub.query_response)
+
+    def bench_api_write(self, workdir: Path, output: Path) -> t.Tuple[int, int]:
+        from influxio.adapter import InfluxDbApiAdapter
+        from influxio.util.stub import InfluxDbStub
+
+        df = self.read_frame(workdir).set_index("time").drop(columns="measurement")
+        with InfluxDbStub() as stub:
+            adapter = InfluxDbApiAdapter.from_url(f"http://example:token@{stub.address}/testdrive/{MEASUREMENT}")
+            adapter.write_df(df)
+            return stub.write_lines, stub.write_bytes
+
+    def bench_engine_export(self, workdir: Path, output: Path) -> t.Tuple[int, int]:
+        import influxio.core
+
+        if not self.engine:
+            raise SkipScenario("Engine URL not configured")
+        if not shutil.which("influxd"):
+            raise SkipScenario("Program `influxd` not found")
+        target = output / "export.lp"
+        influxio.core.copy(self.engine, f"file://{target}")
+        with open(target, "rb") as f:
+            rows = sum(1 for _ in f)
+        return rows, target.stat().st_size
+
+
+class SkipScenario(Exception):
+    pass
+
+
+def peak_rss() -> int:
+    """
+    Peak resident set size of the current process, in bytes. Reports 0 where unavailable, like on Windows.
+    """
+    try:
+        import resource
+    except ImportError:  # pragma: nocover
+        return 0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    if sys.platform == "darwin":
+        return maxrss
+    return maxrss * 1024
+
+
+def write_report(report: t.Dict[str, t.Any], path: t.Optional[t.Union[Path, str]] = None):
+    """
+    Write report in JSON format to file, or to stdout.
+    """
+    data = json.dumps(report, indent=2, ensure_ascii=False)
+    if path is None or str(path) == "-":
+        print(data)  # noqa: T201
+    else:
+        Path(path).write_text(data + "\n")
@@ -4,10 +4,10 @@ from pathlib import Path
 
 from yarl import URL
 
-from influxio.adapter import FileAdapter, InfluxDbApiAdapter, InfluxDbEngineAdapter, SqlAlchemyAdapter
-from influxio.model import CommandResult
+from influxio.model import CommandResult, DataFormat, Rollup, Selection
+from influxio.registry import registry
 from influxio.util.common import url_fullpath
-from influxio.util.db import get_sqlalchemy_dialects
+from influxio.util.metrics import dataframe_size, get_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -35,32 +35,59 @@ def copy(source: str, target: str, progress: bool = False) -> t.Union[CommandRes
     This means:
     - Database or schema: testdrive
     - Table name: demo
+
+    Sinks, and sources of other packages, are resolved by URL scheme, see `AdapterRegistry`.
     """
+    from influxio.adapter import (
+        ArrowFileAdapter,
+        FileAdapter,
+        InfluxDbApiAdapter,
+        InfluxDbEngineAdapter,
+        SqlAlchemyAdapter,
+        SyntheticDataAdapter,
+    )
+
     source_url = URL(source)
     target_url = URL(target)
 
-    sqlalchemy_dialects = get_sqlalchemy_dialects()
-
     logger.info(f"Copying from {source} to {target}")
 
-    scheme_primary = target_url.scheme.split("+")[0]
+    source_format = probe_format(source_url)
 
-    if target_url.scheme.startswith("http"):
-        sink = InfluxDbApiAdapter.from_url(target)
-    elif scheme_primary in sqlalchemy_dialects:
-        sink = SqlAlchemyAdapter.from_url(target, progress=True)
-    elif target_url.scheme == "file":
-        sink = FileAdapter.from_url(target, progress=True)
-    else:
-        raise NotImplementedError(f"Data sink not implemented: {target_url}")
+    sink = registry.create_sink(target)
+    if Rollup.from_url(source_url) and not isinstance(sink, SqlAlchemyAdapter):
+        raise NotImplementedError("Rolling up data is only supported when loading data into SQL databases")
+    source_adapter = registry.source(source_url)
+
+    if source_adapter is not None:
+        sink.write(source_adapter.from_url(source, progress=True))
+
+    elif source_url.scheme == "testdata" and source_url.host == "synthetic":
+        lineprotocol_formats = [DataFormat.LINE_PROTOCOL_UNCOMPRESSED, DataFormat.LINE_PROTOCOL_COMPRESSED]
+        if isinstance(sink, FileAdapter) and sink.output.path != "-" and sink.output.format in lineprotocol_formats:
+            # Fast path: Write line protocol directly, using multiple processes.
+            from influxio.testdata import SyntheticDataGenerator, write_lineprotocol
 
-    if source_url.scheme == "testdata":
+            processes = source_url.query.get("processes")
+            generator = SyntheticDataGenerator.from_url(source_url)
+            write_lineprotocol(generator, sink.output.path, processes=processes and int(processes) or None)
+        else:
+            source_node = SyntheticDataAdapter.from_url(source)
+            sink.write(source_node)
+
+    elif source_url.scheme == "testdata":
         from influxio.testdata import DataFrameFactory
 
         dff = DataFrameFactory(**source_url.query)
-        df = dff.make(source_url.host)
+        with get_metrics().measure("read") as stage:
+            df = dff.make(source_url.host)
+            stage.add(rows=len(df), bytes=dataframe_size(df), batches=0)
         sink.write_df(df)
 
+    elif source_format is not None and (source_format.is_columnar or source_format is DataFormat.ANNOTATED_CSV):
+        source_node = ArrowFileAdapter.from_url(source)
+        sink.write(source_node)
+
     elif source_url.scheme == "file":
 
         # Export
@@ -79,10 +106,10 @@ def copy(source: str, target: str, progress: bool = False) -> t.Union[CommandRes
 
         # Import
         else:
-            path = Path(source_url.host).joinpath(Path(source_url.path).relative_to("/"))
+            path = Path(url_fullpath(source_url))
             # TODO: Determine file type by suffix.
             # TODO: Make `precision` configurable.
-            sink.from_lineprotocol(path)
+            sink.from_lineprotocol(path, **lineprotocol_options(source_url))
 
     elif source_url.scheme.startswith("http"):
         # TODO: Improve dispatching.
@@ -91,9 +118,108 @@ def copy(source: str, target: str, progress: bool = False) -> t.Union[CommandRes
             source_node = InfluxDbApiAdapter.from_url(source)
             sink.write(source_node)
         else:
-            sink.from_lineprotocol(source_url_str)
+            sink.from_lineprotocol(str(without_source_parameters(source_url)), **lineprotocol_options(source_url))
+
+    elif source_url.scheme == "s3":
+        sink.from_lineprotocol(str(without_source_parameters(source_url)), **lineprotocol_options(source_url))
 
     else:
         raise NotImplementedError(f"Data source not implemented: {source_url}")
 
     return None
+
+
+def inspect(source: str, precision: t.Optional[int] = None) -> t.Dict[str, t.Any]:
+    """
+    Profile data of source in a single pass, reporting series and tag cardinalities, field types, and time ranges.
+
+    Supported sources are line protocol files and resources, InfluxDB data directories,
+    InfluxDB API buckets and measurements, columnar and annotated CSV files, and synthetic
+    data. Data is streamed in batches, see `DataProfile`.
+    """
+    import polars as pl
+
+    from influxio.adapter import (
+        ArrowFileAdapter,
+        InfluxDbApiAdapter,
+        InfluxDbEngineAdapter,
+        SyntheticDataAdapter,
+    )
+    from influxio.inspection import DEFAULT_PRECISION, DataProfile
+    from influxio.io import dataframe_batches_from_lineprotocol, open_lineprotocol
+
+    source_url = URL(source)
+    source_format = probe_format(source_url)
+    logger.info(f"Inspecting {source}")
+    profile = DataProfile(precision=precision or DEFAULT_PRECISION)
+
+    def add_lineprotocol(lines: t.Iterable[bytes]):
+        for df, tag_columns in dataframe_batches_from_lineprotocol(lines, selection=Selection.from_url(source_url)):
+            profile.add(df, tag_columns=tag_columns)
+
+    if source_url.scheme == "testdata" and source_url.host == "synthetic":
+        adapter = SyntheticDataAdapter.from_url(source)
+        for df in adapter.read_df():
+            profile.add(df, tag_columns=adapter.tag_columns, measurement=adapter.measurement)
+
+    elif source_format is not None and (source_format.is_columnar or source_format is DataFormat.ANNOTATED_CSV):
+        adapter = ArrowFileAdapter.from_url(source)
+        for df in adapter.read_df():
+            profile.add(df, tag_columns=adapter.tag_columns, measurement=adapter.measurement)
+
+    elif source_url.scheme == "file":
+        path = Path(url_fullpath(source_url))
+        if path.is_dir():
+            engine = InfluxDbEngineAdapter.from_url(source)
+            if not engine.bucket_id:
+                raise ValueError("Parameter missing or empty: bucket-id")
+            if not engine.measurement:
+                raise ValueError("Parameter missing or empty: measurement")
+            add_lineprotocol(engine.read_lineprotocol())
+        else:
+            with open_lineprotocol(path) as fp:
+                add_lineprotocol(fp)
+
+    elif source_url.scheme.startswith("http") and ".lp" not in str(source_url):
+        api = InfluxDbApiAdapter.from_url(source)
+        for df in api.read_df():
+            profile.add(pl.from_pandas(df), measurement=api.measurement)
+
+    elif source_url.scheme.startswith("http") or source_url.scheme == "s3":
+        with open_lineprotocol(str(without_source_parameters(source_url))) as fp:
+            add_lineprotocol(fp)
+
+    else:
+        raise NotImplementedError(f"Data source not implemented: {source_url}")
+
+    return {"source": source, **profile.to_dict()}
+
+
+def lineprotocol_options(url: URL) -> t.Dict[str, t.Any]:
+    """
+    Derive options for loading line protocol from source URL, passing a selection and rollup only when given.
+    """
+    options = {"selection": Selection.from_url(url), "rollup": Rollup.from_url(url)}
+    return {name: value for name, value in options.items() if value}
+
+
+def without_source_parameters(url: URL) -> URL:
+    """
+    Remove query parameters of `Selection` and `Rollup` from URL of remote resource.
+    """
+    query = {
+        key: value
+        for key, value in url.query.items()
+        if not Selection.is_parameter(key) and not Rollup.is_parameter(key)
+    }
+    return url.with_query(query or None)
+
+
+def probe_format(url: URL) -> t.Union[DataFormat, None]:
+    """
+    Derive data format from URL, returning `None` when it can not be determined.
+    """
+    try:
+        return DataFormat.from_url(url)
+    except ValueError:
+        return None
@@ -0,0 +1,299 @@
+"""
+Profile data sources in a single pass, using bounded memory.
+
+Cardinalities of series and tag values are estimated using HyperLogLog sketches, other
+statistics, like row counts, time ranges, value ranges, and tallies of field types, are
+accumulated exactly. Profiles are reported as dictionaries, ready to be encoded to JSON.
+"""
+
+import dataclasses
+import logging
+import math
+import typing as t
+from collections import Counter
+
+from influxio.util.common import format_rfc3339
+from influxio.util.metrics import dataframe_size
+
+if t.TYPE_CHECKING:
+    import numpy as np
+    import polars as pl
+
+logger = logging.getLogger(__name__)
+
+# Number of index bits of HyperLogLog sketches. Sketches use `2**precision` bytes,
+# and have a relative standard error of about `1.04 / sqrt(2**precision)`, 0.8% by default.
+DEFAULT_PRECISION = 14
+
+
+class HyperLogLog:
+    """
+    Estimate the number of distinct values of a stream, using a fixed amount of memory.
+
+    Values are hashed to 64 bits. The first `precision` bits select a register, which keeps
+    the maximum position of the first set bit of the remaining bits. Sketches are updated
+    using vectorized operations on arrays of hashes, and can be merged.
+
+    -- Flajolet et al.: HyperLogLog: the analysis of a near-optimal cardinality estimation algorithm
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        import numpy as np
+
+        if not 4 <= precision <= 18:
+            raise ValueError(f"Precision of HyperLogLog sketch must be between 4 and 18: {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def error(self) -> float:
+        """
+        Relative standard error of estimates.
+        """
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, values: "pl.Series"):
+        """
+        Add values of a Polars Series, ignoring nulls.
+        """
+        self.add_hashes(values.drop_nulls().hash(seed=0).to_numpy())
+
+    def add_hashes(self, hashes: "np.ndarray"):
+        """
+        Add 64-bit hashes of values.
+        """
+        import numpy as np
+
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # Floating point numbers represent integers of up to 53 bits exactly, so their
+        # exponent is the bit length. Drop low bits of wider integers, keeping the leading ones.
+        shift = max(width - 53, 0)
+        _, exponent = np.frexp((rest >> np.uint64(shift)).astype(np.float64))
+        length = np.where(exponent > 0, exponent + shift, 0)
+        rank = (width + 1 - length).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def update(self, other: "HyperLogLog"):
+        """
+        Merge another sketch of the same precision, to estimate the cardinality of the union of both streams.
+        """
+        import numpy as np
+
+        if other.precision != self.precision:
+            raise ValueError("Unable to merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        """
+        Estimate the number of distinct values, using linear counting for small cardinalities.
+        """
+        import numpy as np
+
+        size = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(size, 0.7213 / (1 + 1.079 / size))
+        raw = alpha * size * size / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * size and zeros:
+            return round(size * math.log(size / zeros))
+        return round(raw)
+
+
+@dataclasses.dataclass
+class TimeRange:
+    """
+    Range of timestamps, in nanoseconds since the epoch.
+    """
+
+    min: t.Optional[int] = None
+    max: t.Optional[int] = None
+
+    def add(self, low: t.Optional[int], high: t.Optional[int]):
+        if low is not None:
+            self.min = low if self.min is None else min(self.min, low)
+        if high is not None:
+            self.max = high if self.max is None else max(self.max, high)
+
+    def to_dict(self) -> t.Dict[str, t.Optional[str]]:
+        return {
+            "min": format_rfc3339(self.min) if self.min is not None else None,
+            "max": format_rfc3339(self.max) if self.max is not None else None,
+        }
+
+
+@dataclasses.dataclass
+class TagProfile:
+    """
+    Number of values of a tag, and sketch of its distinct values.
+    """
+
+    sketch: HyperLogLog
+    count: int = 0
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {"count": self.count, "cardinality": self.sketch.estimate()}
+
+
+@dataclasses.dataclass
+class FieldProfile:
+    """
+    Number of values of a field by type, and range of its numeric values.
+    """
+
+    count: int = 0
+    types: t.Dict[str, int] = dataclasses.field(default_factory=Counter)
+    min: t.Any = None
+    max: t.Any = None
+
+    def add(self, values: "pl.Series"):
+        import polars as pl
+
+        count = len(values) - values.null_count()
+        self.count += count
+        self.types[field_type(values.dtype)] += count
+        if values.dtype.is_numeric() or values.dtype == pl.Boolean:
+            if values.dtype.is_float():
+                values = values.fill_nan(None)
+            low, high = values.min(), values.max()
+            if low is not None:
+                self.min = low if self.min is None else min(self.min, low)
+                self.max = high if self.max is None else max(self.max, high)
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {"count": self.count, "types": dict(self.types), "min": self.min, "max": self.max}
+
+
+class MeasurementProfile:
+    """
+    Profile of the data of a single measurement.
+    """
+
+    def __init__(self, name: str, precision: int = DEFAULT_PRECISION):
+        self.name = name
+        self.precision = precision
+        self.rows = 0
+        self.bytes = 0
+        self.time = TimeRange()
+        self.series = HyperLogLog(precision)
+        self.tags: t.Dict[str, TagProfile] = {}
+        self.fields: t.Dict[str, FieldProfile] = {}
+
+    def add(self, df: "pl.DataFrame", tag_columns: t.List[str]):
+        """
+        Add a batch of data of the measurement. Columns without any values are ignored.
+        """
+        import polars as pl
+
+        df = df.select(name for name in df.columns if df[name].null_count() < len(df))
+        self.rows += len(df)
+        self.bytes += dataframe_size(df)
+        if "time" in df.columns:
+            time = df["time"]
+            if time.dtype.is_temporal():
+                time = time.dt.epoch("ns")
+            self.time.add(time.min(), time.max())
+        tags = sorted(name for name in df.columns if name in tag_columns)
+        for name in df.columns:
+            if name in ["time", "measurement"]:
+                continue
+            if name in tags:
+                tag = self.tags.setdefault(name, TagProfile(sketch=HyperLogLog(self.precision)))
+                tag.count += len(df) - df[name].null_count()
+                tag.sketch.add(df[name])
+            else:
+                self.fields.setdefault(name, FieldProfile()).add(df[name])
+        # Identify series by measurement name and tag set, like line protocol does, independently of column order.
+        key = pl.concat_str(
+            [pl.lit(self.name), *[pl.lit(f"{name}=") + pl.col(name).cast(pl.Utf8) for name in tags]],
+            separator=",",
+            ignore_nulls=True,
+        )
+        self.series.add(df.select(key.alias("series")).to_series())
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "series": self.series.estimate(),
+            "time": self.time.to_dict(),
+            "tags": {name: tag.to_dict() for name, tag in self.tags.items()},
+            "fields": {name: field.to_dict() for name, field in self.fields.items()},
+        }
+
+
+class DataProfile:
+    """
+    Profile of data, per measurement, accumulated batch by batch.
+
+    Data is added as Polars DataFrames, with `time` and `measurement` columns. By default,
+    all string columns are considered tags, and all other columns fields.
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        self.precision = precision
+        self.measurements: t.Dict[str, MeasurementProfile] = {}
+
+    def add(self, df: "pl.DataFrame", tag_columns: t.Optional[t.List[str]] = None, measurement: t.Optional[str] = None):
+        """
+        Add a batch of data. Without a `measurement` column, the data is accounted to the given measurement.
+        """
+        import polars as pl
+
+        if tag_columns is None:
+            tag_columns = [
+                name
+                for name, dtype in df.schema.items()
+                if dtype in [pl.Utf8, pl.Categorical] and name not in ["time", "measurement"]
+            ]
+        if "measurement" in df.columns:
+            frames = {name: frame for (name,), frame in df.partition_by("measurement", as_dict=True).items()}
+        else:
+            frames = {measurement or "unknown": df}
+        for name, frame in frames.items():
+            profile = self.measurements.get(name)
+            if profile is None:
+                profile = self.measurements[name] = MeasurementProfile(name, precision=self.precision)
+            profile.add(frame, tag_columns=tag_columns)
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        """
+        Report profile, with estimated cardinalities, and totals across measurements.
+        """
+        series = HyperLogLog(self.precision)
+        time = TimeRange()
+        for profile in self.measurements.values():
+            series.update(profile.series)
+            time.add(profile.time.min, profile.time.max)
+        return {
+            "rows": sum(profile.rows for profile in self.measurements.values()),
+            "bytes": sum(profile.bytes for profile in self.measurements.values()),
+            "series": series.estimate(),
+            "time": time.to_dict(),
+            "sketch": {"type": "hyperloglog", "precision": self.precision, "error": round(series.error, 6)},
+            "measurements": {name: profile.to_dict() for name, profile in sorted(self.measurements.items())},
+        }
+
+
+def field_type(dtype: "pl.DataType") -> str:
+    """
+    Name the type of field values, like line protocol does, or by their Polars data type.
+    """
+    import polars as pl
+
+    if dtype.is_float():
+        return "float"
+    if dtype.is_signed_integer():
+        return "integer"
+    if dtype.is_unsigned_integer():
+        return "unsigned"
+    if dtype == pl.Boolean:
+        return "boolean"
+    if dtype in [pl.Utf8, pl.Categorical]:
+        return "string"
+    if dtype.is_temporal():
+        return "timestamp"
+    return str(dtype)
@@ -1,14 +1,30 @@
+import builtins
 import contextlib
+import csv
+import dataclasses
+import functools
+import gzip
+import io
 import logging
+import mmap
 import os
+import re
+import sys
+import tempfile
 import typing as t
+import uuid
 from collections import OrderedDict
 from pathlib import Path
 
-import fsspec
-import pandas as pd
-import polars as pl
-from influx_line import InfluxLine
+from yarl import URL
+
+if t.TYPE_CHECKING:
+    import pandas as pd
+    import polars as pl
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from influxio.model import Selection
 
 logger = logging.getLogger(__name__)
 
@@ -16,23 +32,104 @@ logger = logging.getLogger(__name__)
 BytesString = t.Union[bytes, str]
 BytesStringList = t.List[BytesString]
 
+DEFAULT_BATCH_SIZE = 100_000
+DEFAULT_BLOCK_SIZE = 16 * 1024 * 1024
+DEFAULT_PIVOT_LIMIT = 256 * 1024 * 1024
+
 
-def open(path: t.Union[Path, str]):  # noqa: A001
+def open(path: t.Union[Path, str], prefetch: bool = True):  # noqa: A001
     """
     Access a plethora of resources using `fsspec`.
+
+    Remote resources are read using concurrent range requests, see `PrefetchingReader`,
+    when their size is known. Otherwise, or when `prefetch` is disabled, they are read
+    sequentially. When the resource cache is enabled, remote resources are read from
+    their local copies instead, see `cache_resource`.
     """
-    path = str(path)
-    kwargs: t.Dict[str, t.Any] = {}
+    import fsspec
 
-    # TODO: Also support authenticated S3.
-    if path.startswith("s3"):
-        kwargs["anon"] = True
+    path, kwargs = storage_options(cache_resource(path))
 
     # TODO: Why isn't compression selected transparently?
+    compression = None
     if path.endswith(".gz"):
-        kwargs["compression"] = "gzip"
-    fs = fsspec.open(path, mode="rb", **kwargs).open()
-    return fs
+        compression = "gzip"
+
+    if prefetch and not is_local(path):
+        from influxio.util.prefetch import PrefetchingReader
+
+        fs, fs_path = fsspec.core.url_to_fs(path, **kwargs)
+        size = fs.size(fs_path)
+        if size:
+            logger.info(f"Reading remote resource using range requests. size={size}")
+            reader = io.BufferedReader(PrefetchingReader.from_env(fs, fs_path, size))
+            if compression:
+                return gzip.GzipFile(fileobj=reader, mode="rb")
+            return reader
+
+    return fsspec.open(path, mode="rb", compression=compression, **kwargs).open()
+
+
+def cache_resource(source: t.Union[Path, str]) -> t.Union[Path, str]:
+    """
+    Return path to local copy of remote resource, when the resource cache is enabled.
+
+    Otherwise, or when the resource is a local file, or can not be cached, return it unchanged.
+    See `ResourceCache`.
+    """
+    import fsspec
+
+    from influxio.util.cache import ResourceCache
+
+    if is_local(source):
+        return source
+    cache = ResourceCache.from_env()
+    if cache is None:
+        return source
+    path, kwargs = storage_options(source)
+    fs, fs_path = fsspec.core.url_to_fs(path, **kwargs)
+    return cache.get(fs, fs_path, url=path) or source
+
+
+def storage_options(path: t.Union[Path, str]) -> t.Tuple[str, t.Dict[str, t.Any]]:
+    """
+    Decode `fsspec` storage options from resource address.
+
+    For S3, credentials can be supplied per URL, like `s3://<key>:<secret>@<bucket>/<path>`.
+    Otherwise, when AWS credentials are configured per environment variables, or
+    per shared credentials file, they will be used. Otherwise, S3 is accessed anonymously.
+    Query parameters `profile`, `region`, and `endpoint-url` are also accepted.
+    """
+    path = str(path)
+    kwargs: t.Dict[str, t.Any] = {}
+    if not path.startswith("s3"):
+        return path, kwargs
+
+    url = URL(path)
+    if url.user:
+        kwargs["key"] = url.user
+        kwargs["secret"] = url.password
+        url = url.with_user(None)
+    if "profile" in url.query:
+        kwargs["profile"] = url.query["profile"]
+    if "region" in url.query:
+        kwargs.setdefault("client_kwargs", {})["region_name"] = url.query["region"]
+    if "endpoint-url" in url.query:
+        kwargs["endpoint_url"] = url.query["endpoint-url"]
+    if url.query:
+        url = url.with_query(None)
+
+    credentials_file = Path(os.environ.get("AWS_SHARED_CREDENTIALS_FILE", Path.home() / ".aws" / "credentials"))
+    has_credentials = (
+        "key" in kwargs
+        or "profile" in kwargs
+        or "AWS_ACCESS_KEY_ID" in os.environ
+        or "AWS_PROFILE" in os.environ
+        or "AWS_WEB_IDENTITY_TOKEN_FILE" in os.environ
+        or credentials_file.exists()
+    )
+    kwargs["anon"] = not has_credentials
+    return str(url), kwargs
 
 
 def read_lineprotocol(data: t.IO[t.Any]):
@@ -43,42 +140,256 @@ def read_lineprotocol(data: t.IO[t.Any]):
     """
     from line_protocol_parser import LineFormatError, parse_line
 
-    for line in data.readlines():
+    for line in data:
         try:
             yield parse_line(line)
         except LineFormatError as ex:
             logger.info(f"WARNING: Line protocol item {line} invalid. Reason: {ex}")
 
 
-def records_from_lineprotocol(data: t.IO[t.Any]):
+class MappedLineReader:
+    """
+    Read lines from a local file using a read-only memory mapping.
+
+    Line boundaries are located by scanning blocks of the mapping for newline
+    characters using NumPy, without materializing all lines at once like
+    `readlines()` on a regular file object does. Data is paged in by the
+    operating system, instead of being read into a userspace buffer, and each
+    line is copied once, into the `bytes` object yielded for it. Pages of lines
+    read already are released, so the resident set does not grow with the size
+    of the file.
+
+    The reader can be restricted to a byte range, using `start` and `end`,
+    which must be aligned to line boundaries, see `split()`.
+    """
+
+    def __init__(
+        self,
+        path: t.Union[Path, str],
+        start: int = 0,
+        end: t.Optional[int] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ):
+        self.path = Path(path)
+        self.start = start
+        self.end = end
+        self.block_size = block_size
+        self.fileobj: t.Optional[t.IO[bytes]] = None
+        self.mapping: t.Optional[mmap.mmap] = None
+
+    def __enter__(self) -> "MappedLineReader":
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        self.fileobj = builtins.open(self.path, "rb")
+        size = os.fstat(self.fileobj.fileno()).st_size
+        if size:
+            self.mapping = mmap.mmap(self.fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                self.mapping.madvise(mmap.MADV_SEQUENTIAL)
+        if self.end is None or self.end > size:
+            self.end = size
+
+    def close(self):
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        if self.fileobj is not None:
+            self.fileobj.close()
+            self.fileobj = None
+
+    @property
+    def buffer(self) -> memoryview:
+        """
+        Zero-copy view on the selected byte range of the mapping.
+        """
+        if self.mapping is None:
+            return memoryview(b"")
+        return memoryview(self.mapping)[self.start : self.end]
+
+    def offsets(self) -> t.Generator[t.Tuple[int, int], None, None]:
+        """
+        Generate `(start, end)` offsets of all lines within the selected byte range, excluding newline characters.
+        """
+        import numpy as np
+
+        if self.mapping is None:
+            return
+        position = self.start
+        released = self.start - self.start % mmap.PAGESIZE
+        while position < self.end:
+            # Drop pages of lines read already from the resident set, so it does not grow with the size of the file.
+            # The pages stay in the page cache, and are paged in again when accessed.
+            if hasattr(mmap, "MADV_DONTNEED") and position - released >= mmap.PAGESIZE:
+                boundary = position - position % mmap.PAGESIZE
+                self.mapping.madvise(mmap.MADV_DONTNEED, released, boundary - released)
+                released = boundary
+            length = min(self.block_size, self.end - position)
+            block = np.frombuffer(self.mapping, dtype=np.uint8, count=length, offset=position)
+            newlines = (np.flatnonzero(block == ord("\n")) + position).tolist()
+            del block
+            is_last_block = position + length == self.end
+            if not newlines and not is_last_block:
+                # Line is longer than block size.
+                self.block_size *= 2
+                continue
+            if is_last_block and (not newlines or newlines[-1] != self.end - 1):
+                # Last line without trailing newline.
+                newlines.append(self.end)
+            for end in newlines:
+                yield position, end
+                position = end + 1
+
+    def readlines(self) -> t.Generator[bytes, None, None]:
+        """
+        Generate lines within the selected byte range, excluding empty lines. Each line is copied from the mapping.
+        """
+        for start, end in self.offsets():
+            if end > start:
+                yield self.mapping[start:end]
+
+    def __iter__(self):
+        return self.readlines()
+
+    def split(self, count: int) -> t.List[t.Tuple[int, int]]:
+        """
+        Split the selected byte range into `count` ranges of approximately the same size, aligned to line boundaries.
+
+        Readers restricted to the ranges, using `start` and `end`, read all lines once, so multiple
+        workers can decode the same file, sharing it in the page cache.
+        """
+        if self.mapping is None:
+            return []
+        boundaries = [self.start]
+        size = self.end - self.start
+        for index in range(1, count):
+            position = self.mapping.find(b"\n", self.start + size * index // count, self.end)
+            if position == -1:
+                break
+            if position + 1 > boundaries[-1]:
+                boundaries.append(position + 1)
+        boundaries.append(self.end)
+        return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def records_from_lineprotocol(data: t.IO[t.Any], selection: t.Optional["Selection"] = None):
     """
     Read stream of InfluxDB line protocol and generate `OrderedDict` records.
+
+    When a `selection` is given, records are selected while decoding, so records which are
+    not selected are never buffered. Records without any selected fields are skipped.
+    """
+    for record, _ in tagged_records_from_lineprotocol(data, selection=selection):
+        yield record
+
+
+def tagged_records_from_lineprotocol(data: t.IO[t.Any], selection: t.Optional["Selection"] = None):
+    """
+    Read stream of InfluxDB line protocol and generate `OrderedDict` records, together with their tags.
     """
     for lp in read_lineprotocol(data=data):
+        tags = lp["tags"]
+        fields = lp["fields"]
+        if selection is not None:
+            if not selection.matches(lp["time"], tags):
+                continue
+            tags = selection.project(tags, selection.tags)
+            fields = selection.project(fields, selection.fields)
+            if not fields:
+                continue
         record = OrderedDict()
         record["measurement"] = lp["measurement"]
         record["time"] = lp["time"]
-        for tag, value in lp["tags"].items():
+        for tag, value in tags.items():
             record[tag] = value
-        for field, value in lp["fields"].items():
+        for field, value in fields.items():
             record[field] = value
-        yield record
+        yield record, tags
+
+
+def dataframe_batches_from_lineprotocol(
+    data: t.IO[t.Any], batch_size: int = DEFAULT_BATCH_SIZE, selection: t.Optional["Selection"] = None
+) -> t.Generator[t.Tuple["pl.DataFrame", t.List[str]], None, None]:
+    """
+    Read InfluxDB line protocol in batches of records, yielding Polars DataFrames and the names of their tag columns.
+
+    Unlike `dataframes_from_lineprotocol`, memory usage is bounded by `batch_size`.
+    Batches may contain records of multiple measurements.
+
+    Values are collected into one list per column, instead of keeping a dictionary per record,
+    which would take several times the memory of the batch in line protocol format.
+    """
+    import polars as pl
+
+    columns: t.Dict[str, t.List[t.Any]] = {}
+    tags: t.Dict[str, None] = {}
+    count = 0
+    for record, record_tags in tagged_records_from_lineprotocol(data, selection=selection):
+        for name, value in record.items():
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [None] * count
+            column.append(value)
+        count += 1
+        if len(record) < len(columns):
+            for column in columns.values():
+                if len(column) < count:
+                    column.append(None)
+        tags.update(dict.fromkeys(record_tags))
+        if count >= batch_size:
+            # Release the columns before handing over the batch.
+            df, columns = pl.DataFrame(columns, strict=False), {}
+            yield df, list(tags)
+            tags = {}
+            count = 0
+    if count:
+        yield pl.DataFrame(columns, strict=False), list(tags)
 
 
-def dataframes_from_lineprotocol(data: t.IO[t.Any]) -> t.Dict[str, pd.DataFrame]:
+def dataframes_from_lineprotocol(
+    data: t.IO[t.Any], selection: t.Optional["Selection"] = None
+) -> t.Dict[str, "pl.DataFrame"]:
     """
     Read InfluxDB line protocol file, grouping individual measurement records into multiple Polars DataFrames.
     """
-    records = records_from_lineprotocol(data)
-    buffer = {}
+    import polars as pl
+
+    records = records_from_lineprotocol(data, selection=selection)
     frame = pl.DataFrame(records)
-    measurements = frame.unique("measurement")["measurement"]
-    for measurement in measurements:
-        buffer[measurement] = frame.filter(pl.col("measurement") == measurement)
-    return buffer
+    if frame.is_empty():
+        return {}
+    return partition_measurements(frame)
+
+
+def partition_measurements(df: "pl.DataFrame") -> t.Dict[str, "pl.DataFrame"]:
+    """
+    Split data frame holding records of multiple measurements into one data frame per measurement.
+
+    Columns without any values for a measurement, i.e. the tags and fields of other measurements, are dropped.
+    """
+    frames = {}
+    for (measurement,), frame in df.partition_by("measurement", as_dict=True).items():
+        frames[measurement] = frame.select(
+            [column.name for column in frame.get_columns() if column.null_count() < len(frame)]
+        )
+    return frames
+
+
+def open_lineprotocol(source: t.Union[Path, str]) -> t.IO[bytes]:
+    """
+    Open file or resource in line protocol format for reading lines, memory-mapping uncompressed local files.
+    """
+    source = cache_resource(source)
+    if is_local(source) and not str(source).endswith(".gz"):
+        return MappedLineReader(local_path(source))
+    return open(source)
 
 
-def dataframe_to_lineprotocol(df: pd.DataFrame, progress: bool = False) -> t.Generator[str, None, None]:
+def dataframe_to_lineprotocol(df: "pd.DataFrame", progress: bool = False) -> t.Generator[str, None, None]:
     """
     Convert DataFrame to InfluxDB Line Protocol.
 
@@ -86,6 +397,8 @@ def dataframe_to_lineprotocol(df: pd.DataFrame, progress: bool = False) -> t.Gen
     TODO: Needs configurability to manually dispatch columns to either fields or tags.
     TODO: Needs heuristics if timestamp field is called differently than `time`.
     """
+    from influx_line import InfluxLine
+
     for record in df.to_dict(orient="records"):
         line = InfluxLine(record["measurement"])
         line.set_timestamp(record["time"].to_datetime64().view("int64"))
@@ -99,8 +412,892 @@ def dataframe_to_lineprotocol(df: pd.DataFrame, progress: bool = False) -> t.Gen
         yield str(line)
 
 
+def polars_to_lineprotocol(
+    df: "pl.DataFrame", measurement: t.Optional[str] = None, tag_columns: t.Optional[t.List[str]] = None
+) -> "pl.Series":
+    """
+    Convert Polars DataFrame to InfluxDB Line Protocol, using vectorized string operations.
+
+    The `measurement` column is used as measurement name, or the `measurement` argument if it does
+    not exist. The `time` column is used as timestamp, either datetime-typed or integer nanoseconds.
+    When `tag_columns` is not given, all string columns are dispatched as tags, and all other
+    columns as fields, like `dataframe_to_lineprotocol` does. Null values are omitted.
+
+    https://docs.influxdata.com/influxdb/latest/reference/syntax/line-protocol/
+    """
+    import polars as pl
+
+    if "measurement" in df.columns:
+        measurement_expr = pl.col("measurement").cast(pl.Utf8)
+    elif measurement is not None:
+        measurement_expr = pl.lit(measurement)
+    else:
+        raise ValueError("Unable to convert data frame without measurement name to line protocol")
+
+    columns = [name for name in df.columns if name not in ["measurement", "time"]]
+    if tag_columns is None:
+        tag_columns = [name for name in columns if df.schema[name] in [pl.Utf8, pl.Categorical]]
+    field_columns = [name for name in columns if name not in tag_columns]
+
+    # Measurement and tag set.
+    parts = [_escape(measurement_expr, ", ")]
+    for name in tag_columns:
+        value = _escape(pl.col(name).cast(pl.Utf8), ",= ")
+        parts.append(pl.when(value.is_not_null() & (value != "")).then(pl.lit(f",{_escape_name(name)}=") + value))
+
+    # Field set.
+    field_set = lineprotocol_field_set(df, field_columns)
+    parts.append(pl.lit(" "))
+    parts.append(field_set)
+
+    # Timestamp.
+    if "time" in df.columns:
+        time = pl.col("time")
+        if df.schema["time"].is_temporal():
+            time = time.dt.epoch("ns")
+        parts.append(pl.lit(" ") + time.cast(pl.Utf8))
+
+    return (
+        df.lazy()
+        .select(pl.concat_str(parts, ignore_nulls=True).alias("line"), field_set.alias("fields"))
+        .filter(pl.col("fields") != "")
+        .collect()["line"]
+    )
+
+
+def lineprotocol_field_set(df: "pl.DataFrame", field_columns: t.List[str]) -> "pl.Expr":
+    """
+    Build expression encoding the field set of line protocol from the given columns.
+
+    Values are encoded according to the column types, and null values are omitted.
+    Rows without any field values yield an empty string.
+    """
+    import polars as pl
+
+    # Each element is prefixed with a comma, which is trimmed afterwards.
+    fields = []
+    for name in field_columns:
+        dtype = df.schema[name]
+        column = pl.col(name)
+        if dtype == pl.Boolean:
+            value = pl.when(column).then(pl.lit("true")).when(~column).then(pl.lit("false"))
+        elif dtype.is_float():
+            value = pl.when(column.is_finite()).then(column.cast(pl.Utf8))
+        elif dtype.is_unsigned_integer():
+            value = column.cast(pl.Utf8) + pl.lit("u")
+        elif dtype.is_integer():
+            value = column.cast(pl.Utf8) + pl.lit("i")
+        else:
+            value = pl.lit('"') + _escape(column.cast(pl.Utf8), '\\"') + pl.lit('"')
+        fields.append(pl.lit(f",{_escape_name(name)}=") + value)
+    if not fields:
+        raise ValueError("Unable to convert data frame without fields to line protocol")
+    return pl.concat_str(fields, ignore_nulls=True).str.slice(1)
+
+
+def _escape(expr: "pl.Expr", characters: str) -> "pl.Expr":
+    """
+    Escape special characters for line protocol using a backslash.
+    """
+    for character in characters:
+        expr = expr.str.replace_all(character, f"\\{character}", literal=True)
+    return expr
+
+
+def _escape_name(name: str) -> str:
+    """
+    Escape special characters of tag keys and field keys for line protocol.
+    """
+    for character in ",= ":
+        name = name.replace(character, f"\\{character}")
+    return name
+
+
+class WindowAggregator:
+    """
+    Aggregate Polars DataFrames into fixed time windows, batch by batch, using vectorized group-by operations.
+
+    Each batch is reduced to partial aggregates per series and window, which are merged with
+    the ones of previous batches, so memory usage is bounded by the size of the result, and
+    batches do not need to be ordered by time. Windows are aligned to the epoch, and labeled
+    by their start time, like `aggregateWindow(timeSrc: "_start")` in Flux.
+
+    By default, all string columns are considered tags, and all other columns fields.
+    Results of `mean` and `sum` are only computed for numeric fields.
+    """
+
+    # Name of the column holding the timestamps of points, within partial aggregates.
+    TIME = "__time"
+
+    def __init__(self, every: int, functions: t.List[str], tag_columns: t.Optional[t.List[str]] = None):
+        if every <= 0:
+            raise ValueError(f"Window duration must be positive: {every}")
+        self.every = every
+        self.functions = functions
+        self.tag_columns = tag_columns
+        # Columns identifying a series and window, and fields, in order of appearance.
+        self.keys: t.List[str] = []
+        self.fields: t.Dict[str, bool] = {}
+        self.time_dtype: t.Optional["pl.DataType"] = None
+        self.state: t.Optional["pl.DataFrame"] = None
+        self.pending: t.List["pl.DataFrame"] = []
+
+    def add(self, df: "pl.DataFrame"):
+        """
+        Aggregate a batch of data, with a `time` column.
+        """
+        import polars as pl
+
+        if df.is_empty():
+            return
+        if "time" not in df.columns:
+            raise ValueError("Unable to aggregate data frame without `time` column")
+        time = pl.col("time")
+        if df.schema["time"].is_temporal():
+            self.time_dtype = df.schema["time"]
+            time = time.dt.epoch("ns")
+        tag_columns = self.tag_columns
+        if tag_columns is None:
+            tag_columns = [name for name, dtype in df.schema.items() if dtype == pl.Utf8 and name != "measurement"]
+        keys = [name for name in df.columns if name == "measurement" or name in tag_columns]
+        fields = [name for name in df.columns if name not in keys and name != "time"]
+        self.keys += [name for name in keys if name not in self.keys]
+        for name in fields:
+            self.fields.setdefault(name, df.schema[name].is_numeric())
+        df = df.with_columns(time.alias(self.TIME), (time // self.every * self.every).alias("time"))
+        partial = df.group_by([*keys, "time"]).agg(self.aggregations(fields, merge=False))
+        self.pending.append(partial)
+        # Merge partial aggregates once they outgrow the merged ones, so merging takes linear time overall.
+        if sum(len(item) for item in self.pending) >= max(len(self.state) if self.state is not None else 0, 1):
+            self.merge()
+
+    def aggregations(self, fields: t.List[str], merge: bool) -> t.List["pl.Expr"]:
+        """
+        Compute partial aggregates of fields, either from points, or from partial aggregates when `merge` is set.
+        """
+        import polars as pl
+
+        expressions = []
+        for name in fields:
+            value = pl.col(name)
+            expressions.append(pl.col(f"{name}__count").sum() if merge else value.count().alias(f"{name}__count"))
+            if self.fields[name] and ("sum" in self.functions or "mean" in self.functions):
+                expressions.append(pl.col(f"{name}__sum").sum() if merge else value.sum().alias(f"{name}__sum"))
+            for function in ["min", "max"]:
+                if function in self.functions:
+                    column = pl.col(f"{name}__{function}") if merge else value
+                    expressions.append(getattr(column, function)().alias(f"{name}__{function}"))
+            for function in ["first", "last"]:
+                if function in self.functions:
+                    column = pl.col(f"{name}__{function}") if merge else value
+                    time = pl.col(f"{name}__{function}_time") if merge else pl.col(self.TIME)
+                    selected = column.is_not_null()
+                    by_time = column.filter(selected).sort_by(time.filter(selected))
+                    expressions += [
+                        getattr(by_time, function)().alias(f"{name}__{function}"),
+                        getattr(time.filter(selected), "min" if function == "first" else "max")().alias(
+                            f"{name}__{function}_time"
+                        ),
+                    ]
+        return expressions
+
+    def merge(self):
+        import polars as pl
+
+        frames = ([self.state] if self.state is not None else []) + self.pending
+        self.pending = []
+        if not frames:
+            return
+        df = pl.concat(frames, how="diagonal_relaxed")
+        self.state = df.group_by([*[name for name in self.keys if name in df.columns], "time"]).agg(
+            self.aggregations([name for name in self.fields if f"{name}__count" in df.columns], merge=True)
+        )
+
+    def result(self) -> "pl.DataFrame":
+        """
+        Return aggregates per series and window, sorted by series and time.
+        """
+        import polars as pl
+
+        self.merge()
+        df = self.state
+        if df is None or df.is_empty():
+            return pl.DataFrame()
+        time = pl.col("time")
+        if self.time_dtype is not None:
+            time = pl.from_epoch(time, time_unit="ns")
+            time_zone = getattr(self.time_dtype, "time_zone", None)
+            if time_zone:
+                time = time.dt.replace_time_zone("UTC").dt.convert_time_zone(time_zone)
+            time = time.cast(self.time_dtype)
+        keys = [name for name in self.keys if name in df.columns]
+        columns = [*keys, time.alias("time")]
+        for name in self.fields:
+            if f"{name}__count" not in df.columns:
+                continue
+            # Windows without any values of a field yield null, instead of zero.
+            present = pl.col(f"{name}__count") > 0
+            for function in self.functions:
+                if function in ["sum", "mean"] and not self.fields[name]:
+                    continue
+                if function == "mean":
+                    value = pl.col(f"{name}__sum") / pl.col(f"{name}__count")
+                else:
+                    value = pl.col(f"{name}__{function}")
+                columns.append(pl.when(present).then(value).alias(f"{name}_{function}"))
+        return df.sort([*keys, "time"]).select(columns)
+
+
+def read_parquet(
+    source: t.Union[Path, str],
+    columns: t.Optional[t.List[str]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    start: t.Optional[int] = None,
+    stop: t.Optional[int] = None,
+) -> t.Generator["pl.DataFrame", None, None]:
+    """
+    Read Apache Parquet file lazily, yielding Polars DataFrames per record batch.
+
+    Only the selected `columns` are decoded (projection), and row groups are streamed
+    one after another, so memory usage is bounded by `batch_size`. Local files are
+    memory-mapped. When `start` or `stop` are given, row groups whose time range is
+    outside of `[start, stop)` are skipped, see `parquet_row_groups`.
+    """
+    import polars as pl
+    import pyarrow.parquet as pq
+
+    source = cache_resource(source)
+    if is_local(source):
+        parquet = pq.ParquetFile(str(local_path(source)), memory_map=True)
+    else:
+        parquet = pq.ParquetFile(open(source))
+    logger.info(f"Reading Parquet file. row_groups={parquet.num_row_groups}, rows={parquet.metadata.num_rows}")
+    row_groups = parquet_row_groups(parquet, start=start, stop=stop)
+    if row_groups is not None:
+        logger.info(f"Selected row groups by time range. row_groups={len(row_groups)}")
+        if not row_groups:
+            return
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=columns, row_groups=row_groups):
+        yield pl.from_arrow(batch)
+
+
+def parquet_row_groups(
+    parquet: "pq.ParquetFile", start: t.Optional[int] = None, stop: t.Optional[int] = None
+) -> t.Optional[t.List[int]]:
+    """
+    Select row groups of a Parquet file which may contain rows within the time range `[start, stop)`.
+
+    The time range of each row group is read from the column statistics of the `time`
+    or `_time` column, either timestamps or integer nanoseconds. Returns `None` when all
+    row groups need to be read.
+    """
+    import pyarrow as pa
+
+    if start is None and stop is None:
+        return None
+    schema = parquet.schema_arrow
+    names = [name for name in ["time", "_time"] if name in schema.names]
+    if not names:
+        return None
+    field = schema.field(names[0])
+    if pa.types.is_timestamp(field.type):
+        factor = {"s": 1_000_000_000, "ms": 1_000_000, "us": 1_000, "ns": 1}[field.type.unit]
+    elif pa.types.is_integer(field.type):
+        factor = 1
+    else:
+        return None
+    index = parquet.metadata.schema.names.index(field.name)
+    row_groups = []
+    for number in range(parquet.num_row_groups):
+        statistics = parquet.metadata.row_group(number).column(index).statistics
+        if statistics is None or not statistics.has_min_max:
+            row_groups.append(number)
+            continue
+        if start is not None and statistics.max_raw * factor < start:
+            continue
+        if stop is not None and statistics.min_raw * factor >= stop:
+            continue
+        row_groups.append(number)
+    return row_groups
+
+
+def read_arrow_ipc(
+    source: t.Union[Path, str], columns: t.Optional[t.List[str]] = None
+) -> t.Generator["pl.DataFrame", None, None]:
+    """
+    Read Apache Arrow IPC/Feather file lazily, yielding Polars DataFrames per record batch.
+
+    Local files in IPC file format are memory-mapped, so record batches reference the
+    mapped buffers without copying them. Files in IPC streaming format are supported, too.
+    """
+    import polars as pl
+    import pyarrow as pa
+
+    source = cache_resource(source)
+    if is_local(source):
+        stream = pa.memory_map(str(local_path(source)), "r")
+    else:
+        stream = pa.PythonFile(open(source), mode="r")
+    try:
+        reader = pa.ipc.open_file(stream)
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        stream.seek(0)
+        batches = pa.ipc.open_stream(stream)
+    for batch in batches:
+        if columns:
+            batch = batch.select(columns)
+        yield pl.from_arrow(batch)
+
+
+# Map annotated CSV data types to Apache Arrow data types. `None` means the type is inferred.
+# https://docs.influxdata.com/influxdb/v2/reference/syntax/annotated-csv/
+# https://docs.influxdata.com/influxdb/v2/reference/syntax/annotated-csv/extended/
+ANNOTATED_CSV_TYPES_IN = {
+    "string": "string",
+    "tag": "string",
+    "measurement": "string",
+    "ignored": "string",
+    "base64Binary": "string",
+    "duration": "string",
+    "double": "float64",
+    "long": "int64",
+    "unsignedLong": "uint64",
+    "boolean": "bool",
+    "dateTime": "timestamp",
+    "dateTime:RFC3339": "timestamp",
+    "dateTime:RFC3339Nano": "timestamp",
+    "dateTime:number": "int64",
+    "field": None,
+}
+
+
+@dataclasses.dataclass
+class AnnotatedCsvSection:
+    """
+    Header of a section of an annotated CSV file, i.e. its annotations and column names.
+    """
+
+    columns: t.List[str]
+    datatypes: t.List[str]
+    groups: t.List[str]
+    defaults: t.List[str]
+    annotation_column: bool
+
+    @classmethod
+    def from_lines(cls, annotations: t.Dict[str, t.List[str]], header: t.List[str], annotation_column: bool):
+        width = len(header) - int(annotation_column)
+
+        def get(name: str, default: str) -> t.List[str]:
+            values = annotations.get(name) or []
+            return (values + [default] * width)[:width]
+
+        return cls(
+            columns=header[int(annotation_column) :],
+            datatypes=get("datatype", "field"),
+            groups=get("group", "false"),
+            defaults=get("default", ""),
+            annotation_column=annotation_column,
+        )
+
+    @property
+    def names(self) -> t.List[str]:
+        """
+        Unique column names for the CSV reader, including the annotation column.
+        """
+        names = [f"_c{index}" if not name else name for index, name in enumerate(self.columns)]
+        if self.annotation_column:
+            names.insert(0, "__annotation")
+        return names
+
+    def read(self, chunk: t.Union[bytes, bytearray]) -> "pl.DataFrame":
+        """
+        Parse a chunk of CSV data rows using the Apache Arrow CSV reader, with typed columns.
+        """
+        import polars as pl
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        names = self.names[int(self.annotation_column) :]
+        column_types = {}
+        include_columns = []
+        for name, datatype in zip(names, self.datatypes):
+            if datatype == "ignored":
+                continue
+            include_columns.append(name)
+            arrow_type = ANNOTATED_CSV_TYPES_IN.get(datatype, "string")
+            if arrow_type == "timestamp":
+                column_types[name] = pa.timestamp("ns", tz="UTC")
+            elif arrow_type is not None:
+                column_types[name] = pa.type_for_alias(arrow_type)
+        # Quoted values may contain newlines, which needs the slower, serial parser.
+        table = pacsv.read_csv(
+            pa.BufferReader(chunk),
+            read_options=pacsv.ReadOptions(column_names=self.names),
+            parse_options=pacsv.ParseOptions(newlines_in_values=b'"' in chunk),
+            convert_options=pacsv.ConvertOptions(column_types=column_types, include_columns=include_columns),
+        )
+        df = pl.from_arrow(table)
+
+        # Apply `#default` annotations, and decode numeric timestamps.
+        expressions = []
+        for name, datatype, default in zip(names, self.datatypes, self.defaults):
+            if name not in df.columns:
+                continue
+            column = pl.col(name)
+            if default:
+                if df.schema[name] == pl.Utf8:
+                    column = pl.when(column == "").then(pl.lit(default)).otherwise(column)
+                else:
+                    column = column.fill_null(pl.lit(default).cast(df.schema[name]))
+            if datatype == "dateTime:number":
+                column = column.cast(pl.Datetime("ns", "UTC"))
+            expressions.append(column.alias(name))
+        df = df.with_columns(expressions)
+        return self.normalize(df)
+
+    def normalize(self, df: "pl.DataFrame") -> "pl.DataFrame":
+        """
+        Convert data frame into the shape of points: `measurement`, `time`, tags, and fields.
+
+        Data in Flux' unpivoted shape, using `_field` and `_value` columns, is kept unpivoted,
+        see `FieldPivot`, because the fields of a point are spread across tables.
+        """
+        names = self.names[int(self.annotation_column) :]
+        renames = {}
+        for name, datatype in zip(names, self.datatypes):
+            if datatype == "measurement":
+                renames[name] = "measurement"
+            elif datatype.startswith("dateTime") and name not in ["_start", "_stop"]:
+                renames[name] = "time"
+        renames.update({"_time": "time", "_measurement": "measurement"})
+        df = df.drop(["result", "table", "_start", "_stop"], strict=False)
+        return df.rename({old: new for old, new in renames.items() if old in df.columns})
+
+
+def split_fields(df: "pl.DataFrame") -> t.List[t.Tuple[str, "pl.DataFrame"]]:
+    """
+    Split unpivoted data frame by `_field`, naming the `_value` column after the field, keeping its type.
+    """
+    return [
+        (field, frame.drop("_field").rename({"_value": field}))
+        for (field,), frame in df.partition_by("_field", as_dict=True, maintain_order=True).items()
+    ]
+
+
+def pivot_fields(parts: t.List[t.Tuple[str, "pl.DataFrame"]]) -> "pl.DataFrame":
+    """
+    Pivot data frames of individual fields, see `split_fields`, into points.
+
+    Rows are merged by all other columns, i.e. `measurement`, `time`, and tags, so fields
+    of different types, read from different blocks or sections, end up in the same row.
+    """
+    import polars as pl
+
+    fields = list(dict.fromkeys(field for field, _ in parts))
+    df = pl.concat([frame for _, frame in parts], how="diagonal_relaxed")
+    return pivot_frame(df, fields)
+
+
+def pivot_frame(df: "pl.DataFrame", fields: t.List[str]) -> "pl.DataFrame":
+    """
+    Merge rows of data frame holding one field per row, see `pivot_fields`, into points.
+    """
+    import polars as pl
+
+    fields = [name for name in fields if name in df.columns]
+    index = [name for name in df.columns if name not in fields]
+    return df.group_by(index, maintain_order=True).agg(pl.col(fields).drop_nulls().first())
+
+
+class FieldPivot:
+    """
+    Pivot data in Flux' unpivoted shape, using `_field` and `_value` columns, into points.
+
+    A point's fields are spread across tables, and sections of different data types, so
+    points are only complete once the whole stream has been read. Data is kept in memory
+    up to `limit` bytes. Beyond, it is partitioned by series and time into `buckets`
+    temporary Arrow IPC files, which are pivoted one after another at the end.
+
+    Memory usage is bounded by `limit`, and by the size of the data divided by `buckets`,
+    so it grows with the size of data beyond `limit * buckets` bytes only.
+    """
+
+    def __init__(self, limit: int = DEFAULT_PIVOT_LIMIT, buckets: int = 64):
+        self.limit = limit
+        self.buckets = buckets
+        # Field names, in order of appearance.
+        self.fields: t.Dict[str, None] = {}
+        self.parts: t.List[t.Tuple[str, "pl.DataFrame"]] = []
+        self.size = 0
+        self.spill: t.Optional[tempfile.TemporaryDirectory] = None
+        self.spills = 0
+
+    def add(self, df: "pl.DataFrame"):
+        """
+        Add unpivoted data frame, spilling data to disk when exceeding the limit.
+        """
+        for field, frame in split_fields(df):
+            self.fields[field] = None
+            self.parts.append((field, frame))
+            self.size += frame.estimated_size()
+        if self.size > self.limit:
+            self.flush()
+
+    def flush(self):
+        """
+        Write data kept in memory to one temporary file per bucket.
+        """
+        import polars as pl
+
+        if not self.parts:
+            return
+        if self.spill is None:
+            self.spill = tempfile.TemporaryDirectory(prefix="influxio-pivot-")
+            logger.info(f"Spilling unpivoted data to disk. path={self.spill.name}")
+        df = pl.concat([frame for _, frame in self.parts], how="diagonal_relaxed")
+        self.parts = []
+        self.size = 0
+        index = [name for name in df.columns if name not in self.fields]
+        # Rows of the same point share all columns but their fields, so they end up in the same bucket.
+        bucket = pl.struct(index).hash(seed=0) % self.buckets
+        buckets = df.with_columns(bucket.alias("__bucket")).partition_by("__bucket", include_key=False, as_dict=True)
+        for (number,), frame in buckets.items():
+            frame.write_ipc(Path(self.spill.name) / f"{number}-{self.spills}.arrow")
+        self.spills += 1
+
+    def result(self) -> t.Generator["pl.DataFrame", None, None]:
+        """
+        Yield points, as a single data frame, or one data frame per bucket after spilling.
+        """
+        import polars as pl
+
+        if self.spill is None:
+            if self.parts:
+                yield pivot_fields(self.parts)
+                self.parts = []
+            return
+        try:
+            self.flush()
+            directory = Path(self.spill.name)
+            for number in range(self.buckets):
+                paths = [directory / f"{number}-{spill}.arrow" for spill in range(self.spills)]
+                frames = [pl.read_ipc(path, memory_map=False) for path in paths if path.exists()]
+                if not frames:
+                    continue
+                yield pivot_frame(pl.concat(frames, how="diagonal_relaxed"), list(self.fields))
+        finally:
+            self.spill.cleanup()
+            self.spill = None
+
+
+def find_unquoted(buffer: t.Union[bytes, bytearray], markers: t.List[bytes]) -> int:
+    """
+    Find first occurrence of any of the markers within CSV data, outside of quoted values, or return -1.
+
+    The data must start outside of quoted values. Within quoted values, quotes are escaped by doubling
+    them, so a position is outside of quoted values when it is preceded by an even number of quotes.
+    """
+    position = 0
+    scanned = 0
+    quotes = 0
+    while True:
+        found = [index for index in (buffer.find(marker, position) for marker in markers) if index != -1]
+        if not found:
+            return -1
+        index = min(found)
+        quotes += buffer.count(b'"', scanned, index)
+        scanned = index
+        if quotes % 2 == 0:
+            return index
+        position = index + 1
+
+
+def rfind_unquoted(buffer: t.Union[bytes, bytearray], marker: bytes) -> int:
+    """
+    Find last occurrence of the marker within CSV data, outside of quoted values, or return -1.
+    """
+    quotes = buffer.count(b'"')
+    end = len(buffer)
+    while True:
+        index = buffer.rfind(marker, 0, end)
+        if index == -1:
+            return -1
+        quotes -= buffer.count(b'"', index, end)
+        if quotes % 2 == 0:
+            return index
+        end = index
+
+
+def read_annotated_csv(
+    data: t.IO[t.Any], block_size: int = DEFAULT_BLOCK_SIZE, pivot_limit: int = DEFAULT_PIVOT_LIMIT
+) -> t.Generator["pl.DataFrame", None, None]:
+    """
+    Read stream of InfluxDB annotated CSV, yielding Polars DataFrames.
+
+    The stream is consumed in blocks. Only annotation and header rows are decoded
+    in Python, while data rows are parsed in bulk by the Apache Arrow CSV reader,
+    using the column types declared per `#datatype` annotation. Sections of the
+    file, i.e. tables using different schemas, yield separate data frames. Large
+    sections are split into multiple data frames of approximately `block_size`.
+    Blocks are only split between rows, so quoted values may span multiple lines.
+
+    Data in Flux' unpivoted shape, using `_field` and `_value` columns, is pivoted
+    once the whole stream has been read, because a point's fields are spread across
+    tables, and sections of different data types. Up to `pivot_limit` bytes of it are
+    kept in memory, and spilled to temporary files beyond, see `FieldPivot`.
+
+    Both the output format of Flux queries, and the extended annotated CSV format
+    used by `influx write`, are supported.
+
+    https://docs.influxdata.com/influxdb/v2/reference/syntax/annotated-csv/
+    """
+    # Consumed data is deleted from the front of the buffer, which does not copy the rest of it.
+    buffer = bytearray()
+    eof = False
+    section: t.Optional[AnnotatedCsvSection] = None
+    annotations: t.Dict[str, t.List[str]] = {}
+    annotation_column = True
+    pivot = FieldPivot(limit=pivot_limit)
+
+    def emit(df: "pl.DataFrame") -> t.List["pl.DataFrame"]:
+        if "_field" in df.columns and "_value" in df.columns:
+            pivot.add(df)
+            return []
+        return [df]
+
+    while True:
+
+        # Refill buffer.
+        if not eof and len(buffer) < block_size:
+            block = data.read(block_size)
+            if isinstance(block, str):
+                block = block.encode("utf-8")
+            if block:
+                buffer += block
+                continue
+            eof = True
+
+        # Decode annotation rows and header row.
+        if section is None:
+            end = find_unquoted(buffer, [b"\n"])
+            if end == -1:
+                if not eof:
+                    block_size *= 2
+                    continue
+                end = len(buffer)
+            line = buffer[:end].rstrip(b"\r").decode("utf-8")
+            del buffer[: end + 1]
+            if not line.strip():
+                if eof and not buffer:
+                    break
+                continue
+            cells = next(csv.reader([line]))
+            if line.startswith("#"):
+                name, separator, first = cells[0].partition(" ")
+                annotation_column = not separator
+                annotations[name.lstrip("#")] = cells[1:] if annotation_column else [first] + cells[1:]
+            else:
+                section = AnnotatedCsvSection.from_lines(annotations, cells, annotation_column=annotation_column)
+                annotations = {}
+            continue
+
+        # Find end of section, which is either an empty line, or the next annotation row.
+        end: t.Optional[int] = None
+        if buffer.startswith((b"\n", b"\r\n", b"#")):
+            end = 0
+        else:
+            boundary = find_unquoted(buffer, [b"\n\n", b"\n\r\n", b"\n#"])
+            if boundary != -1:
+                end = boundary + 1
+        if end is not None:
+            chunk = buffer[:end]
+            del buffer[:end]
+            if chunk.strip():
+                yield from emit(section.read(chunk))
+            section = None
+        elif eof:
+            if buffer.strip():
+                yield from emit(section.read(buffer))
+            break
+        elif len(buffer) >= block_size:
+            end = rfind_unquoted(buffer, b"\n") + 1
+            if end:
+                chunk = buffer[:end]
+                del buffer[:end]
+                yield from emit(section.read(chunk))
+            else:
+                block_size *= 2
+        else:
+            block_size *= 2
+
+    yield from pivot.result()
+
+
+def dataframe_to_annotated_csv(
+    df: t.Union["pd.DataFrame", "pl.DataFrame"],
+    table: int = 0,
+    measurement: t.Optional[str] = None,
+    tag_columns: t.Optional[t.List[str]] = None,
+) -> str:
+    """
+    Convert DataFrame to InfluxDB annotated CSV, in the shape of a pivoted Flux query result.
+
+    Tags, i.e. string columns when `tag_columns` is not given, and the measurement
+    are marked as members of the group key. The output includes a trailing empty
+    line, so multiple tables can be concatenated.
+
+    https://docs.influxdata.com/influxdb/v2/reference/syntax/annotated-csv/
+    """
+    import polars as pl
+
+    if not isinstance(df, pl.DataFrame):
+        df = pl.from_pandas(df)
+    if "measurement" not in df.columns and measurement is not None:
+        df = df.with_columns(pl.lit(measurement).alias("measurement"))
+    df = df.rename({name: f"_{name}" for name in ["time", "measurement"] if name in df.columns})
+    if "_time" in df.columns and df.schema["_time"].is_integer():
+        df = df.with_columns(pl.col("_time").cast(pl.Datetime("ns")))
+    if tag_columns is None:
+        tag_columns = [name for name in df.columns if df.schema[name] in [pl.Utf8, pl.Categorical]]
+
+    datatypes = ["string", "long"]
+    groups = ["false", "false"]
+    for name, dtype in df.schema.items():
+        if dtype.is_temporal():
+            datatype = "dateTime:RFC3339"
+        elif dtype == pl.Boolean:
+            datatype = "boolean"
+        elif dtype.is_float():
+            datatype = "double"
+        elif dtype.is_unsigned_integer():
+            datatype = "unsignedLong"
+        elif dtype.is_integer():
+            datatype = "long"
+        else:
+            datatype = "string"
+        datatypes.append(datatype)
+        groups.append(str(name in tag_columns or name == "_measurement").lower())
+
+    header = io.StringIO()
+    writer = csv.writer(header, lineterminator="\n")
+    writer.writerow(["#group"] + groups)
+    writer.writerow(["#datatype"] + datatypes)
+    writer.writerow(["#default", "_result"] + [""] * (len(datatypes) - 1))
+    writer.writerow(["", "result", "table"] + df.columns)
+
+    df = df.select(
+        pl.lit(None, dtype=pl.Utf8).alias("__annotation"),
+        pl.lit(None, dtype=pl.Utf8).alias("__result"),
+        pl.lit(table).alias("__table"),
+        pl.all(),
+    )
+    body = df.write_csv(include_header=False, datetime_format="%Y-%m-%dT%H:%M:%S%.fZ")
+    return header.getvalue() + body + "\n"
+
+
+def is_dataframe(obj: t.Any, pandas: bool = True, polars: bool = True) -> bool:
+    """
+    Whether the object is a pandas or Polars DataFrame, without importing either library.
+    """
+    # When a library has not been imported yet, it can not have created the object.
+    modules = [name for name, enabled in [("pandas", pandas), ("polars", polars)] if enabled and name in sys.modules]
+    return any(isinstance(obj, sys.modules[name].DataFrame) for name in modules)
+
+
+def is_local(source: t.Union[Path, str]) -> bool:
+    """
+    Whether the resource is a file on the local filesystem.
+    """
+    return isinstance(source, Path) or "://" not in source or source.startswith("file://")
+
+
+def local_path(source: t.Union[Path, str]) -> Path:
+    if isinstance(source, str) and source.startswith("file://"):
+        source = source[len("file://") :]
+    return Path(source)
+
+
+@dataclasses.dataclass
+class SqlWritePlanner:
+    """
+    Select the engine for loading a dataframe into a SQL database, by its size.
+
+    - At or above `adbc_rows` rows or `adbc_bytes` bytes, data is ingested using an ADBC
+      driver, when installed for the database. Each ingest opens its own connection, so
+      smaller dataframes are inserted by the other engines, using pooled connections.
+      SQLite connections are not pooled, so it is always ingested using ADBC, when installed.
+    - Otherwise, CrateDB is loaded using Dask, which inserts partitions using its bulk
+      endpoint, whatever the size.
+    - Otherwise, at or above `dask_rows` rows or `dask_bytes` bytes, data is loaded using
+      Dask, which converts it to pandas, and inserts its partitions in parallel.
+    - Otherwise, at or above `threads_rows` rows or `threads_bytes` bytes, batches are
+      inserted concurrently by `threads` threads, using one connection each. SQLite permits
+      a single writer only, so it is always written to sequentially, and never using Dask.
+    - Below, batches are inserted sequentially, using a single connection, to avoid any
+      overhead for small dataframes.
+
+    Calibrate the thresholds per database by measuring the throughput of the individual
+    engines at different sizes, for example using the benchmarks of `dataframe_to_sql`.
+    """
+
+    threads_rows: int = 50_000
+    threads_bytes: int = 16 * 1024**2
+    adbc_rows: int = 10_000
+    adbc_bytes: int = 4 * 1024**2
+    dask_rows: int = 5_000_000
+    dask_bytes: int = 1024**3
+    threads: int = 4
+
+    @classmethod
+    def from_env(cls) -> "SqlWritePlanner":
+        """
+        Factory to create a `SqlWritePlanner`, configured by environment variables.
+
+        - INFLUXIO_SQL_THREADS_ROWS, INFLUXIO_SQL_THREADS_BYTES: Thresholds for inserting concurrently.
+        - INFLUXIO_SQL_ADBC_ROWS, INFLUXIO_SQL_ADBC_BYTES: Thresholds for ingesting using ADBC.
+        - INFLUXIO_SQL_DASK_ROWS, INFLUXIO_SQL_DASK_BYTES: Thresholds for loading using Dask.
+        - INFLUXIO_SQL_THREADS: Number of concurrent inserts.
+
+        Sizes in bytes accept a K, M, G, or T suffix.
+        """
+        from influxio.util.cache import parse_size
+
+        def get(name: str, parse: t.Callable[[str], int], default: int) -> int:
+            value = os.environ.get(name)
+            return parse(value) if value else default
+
+        return cls(
+            threads_rows=get("INFLUXIO_SQL_THREADS_ROWS", int, cls.threads_rows),
+            threads_bytes=get("INFLUXIO_SQL_THREADS_BYTES", parse_size, cls.threads_bytes),
+            adbc_rows=get("INFLUXIO_SQL_ADBC_ROWS", int, cls.adbc_rows),
+            adbc_bytes=get("INFLUXIO_SQL_ADBC_BYTES", parse_size, cls.adbc_bytes),
+            dask_rows=get("INFLUXIO_SQL_DASK_ROWS", int, cls.dask_rows),
+            dask_bytes=get("INFLUXIO_SQL_DASK_BYTES", parse_size, cls.dask_bytes),
+            threads=get("INFLUXIO_SQL_THREADS", int, cls.threads),
+        )
+
+    def plan(self, dburi: str, rows: int, size: int) -> str:
+        """
+        Select engine for loading `rows` rows of `size` bytes into database.
+        """
+        sqlite = dburi.startswith("sqlite")
+        if (sqlite or rows >= self.adbc_rows or size >= self.adbc_bytes) and adbc_driver(dburi) is not None:
+            return "adbc"
+        # The `dask` engine inserts into CrateDB using `insert_bulk`, which outperforms `executemany`.
+        if dburi.startswith("crate"):
+            return "dask"
+        if sqlite:
+            return "arrow"
+        if rows >= self.dask_rows or size >= self.dask_bytes:
+            return "dask"
+        if rows >= self.threads_rows or size >= self.threads_bytes:
+            return "threads"
+        return "arrow"
+
+
 def dataframe_to_sql(
-    df: t.Union[pd.DataFrame, pl.DataFrame],
+    df: t.Union["pd.DataFrame", "pl.DataFrame", "pa.Table"],
     dburi: str,
     tablename: str,
     schema: str = None,
@@ -109,26 +1306,99 @@ def dataframe_to_sql(
     if_exists="fail",
     npartitions: int = None,
     progress: bool = False,
+    engine: t.Optional[str] = None,
+    planner: t.Optional[SqlWritePlanner] = None,
+    keys: t.Optional[t.List[str]] = None,
 ):
     """
-    Load pandas dataframe into database using Dask.
-
-    https://stackoverflow.com/questions/62404502/using-dasks-new-to-sql-for-improved-efficiency-memory-speed-or-alternative-to
+    Load pandas or Polars dataframe, or Arrow table, into database.
 
-    if_exists : {'fail', 'replace', 'append'}, default 'fail'
+    if_exists : {'fail', 'replace', 'append', 'upsert'}, default 'fail'
         How to behave if the table already exists.
 
         * fail: Raise a ValueError.
         * replace: Drop the table before inserting new values.
         * append: Insert new values to the existing table.
+        * upsert: Insert new values, and update existing rows with equal `keys`, see `arrow_to_sql_upsert`.
+
+    engine : {'adbc', 'arrow', 'threads', 'dask'}, default: selected by `planner`, see `SqlWritePlanner`
+        How to insert data into the database.
+
+        * adbc: Ingest Arrow table using an ADBC driver, without converting values to Python objects.
+        * arrow: Convert Arrow record batches to Python rows, and insert them using the DB API's `executemany`.
+        * threads: Like `arrow`, inserting multiple batches concurrently, using one connection per thread.
+        * dask: Convert to pandas, and insert partitions in parallel using Dask.
     """
-    logger.info(f"Writing dataframe to SQL: uri={dburi}, table={tablename}")
-    import dask.dataframe as dd
+    from influxio.util.metrics import dataframe_size
 
     # Set a few defaults.
     if_exists = if_exists or "fail"
     chunksize = chunksize or 5_000
-    npartitions = npartitions or int(os.cpu_count() / 2)
+    if if_exists not in ["fail", "replace", "append", "upsert"]:
+        raise ValueError(f"'{if_exists}' is not valid for if_exists")
+
+    # Upserts merge batches through a staging table, using a single connection.
+    if if_exists == "upsert":
+        engine = "arrow"
+
+    planner = planner or SqlWritePlanner.from_env()
+    engine = engine or planner.plan(dburi, rows=len(df), size=dataframe_size(df))
+    logger.info(f"Writing dataframe to SQL: uri={dburi}, table={tablename}, engine={engine}")
+
+    if engine == "dask":
+        return dataframe_to_sql_dask(
+            df,
+            dburi=dburi,
+            tablename=tablename,
+            schema=schema,
+            index=index,
+            chunksize=chunksize,
+            if_exists=if_exists,
+            npartitions=npartitions,
+            progress=progress,
+        )
+    if engine not in ["adbc", "arrow", "threads"]:
+        raise ValueError(f"Unknown SQL write engine: {engine}")
+
+    table = dataframe_to_arrow(df, index=index)
+    if "measurement" in table.column_names:
+        table = table.drop_columns(["measurement"])
+    if if_exists == "upsert":
+        return arrow_to_sql_upsert(
+            table, dburi=dburi, tablename=tablename, schema=schema, keys=keys, chunksize=chunksize
+        )
+    if engine == "adbc":
+        return arrow_to_sql_adbc(table, dburi=dburi, tablename=tablename, schema=schema, if_exists=if_exists)
+    return arrow_to_sql(
+        table,
+        dburi=dburi,
+        tablename=tablename,
+        schema=schema,
+        chunksize=chunksize,
+        if_exists=if_exists,
+        threads=planner.threads if engine == "threads" else 1,
+    )
+
+
+def dataframe_to_sql_dask(
+    df: t.Union["pd.DataFrame", "pl.DataFrame", "pa.Table"],
+    dburi: str,
+    tablename: str,
+    schema: str = None,
+    index=False,
+    chunksize=None,
+    if_exists="fail",
+    npartitions: int = None,
+    progress: bool = False,
+):
+    """
+    Load pandas dataframe into database using Dask.
+
+    https://stackoverflow.com/questions/62404502/using-dasks-new-to-sql-for-improved-efficiency-memory-speed-or-alternative-to
+    """
+    import dask.dataframe as dd
+
+    npartitions = npartitions or max(int(os.cpu_count() / 2), 1)
 
     # Optionally enable progress bar.
     ctx = contextlib.nullcontext
@@ -151,7 +1421,7 @@ def dataframe_to_sql(
 
     # Load data into database.
     with ctx():
-        if isinstance(df, pl.DataFrame):
+        if not is_dataframe(df, polars=False):
             df = df.to_pandas()
         ddf = dd.from_pandas(df, npartitions=npartitions)
         ddf = ddf.drop(columns="measurement", errors="ignore")
@@ -165,3 +1435,414 @@ def dataframe_to_sql(
             method=method,
             parallel=True,
         )
+
+
+def dataframe_to_arrow(df: t.Union["pd.DataFrame", "pl.DataFrame", "pa.Table"], index: bool = False) -> "pa.Table":
+    """
+    Convert pandas or Polars dataframe to Arrow table. Polars dataframes are converted without copying.
+    """
+    import pyarrow as pa
+
+    if isinstance(df, pa.Table):
+        return df
+    if is_dataframe(df, pandas=False):
+        return df.to_arrow()
+    return pa.Table.from_pandas(df, preserve_index=index)
+
+
+def arrow_to_sql(
+    table: "pa.Table",
+    dburi: str,
+    tablename: str,
+    schema: t.Optional[str] = None,
+    chunksize: int = 5_000,
+    if_exists: str = "fail",
+    threads: int = 1,
+) -> int:
+    """
+    Insert Arrow table into database using SQLAlchemy, in batches of `chunksize` rows.
+
+    Each batch is converted to Python rows, see `insert_batch`, and submitted using a single
+    `executemany` call of the DB API driver, so drivers can use their bulk interfaces,
+    like CrateDB's bulk operations, or PostgreSQL's multi-row inserts.
+
+    Using multiple `threads`, batches are inserted concurrently, each thread using its
+    own connection and transaction. Otherwise, all batches are inserted within a single
+    transaction. Returns the number of inserted rows.
+    """
+    import sqlalchemy as sa
+
+    engine = sql_engine(dburi)
+    sql_table = sa.Table(
+        tablename,
+        sa.MetaData(schema=schema),
+        *[sa.Column(field.name, arrow_to_sqlalchemy_type(field.type)) for field in table.schema],
+    )
+    batches = table.to_batches(max_chunksize=chunksize)
+    if threads <= 1 or len(batches) <= 1:
+        with engine.begin() as connection:
+            prepare_sql_table(connection, sql_table, if_exists=if_exists)
+            for batch in batches:
+                insert_batch(connection, sql_table, batch)
+        return table.num_rows
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with engine.begin() as connection:
+        prepare_sql_table(connection, sql_table, if_exists=if_exists)
+
+    def insert(batch: "pa.RecordBatch"):
+        with engine.begin() as connection:
+            insert_batch(connection, sql_table, batch)
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="influxio-sql") as executor:
+        # Consume results, to propagate errors.
+        list(executor.map(insert, batches))
+    return table.num_rows
+
+
+def insert_batch(connection: t.Any, sql_table: t.Any, batch: "pa.RecordBatch"):
+    """
+    Insert Arrow record batch using a single `executemany` call.
+
+    This falls back to Python rows: each column is converted to a list of Python objects,
+    and a dictionary is built per row, as SQLAlchemy expects. The values are copied out of
+    the Arrow buffers, so use the `adbc` engine to insert directly from the Arrow buffers.
+    """
+    import pyarrow as pa
+
+    columns = []
+    for column in batch.columns:
+        # SQL databases store timestamps with microsecond precision at most.
+        if pa.types.is_timestamp(column.type) and column.type.unit == "ns":
+            column = column.cast(pa.timestamp("us", tz=column.type.tz), safe=False)
+        columns.append(column.to_pylist())
+    records = [dict(zip(batch.schema.names, row)) for row in zip(*columns)]
+    if records:
+        connection.execute(sql_table.insert(), records)
+
+
+# Dialects supporting `INSERT ... ON CONFLICT ... DO UPDATE`, see `arrow_to_sql_upsert`.
+UPSERT_DIALECTS = ["crate", "postgresql", "sqlite"]
+
+
+def arrow_to_sql_upsert(
+    table: "pa.Table",
+    dburi: str,
+    tablename: str,
+    schema: t.Optional[str] = None,
+    keys: t.Optional[t.List[str]] = None,
+    chunksize: int = 5_000,
+) -> int:
+    """
+    Insert Arrow table into database, updating existing rows with equal key columns.
+
+    By default, the key columns are the time column and the tag columns, see `upsert_keys`,
+    so loading overlapping data again follows InfluxDB's last-write-wins semantics. Rows are
+    bulk-loaded into a staging table first, and merged into the target table using a single
+    `INSERT ... SELECT ... ON CONFLICT ... DO UPDATE` statement. Of multiple rows with equal
+    keys within the table, the last one wins.
+
+    A new target table is created with a primary key on the key columns. Existing tables
+    need a primary key, or a unique index, on the key columns. For PostgreSQL and SQLite,
+    a unique index is created when missing. Databases reject null values in primary keys,
+    or consider them distinct, so null values of string key columns, i.e. of sparse tags,
+    are stored as empty strings, like InfluxDB does not distinguish between missing and
+    empty tags. Returns the number of merged rows.
+    """
+    import polars as pl
+    import polars.selectors as cs
+    import sqlalchemy as sa
+
+    engine = sql_engine(dburi)
+    dialect = engine.dialect.name
+    if dialect not in UPSERT_DIALECTS:
+        raise NotImplementedError(f"Upserts are not supported for database: {dialect}")
+    keys = keys or upsert_keys(table.schema)
+    if not keys:
+        raise ValueError("Upserts need key columns, but data has no time column")
+    missing = [key for key in keys if key not in table.column_names]
+    if missing:
+        raise ValueError(f"Key columns not found: {', '.join(missing)}")
+
+    # SQL databases store timestamps with microsecond precision at most, so deduplicate keys on that precision.
+    frame = pl.from_arrow(table)
+    tags = [key for key in keys if frame.schema[key] in [pl.Utf8, pl.Categorical]]
+    frame = frame.with_columns(cs.datetime("ns").dt.cast_time_unit("us"), pl.col(tags).cast(pl.Utf8).fill_null(""))
+    table = frame.unique(subset=keys, keep="last", maintain_order=True).to_arrow()
+
+    def columns():
+        return [sa.Column(field.name, arrow_to_sqlalchemy_type(field.type)) for field in table.schema]
+
+    sql_table = sa.Table(tablename, sa.MetaData(schema=schema), *columns(), sa.PrimaryKeyConstraint(*keys))
+    # Temporary tables are private to the connection. CrateDB does not support them.
+    staging_name = f"{tablename}__influxio_staging_{uuid.uuid4().hex[:8]}"
+    if dialect == "crate":
+        staging = sa.Table(staging_name, sa.MetaData(schema=schema), *columns())
+    else:
+        staging = sa.Table(staging_name, sa.MetaData(), *columns(), prefixes=["TEMPORARY"])
+
+    # Identifiers are quoted by the dialect, so composing the statement is safe.
+    preparer = engine.dialect.identifier_preparer
+    names = ", ".join(preparer.quote(name) for name in table.column_names)
+    updates = ", ".join(
+        f"{preparer.quote(name)} = excluded.{preparer.quote(name)}" for name in table.column_names if name not in keys
+    )
+    # SQLite needs a `WHERE` clause, to parse `ON CONFLICT` after `SELECT`.
+    merge = (
+        f"INSERT INTO {preparer.format_table(sql_table)} ({names}) "  # noqa: S608
+        f"SELECT {names} FROM {preparer.format_table(staging)} WHERE true "
+        f"ON CONFLICT ({', '.join(preparer.quote(key) for key in keys)}) "
+    )
+    merge += f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+
+    with engine.begin() as connection:
+        if not sa.inspect(connection).has_table(tablename, schema=schema):
+            sql_table.create(connection)
+        elif dialect != "crate":
+            index = sa.Index(f"{tablename}__influxio_keys", *[sql_table.c[key] for key in keys], unique=True)
+            if index.name not in [item["name"] for item in sa.inspect(connection).get_indexes(tablename, schema)]:
+                # Rows loaded before may lack tags, so store them like the new rows.
+                for tag in tags:
+                    connection.execute(sql_table.update().where(sql_table.c[tag].is_(None)).values({tag: ""}))
+                index.create(connection)
+        staging.create(connection)
+        try:
+            for batch in table.to_batches(max_chunksize=chunksize):
+                insert_batch(connection, staging, batch)
+            if dialect == "crate":
+                connection.exec_driver_sql(f"REFRESH TABLE {preparer.format_table(staging)}")
+            connection.exec_driver_sql(merge)
+        finally:
+            staging.drop(connection)
+    return table.num_rows
+
+
+def upsert_keys(schema: "pa.Schema") -> t.List[str]:
+    """
+    Derive key columns for upserts from an Arrow schema: The time column, and all string columns, as tags.
+
+    The time column is the column called `time`, which may also hold epoch timestamps as integers,
+    or the first timestamp column.
+    """
+    import pyarrow as pa
+
+    timestamps = [field.name for field in schema if field.name == "time" or pa.types.is_timestamp(field.type)]
+    if not timestamps:
+        return []
+    time = "time" if "time" in timestamps else timestamps[0]
+    tags = [
+        field.name
+        for field in schema
+        if pa.types.is_string(field.type)
+        or pa.types.is_large_string(field.type)
+        or (pa.types.is_dictionary(field.type) and pa.types.is_string(field.type.value_type))
+    ]
+    return [time] + [name for name in tags if name != "measurement"]
+
+
+@functools.lru_cache(maxsize=None)
+def sql_engine(dburi: str) -> t.Any:
+    """
+    Create SQLAlchemy engine once per database URI, so its connection pool is reused across dataframes.
+
+    Connections to SQLite databases are not pooled, because they are cheap to open, and pooled
+    connections would keep referring to database files which have been deleted in the meanwhile.
+
+    The number of connections is bounded by the number of concurrent writers, i.e. tables
+    loaded concurrently times threads per table, so connections beyond the pool size are
+    not limited, to not let writers wait for each other.
+    """
+    import sqlalchemy as sa
+
+    if dburi.startswith("sqlite"):
+        return sa.create_engine(dburi, poolclass=sa.pool.NullPool)
+    return sa.create_engine(dburi, max_overflow=-1)
+
+
+def prepare_sql_table(connection: t.Any, sql_table: t.Any, if_exists: str = "fail"):
+    """
+    Create database table, obeying `if_exists`, see `dataframe_to_sql`.
+    """
+    import sqlalchemy as sa
+
+    exists = sa.inspect(connection).has_table(sql_table.name, schema=sql_table.schema)
+    if exists and if_exists == "fail":
+        raise ValueError(f"Table '{sql_table.name}' already exists.")
+    if exists and if_exists == "replace":
+        sql_table.drop(connection)
+        exists = False
+    if not exists:
+        sql_table.create(connection)
+
+
+def arrow_to_sqlalchemy_type(dtype: "pa.DataType") -> t.Any:
+    """
+    Map Arrow data type to SQLAlchemy column type. Unknown types are stored as text.
+    """
+    import pyarrow as pa
+    import sqlalchemy as sa
+
+    if pa.types.is_boolean(dtype):
+        return sa.Boolean()
+    if pa.types.is_integer(dtype):
+        return sa.BigInteger()
+    if pa.types.is_floating(dtype):
+        return sa.Float(precision=53)
+    if pa.types.is_timestamp(dtype):
+        return sa.DateTime(timezone=dtype.tz is not None)
+    if pa.types.is_date(dtype):
+        return sa.Date()
+    return sa.Text()
+
+
+# Intervals for partitioning CrateDB tables by time, see `cratedb_table_ddl`.
+CRATEDB_PARTITION_INTERVALS = ["day", "week", "month", "quarter", "year"]
+
+
+def arrow_to_cratedb_type(dtype: "pa.DataType") -> t.Optional[str]:
+    """
+    Map Arrow data type to CrateDB column type. Returns `None` for columns without values.
+    """
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(dtype):
+        dtype = dtype.value_type
+    if pa.types.is_null(dtype):
+        return None
+    if pa.types.is_boolean(dtype):
+        return "BOOLEAN"
+    if pa.types.is_integer(dtype):
+        return "BIGINT"
+    if pa.types.is_floating(dtype):
+        return "DOUBLE PRECISION"
+    if pa.types.is_timestamp(dtype) or pa.types.is_date(dtype):
+        return "TIMESTAMP WITH TIME ZONE"
+    return "TEXT"
+
+
+def cratedb_table_ddl(
+    schema: "pa.Schema",
+    tablename: str,
+    schemaname: t.Optional[str] = None,
+    shards: t.Optional[int] = None,
+    replicas: t.Optional[str] = None,
+    partition: t.Optional[str] = None,
+) -> str:
+    """
+    Generate `CREATE TABLE` statement for CrateDB, with column types derived from an Arrow schema.
+
+    Loading data into a table whose columns are mapped upfront avoids updating the mapping
+    of the table, and the cluster state, while inserting. Columns without values are left
+    out, and the table uses a dynamic column policy, to accompany columns which only appear
+    in later data frames.
+
+    shards : Number of shards of the table, or of each partition.
+    replicas : Number of replicas, or a range like `0-1`.
+    partition : Partition the table by `day`, `week`, `month`, `quarter`, or `year`, using a
+        generated column `<time>_<interval>` derived from the time column.
+    """
+    import pyarrow as pa
+
+    def quote(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    columns = []
+    for field in schema:
+        if field.name == "measurement":
+            continue
+        type_ = arrow_to_cratedb_type(field.type)
+        if type_ is not None:
+            columns.append(f"{quote(field.name)} {type_}")
+
+    partitioned_by = None
+    if partition:
+        if partition not in CRATEDB_PARTITION_INTERVALS:
+            raise ValueError(f"Unknown partition interval: {partition}")
+        timestamps = [field.name for field in schema if pa.types.is_timestamp(field.type)]
+        if not timestamps:
+            raise ValueError("Partitioning a table needs a timestamp column")
+        time = "time" if "time" in timestamps else timestamps[0]
+        partitioned_by = quote(f"{time}_{partition}")
+        columns.append(
+            f"{partitioned_by} TIMESTAMP WITH TIME ZONE GENERATED ALWAYS AS date_trunc('{partition}', {quote(time)})"
+        )
+
+    table = quote(tablename)
+    if schemaname:
+        table = f"{quote(schemaname)}.{table}"
+    ddl = f"CREATE TABLE {table} ({', '.join(columns)})"
+    if shards is not None:
+        ddl += f" CLUSTERED INTO {int(shards)} SHARDS"
+    if partitioned_by is not None:
+        ddl += f" PARTITIONED BY ({partitioned_by})"
+    options = ["column_policy = 'dynamic'"]
+    if replicas is not None:
+        if not re.match(r"^\d+(-(\d+|all))?$", str(replicas)):
+            raise ValueError(f"Invalid number of replicas: {replicas}")
+        options.append(f"number_of_replicas = '{replicas}'")
+    return f"{ddl} WITH ({', '.join(options)})"
+
+
+ADBC_DRIVERS = {
+    "postgresql": "adbc_driver_postgresql",
+    "sqlite": "adbc_driver_sqlite",
+}
+
+
+def adbc_driver(dburi: str) -> t.Any:
+    """
+    Return the DB API module of the ADBC driver for the database, or `None`, when not installed.
+    """
+    import importlib
+
+    package = ADBC_DRIVERS.get(dburi.split(":")[0].split("+")[0])
+    if package is None:
+        return None
+    try:
+        return importlib.import_module(f"{package}.dbapi")
+    except ImportError:
+        return None
+
+
+def arrow_to_sql_adbc(
+    table: "pa.Table",
+    dburi: str,
+    tablename: str,
+    schema: t.Optional[str] = None,
+    if_exists: str = "fail",
+) -> int:
+    """
+    Ingest Arrow table into database using an ADBC driver, handing over the columnar buffers to the driver.
+
+    https://arrow.apache.org/adbc/
+    """
+    import sqlalchemy as sa
+
+    driver = adbc_driver(dburi)
+    if driver is None:
+        raise ImportError(f"ADBC driver not installed for database: {dburi.split(':')[0]}")
+    url = sa.engine.make_url(dburi)
+    if url.get_backend_name() == "sqlite":
+        uri = url.database or ":memory:"
+    else:
+        uri = url.set(drivername=url.get_backend_name()).render_as_string(hide_password=False)
+    mode = {"fail": "create", "replace": "replace", "append": "create_append"}[if_exists]
+    kwargs = {"db_schema_name": schema} if schema else {}
+    with driver.connect(uri) as connection:
+        with connection.cursor() as cursor:
+            if if_exists == "fail" and table_exists_adbc(connection, tablename, schema):
+                raise ValueError(f"Table '{tablename}' already exists.")
+            rows = cursor.adbc_ingest(tablename, table, mode=mode, **kwargs)
+        connection.commit()
+    return rows
+
+
+def table_exists_adbc(connection: t.Any, tablename: str, schema: t.Optional[str] = None) -> bool:
+    from adbc_driver_manager.dbapi import Error
+
+    try:
+        connection.adbc_get_table_schema(tablename, db_schema_filter=schema)
+    except Error:
+        return False
+    return True
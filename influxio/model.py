@@ -5,7 +5,12 @@ from enum import auto
 
 from yarl import URL
 
-from influxio.util.common import AutoStrEnum, url_fullpath, url_or_path
+from influxio.util.common import AutoStrEnum, format_rfc3339, parse_duration, parse_time, url_fullpath, url_or_path
+
+if t.TYPE_CHECKING:
+    import polars as pl
+
+    from influxio.io import WindowAggregator
 
 
 @dataclasses.dataclass
@@ -22,6 +27,8 @@ class DataFormat(AutoStrEnum):
     LINE_PROTOCOL_UNCOMPRESSED = auto()
     LINE_PROTOCOL_COMPRESSED = auto()
     ANNOTATED_CSV = auto()
+    PARQUET = auto()
+    ARROW_IPC = auto()
 
     @classmethod
     def from_name(cls, path: str) -> "DataFormat":
@@ -32,6 +39,10 @@ class DataFormat(AutoStrEnum):
             return cls.LINE_PROTOCOL_COMPRESSED
         elif path.endswith(".csv"):
             return cls.ANNOTATED_CSV
+        elif path.endswith((".parquet", ".pq")):
+            return cls.PARQUET
+        elif path.endswith((".arrow", ".feather", ".ipc")):
+            return cls.ARROW_IPC
         else:
             raise ValueError(f"Unable to derive data format from file name: {path}")
 
@@ -46,6 +57,10 @@ class DataFormat(AutoStrEnum):
                 return cls.LINE_PROTOCOL_COMPRESSED
             elif format_ == "csv":
                 return cls.ANNOTATED_CSV
+            elif format_ == "parquet":
+                return cls.PARQUET
+            elif format_ in ["arrow", "feather", "ipc"]:
+                return cls.ARROW_IPC
             else:
                 raise NotImplementedError(f"Invalid data format: {format_}")
         try:
@@ -53,6 +68,13 @@ class DataFormat(AutoStrEnum):
         except ValueError as ex:
             raise ValueError(f"Unable to derive data format from URL filename or query parameter: {url}") from ex
 
+    @property
+    def is_columnar(self) -> bool:
+        """
+        Whether the format is a columnar format, read through Apache Arrow.
+        """
+        return self in [DataFormat.PARQUET, DataFormat.ARROW_IPC]
+
 
 @dataclasses.dataclass
 class OutputFile:
@@ -78,3 +100,223 @@ class OutputFile:
             return sys.stdout
         else:
             return open(self.path, "w")
+
+
+@dataclasses.dataclass
+class Selection:
+    """
+    Select a slice of data by time range, fields, and tags, to push down into data sources.
+
+    `start` and `stop` are nanoseconds since the epoch, selecting the range `[start, stop)`.
+    `fields` and `tags` select columns, `where` selects rows by tag values, where multiple
+    values of the same tag are alternatives.
+
+    In URLs, they are encoded like `?start=-1h&fields=temperature&tags=sensor&tag.region=north,south`,
+    see `parse_time` for time formats.
+    """
+
+    start: t.Optional[int] = None
+    stop: t.Optional[int] = None
+    fields: t.Optional[t.List[str]] = None
+    tags: t.Optional[t.List[str]] = None
+    where: t.Dict[str, t.List[str]] = dataclasses.field(default_factory=dict)
+
+    QUERY_PARAMETERS: t.ClassVar[t.List[str]] = ["start", "stop", "fields", "tags"]
+    TAG_PREFIX: t.ClassVar[str] = "tag."
+
+    @classmethod
+    def from_url(cls, url: t.Union[URL, str]) -> "Selection":
+        if isinstance(url, str):
+            url: URL = URL(url)
+        start = url.query.get("start")
+        stop = url.query.get("stop")
+        fields = url.query.get("fields")
+        tags = url.query.get("tags")
+        return cls(
+            start=parse_time(start) if start else None,
+            stop=parse_time(stop) if stop else None,
+            fields=fields and fields.split(",") or None,
+            tags=tags and tags.split(",") or None,
+            where={
+                name[len(cls.TAG_PREFIX) :]: value.split(",")
+                for name, value in url.query.items()
+                if name.startswith(cls.TAG_PREFIX)
+            },
+        )
+
+    @classmethod
+    def is_parameter(cls, name: str) -> bool:
+        """
+        Whether a URL query parameter is consumed by `from_url`.
+        """
+        return name in cls.QUERY_PARAMETERS or name.startswith(cls.TAG_PREFIX)
+
+    def __bool__(self) -> bool:
+        return any([self.start is not None, self.stop is not None, self.fields, self.tags, self.where])
+
+    def flux(self) -> str:
+        """
+        Render selection as Flux pipeline, to follow `from()`, with a `range()` selecting all times by default.
+        """
+        start = format_rfc3339(self.start) if self.start is not None else "0"
+        stop = format_rfc3339(self.stop) if self.stop is not None else "now()"
+        pipeline = [f"range(start: {start}, stop: {stop})"]
+        if self.fields:
+            pipeline.append(flux_filter("_field", self.fields))
+        for tag, values in self.where.items():
+            pipeline.append(flux_filter(tag, values))
+        if self.tags is not None:
+            columns = ["_start", "_stop", "_time", "_measurement", "_field", "_value", *self.tags]
+            pipeline.append(f"keep(columns: [{', '.join(flux_string(name) for name in columns)}])")
+        return "\n".join(f"|> {item}" for item in pipeline)
+
+    def matches(self, time: t.Optional[int], tags: t.Dict[str, str]) -> bool:
+        """
+        Whether a point with the given timestamp and tags is selected.
+        """
+        if self.start is not None and (time is None or time < self.start):
+            return False
+        if self.stop is not None and (time is None or time >= self.stop):
+            return False
+        return all(tags.get(tag) in values for tag, values in self.where.items())
+
+    def project(self, columns: t.Dict[str, t.Any], names: t.Optional[t.List[str]]) -> t.Dict[str, t.Any]:
+        """
+        Select columns of a point, like its tags or fields, by name.
+        """
+        if names is None:
+            return columns
+        return {name: value for name, value in columns.items() if name in names}
+
+    def apply(self, df: "pl.DataFrame", tag_columns: t.Optional[t.List[str]] = None) -> "pl.DataFrame":
+        """
+        Select rows and columns of a Polars DataFrame with `time` and `measurement` columns.
+
+        By default, all string columns are considered tags, and all other columns fields.
+        """
+        import polars as pl
+
+        if tag_columns is None:
+            tag_columns = [name for name, dtype in df.schema.items() if dtype == pl.Utf8 and name != "measurement"]
+        if "time" in df.columns:
+            time = pl.col("time")
+            if df.schema["time"].is_temporal():
+                time = time.dt.epoch("ns")
+            if self.start is not None:
+                df = df.filter(time >= self.start)
+            if self.stop is not None:
+                df = df.filter(time < self.stop)
+        for tag, values in self.where.items():
+            df = df.filter(pl.col(tag).is_in(values)) if tag in df.columns else df.clear()
+        columns = []
+        for name in df.columns:
+            if name in ["time", "measurement"]:
+                columns.append(name)
+            elif name in tag_columns:
+                if self.tags is None or name in self.tags:
+                    columns.append(name)
+            elif self.fields is None or name in self.fields:
+                columns.append(name)
+        return df.select(columns)
+
+
+@dataclasses.dataclass
+class Rollup:
+    """
+    Aggregate data into fixed time windows while transferring it, to load rollups instead of raw points.
+
+    Each of the `functions` is applied to each field, per series and window, yielding columns
+    named like `<field>_<function>`. Each duration of `windows` yields a separate result.
+    Windows are aligned to the epoch, and labeled by their start time.
+
+    In URLs, they are encoded like `?aggregate=mean,max&every=1m,1h`.
+    """
+
+    functions: t.List[str] = dataclasses.field(default_factory=list)
+    windows: t.List[str] = dataclasses.field(default_factory=list)
+
+    FUNCTIONS: t.ClassVar[t.List[str]] = ["mean", "min", "max", "sum", "count", "first", "last"]
+    QUERY_PARAMETERS: t.ClassVar[t.List[str]] = ["aggregate", "every"]
+
+    def __post_init__(self):
+        if bool(self.functions) != bool(self.windows):
+            raise ValueError("Rolling up data needs both aggregate functions and window durations")
+        unknown = [function for function in self.functions if function not in self.FUNCTIONS]
+        if unknown:
+            raise ValueError(f"Aggregate function not supported: {', '.join(unknown)}")
+        for window in self.windows:
+            parse_duration(window)
+
+    @classmethod
+    def from_url(cls, url: t.Union[URL, str]) -> "Rollup":
+        if isinstance(url, str):
+            url: URL = URL(url)
+        aggregate = url.query.get("aggregate")
+        every = url.query.get("every")
+        return cls(
+            functions=aggregate and aggregate.split(",") or [],
+            windows=every and every.split(",") or [],
+        )
+
+    @classmethod
+    def is_parameter(cls, name: str) -> bool:
+        """
+        Whether a URL query parameter is consumed by `from_url`.
+        """
+        return name in cls.QUERY_PARAMETERS
+
+    def __bool__(self) -> bool:
+        return bool(self.windows)
+
+    def table(self, name: str, window: str) -> str:
+        """
+        Name the table of a rollup, like `<name>_<window>`.
+        """
+        return f"{name}_{window}"
+
+    def flux(self, source: str, window: str) -> str:
+        """
+        Render Flux expression, aggregating the tables of `source` into windows using `aggregateWindow()`.
+        """
+        streams = [
+            f'{source} |> aggregateWindow(every: {window}, fn: {function}, createEmpty: false, timeSrc: "_start") '
+            f'|> map(fn: (r) => ({{r with _field: r._field + "_{function}"}}))'
+            for function in self.functions
+        ]
+        if len(streams) == 1:
+            return streams[0]
+        return "union(tables: [\n    " + ",\n    ".join(streams) + ",\n])"
+
+    def aggregator(self, window: str, tag_columns: t.Optional[t.List[str]] = None) -> "WindowAggregator":
+        from influxio.io import WindowAggregator
+
+        return WindowAggregator(every=parse_duration(window), functions=self.functions, tag_columns=tag_columns)
+
+    def aggregate_tables(self, frames: t.Dict[str, "pl.DataFrame"]) -> t.Dict[str, "pl.DataFrame"]:
+        """
+        Aggregate data frames by table name into one data frame per table and window duration.
+        """
+        tables = {}
+        for name, df in frames.items():
+            for window in self.windows:
+                aggregator = self.aggregator(window)
+                aggregator.add(df)
+                result = aggregator.result()
+                if not result.is_empty():
+                    tables[self.table(name, window)] = result
+        return tables
+
+
+def flux_string(value: str) -> str:
+    """
+    Encode Flux string literal.
+    """
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def flux_filter(column: str, values: t.List[str]) -> str:
+    """
+    Render Flux `filter()` call, selecting rows whose column matches any of the values.
+    """
+    predicate = " or ".join(f"r[{flux_string(column)}] == {flux_string(value)}" for value in values)
+    return f"filter(fn: (r) => {predicate})"
@@ -0,0 +1,163 @@
+import importlib
+import logging
+import typing as t
+
+from yarl import URL
+
+from influxio.util.compat import entry_points
+from influxio.util.db import get_sqlalchemy_dialects
+
+logger = logging.getLogger(__name__)
+
+
+ENTRY_POINT_GROUP = "influxio.adapters"
+
+AdapterReference = t.Union[str, t.Type[t.Any]]
+
+
+class AdapterRegistry:
+    """
+    Resolve data sources and sinks by URL scheme.
+
+    Adapters are referenced by their import path, like `influxio.adapter:FileAdapter`,
+    and imported on first use. Adapters of other packages are discovered through the
+    `influxio.adapters` entry point group, using the URL scheme as entry point name,
+    and take precedence over built-in adapters::
+
+        [project.entry-points."influxio.adapters"]
+        duckdb = "influxio_duckdb:DuckDbAdapter"
+
+    Adapters are created using `from_url(url, progress=True)`, and built-in sinks using the
+    arguments they have been registered with, see `create_sink`. Sinks implement `write_df()`
+    and `write()`, and sources implement `read_df()`. To feed the built-in sinks, sources
+    derive from `ArrowFileAdapter`, yielding Polars DataFrames.
+
+    Schemes like `crate+http` are resolved by their full name first, then by their primary
+    name. Schemes of SQLAlchemy dialects resolve to `SqlAlchemyAdapter`. The scans for
+    entry points and SQLAlchemy dialects run once per process.
+    """
+
+    DIALECT_ADAPTER = "influxio.adapter:SqlAlchemyAdapter"
+    DEFAULT_OPTIONS: t.Dict[str, t.Any] = {"progress": True}
+
+    def __init__(self, group: str = ENTRY_POINT_GROUP):
+        self.group = group
+        self.sinks: t.Dict[str, AdapterReference] = {}
+        self.sink_options: t.Dict[str, t.Dict[str, t.Any]] = {}
+        self.sources: t.Dict[str, AdapterReference] = {}
+        self.loaded: t.Dict[str, t.Type[t.Any]] = {}
+        self._entry_points: t.Optional[t.Dict[str, t.Any]] = None
+
+    def register_sink(self, scheme: str, adapter: AdapterReference, **options):
+        """
+        Register built-in sink adapter for URL scheme, created using `from_url(url, **options)`.
+        """
+        self.sinks[scheme] = adapter
+        self.sink_options[scheme] = options
+
+    def register_source(self, scheme: str, adapter: AdapterReference):
+        self.sources[scheme] = adapter
+
+    @property
+    def entry_points(self) -> t.Dict[str, t.Any]:
+        """
+        Adapters of other packages, by scheme. Only their metadata is scanned, without importing them.
+        """
+        if self._entry_points is None:
+            self._entry_points = {ep.name: ep for ep in entry_points(group=self.group)}
+            if self._entry_points:
+                logger.info(f"Discovered adapters for schemes: {', '.join(sorted(self._entry_points))}")
+        return self._entry_points
+
+    def clear(self):
+        """
+        Forget discovered entry points and SQLAlchemy dialects, to scan them again on next use.
+        """
+        self._entry_points = None
+        get_sqlalchemy_dialects.cache_clear()
+
+    def sink(self, url: t.Union[URL, str]) -> t.Type[t.Any]:
+        """
+        Resolve sink adapter for URL, or raise `NotImplementedError`.
+        """
+        return self.resolve_sink(url)[0]
+
+    def create_sink(self, url: str) -> t.Any:
+        """
+        Create sink adapter for URL, or raise `NotImplementedError`.
+        """
+        adapter, options = self.resolve_sink(url)
+        return adapter.from_url(url, **options)
+
+    def resolve_sink(self, url: t.Union[URL, str]) -> t.Tuple[t.Type[t.Any], t.Dict[str, t.Any]]:
+        """
+        Resolve sink adapter for URL, and the arguments for creating it, or raise `NotImplementedError`.
+        """
+        url = URL(str(url))
+        adapter = self.resolve(url.scheme, {}, role="write")
+        options = self.DEFAULT_OPTIONS
+        if adapter is None:
+            for scheme in self.schemes(url.scheme):
+                if scheme in self.sinks:
+                    adapter = self.load(self.sinks[scheme])
+                    options = self.sink_options[scheme]
+                    break
+        if adapter is None and url.scheme.split("+")[0] in get_sqlalchemy_dialects():
+            adapter = self.load(self.DIALECT_ADAPTER)
+        if adapter is None:
+            raise NotImplementedError(f"Data sink not implemented: {url}")
+        return adapter, dict(options)
+
+    def source(self, url: t.Union[URL, str]) -> t.Optional[t.Type[t.Any]]:
+        """
+        Resolve registered source adapter for URL, or return `None`.
+
+        Built-in sources are dispatched by `influxio.core.copy`, because they depend on the data format, too.
+        """
+        url = URL(str(url))
+        return self.resolve(url.scheme, self.sources, role="read_df")
+
+    @staticmethod
+    def schemes(scheme: str) -> t.List[str]:
+        """
+        Candidate names of a scheme, i.e. its full name, and its primary name.
+        """
+        schemes = [scheme]
+        if "+" in scheme:
+            schemes.append(scheme.split("+")[0])
+        return schemes
+
+    def resolve(self, scheme: str, builtins: t.Dict[str, AdapterReference], role: str) -> t.Optional[t.Type[t.Any]]:
+        schemes = self.schemes(scheme)
+        for name in schemes:
+            if name in self.entry_points:
+                adapter = self.load(self.entry_points[name])
+                # Adapters of other packages may implement only one role.
+                if hasattr(adapter, role):
+                    return adapter
+        for name in schemes:
+            if name in builtins:
+                return self.load(builtins[name])
+        return None
+
+    def load(self, reference: t.Union[AdapterReference, t.Any]) -> t.Type[t.Any]:
+        """
+        Import adapter from entry point or import path, once.
+        """
+        if isinstance(reference, type):
+            return reference
+        key = getattr(reference, "value", reference)
+        if key not in self.loaded:
+            logger.debug(f"Loading adapter: {key}")
+            if isinstance(reference, str):
+                module_name, _, attribute = reference.partition(":")
+                self.loaded[key] = getattr(importlib.import_module(module_name), attribute)
+            else:
+                self.loaded[key] = reference.load()
+        return self.loaded[key]
+
+
+registry = AdapterRegistry()
+registry.register_sink("http", "influxio.adapter:InfluxDbApiAdapter")
+registry.register_sink("https", "influxio.adapter:InfluxDbApiAdapter")
+registry.register_sink("file", "influxio.adapter:FileAdapter", progress=True)
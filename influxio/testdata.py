@@ -1,13 +1,25 @@
+import contextlib
+import dataclasses
+import functools
+import gzip
+import io
 import logging
+import math
+import multiprocessing
+import os
 import random
 import typing as t
 from collections import OrderedDict
 from inspect import signature
+from pathlib import Path
 
 import numpy as np
-import pandas as pd
-from pandas.io.formats.info import DataFrameInfo
-from pueblo.testing.pandas import makeMixedDataFrame, makeTimeDataFrame
+import polars as pl
+
+from influxio.util.common import DURATION_UNITS, parse_duration, parse_time
+
+if t.TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +32,9 @@ class DataFrameFactory:
         self.rows = int(rows)
         self.columns = int(columns)
 
-    def make(self, which: str, **options) -> pd.DataFrame:
+    def make(self, which: str, **options) -> "pd.DataFrame":
+        from pandas.io.formats.info import DataFrameInfo
+
         fun: t.Callable = getattr(self, f"make_{which}")
         sig = signature(fun)
 
@@ -41,22 +55,30 @@ class DataFrameFactory:
         return df
 
     @staticmethod
-    def make_dummy() -> pd.DataFrame:
+    def make_dummy() -> "pd.DataFrame":
+        import pandas as pd
+
         records = [{"foo": "baz", "bar": "qux"}]
         return pd.DataFrame.from_records(records)
 
     @staticmethod
-    def make_mixed() -> pd.DataFrame:
+    def make_mixed() -> "pd.DataFrame":
+        from pueblo.testing.pandas import makeMixedDataFrame
+
         return makeMixedDataFrame()
 
-    def make_dateindex(self) -> pd.DataFrame:
+    def make_dateindex(self) -> "pd.DataFrame":
+        from pueblo.testing.pandas import makeTimeDataFrame
+
         return makeTimeDataFrame(nper=self.rows, freq="s")
 
     @staticmethod
-    def make_wide(rows: int = default_rows_count, columns: int = 99) -> pd.DataFrame:
+    def make_wide(rows: int = default_rows_count, columns: int = 99) -> "pd.DataFrame":
         """
         https://github.com/influxdata/influxdb-client-python/blob/master/examples/ingest_large_dataframe.py
         """
+        import pandas as pd
+
         col_data = {
             "time": np.arange(0, rows, 1, dtype=int),
             "tag": np.random.choice(["tag_a", "tag_b", "test_c"], size=(rows,)),
@@ -66,3 +88,428 @@ class DataFrameFactory:
 
         data_frame = pd.DataFrame(data=col_data).set_index("time")
         return data_frame
+
+
+DEFAULT_SYNTHETIC_START = "2024-01-01T00:00:00+00:00"
+
+# Distributions of points across series.
+SERIES_DISTRIBUTIONS = ["roundrobin", "uniform", "zipf"]
+
+# Field types, and values of string fields.
+FIELD_TYPES = ["float", "int", "bool", "string"]
+STRING_FIELD_VALUES = ["ok", "warning", "critical", "unknown"]
+
+# Tag and field of anomalous points.
+ANOMALY_TAG = "anomaly"
+ANOMALY_FIELD = "anomaly_value"
+
+# Presets reproducing the shapes of the line protocol files in `tests/testdata` at scale.
+SYNTHETIC_SHAPES: t.Dict[str, t.Dict[str, t.Any]] = {
+    # Like `air-sensor-data-irregular.lp`: Sensors reporting all fields at the same time.
+    # A few points include an additional tag and field.
+    "air-sensor": {
+        "measurements": ["airSensors"],
+        "tags": ["sensor_id"],
+        "fields": ["temperature:float", "humidity:float", "co:float"],
+        "series": 1_000,
+        "interval": 10 * DURATION_UNITS["s"],
+        "align": True,
+        "anomalies": 0.001,
+    },
+    # Like `industrial.lp`: Plant measurements without tags, and a single field per point,
+    # using non-ASCII measurement names, field names including spaces, and irregular timestamps.
+    "industrial": {
+        "measurements": ["Füllstände", "Gasanalyse", "Stromproduktion"],
+        "tags": [],
+        "fields": [
+            "Endlager:float",
+            "Gassack:float",
+            "Kellerwasser:float",
+            "Fermenter H2:int",
+            "Fermenter H2S:int",
+            "MAN 1:float",
+            "MAN 2:float",
+        ],
+        "series": 21,
+        "interval": 30 * DURATION_UNITS["s"],
+        "sparse": True,
+        "jitter": 0.5,
+        "out_of_order": 0.1,
+    },
+}
+
+
+@dataclasses.dataclass
+class SyntheticChunk:
+    """
+    Raw data of a chunk of synthetic points.
+    """
+
+    series_id: np.ndarray
+    time: np.ndarray
+    fields: t.List[pl.Series]
+    anomalies: t.Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.series_id)
+
+
+@dataclasses.dataclass
+class SyntheticDataGenerator:
+    """
+    Generate synthetic time series data in chunks, using vectorized operations.
+
+    `rows` points are distributed across `series` distinct series, each identified by a
+    combination of values of the `tags`, and assigned to one of the `measurements` in turn.
+    The `distribution` of points across series is either `roundrobin`, where each series
+    gets a point per `interval`, `uniform`, picking series at random, or `zipf`, where a
+    few series receive most of the points. `fields` lists the types of field columns, out
+    of `float`, `int`, `bool`, and `string`, optionally prefixed with their names, like
+    `temperature:float`. When `sparse`, each point only carries a single field, selected
+    per series. `anomalies` is the fraction of points carrying an additional tag and field.
+
+    Timestamps start at `start`, and advance by `interval` nanoseconds per round of points
+    across all series. When `align`ed, all series share the same timestamp per round.
+    `jitter` displaces timestamps randomly, by at most this fraction of `interval`.
+    `out_of_order` is the fraction of points per chunk whose timestamps are shuffled,
+    to emulate late arrivals.
+
+    Each chunk is generated from its own random seed, derived from `seed` and its index,
+    so data is reproducible, and chunks can be generated independently of each other.
+
+    Usage::
+
+        generator = SyntheticDataGenerator(rows=10_000_000, series=1_000)
+        for df in generator.frames():
+            ...
+    """
+
+    rows: int = default_rows_count
+    series: int = 100
+    tags: t.List[str] = dataclasses.field(default_factory=lambda: ["host", "region"])
+    fields: t.List[str] = dataclasses.field(default_factory=lambda: ["float", "float", "int"])
+    distribution: str = "roundrobin"
+    measurements: t.List[str] = dataclasses.field(default_factory=lambda: ["synthetic"])
+    start: t.Optional[int] = None
+    interval: int = DURATION_UNITS["s"]
+    align: bool = False
+    jitter: float = 0.0
+    out_of_order: float = 0.0
+    sparse: bool = False
+    anomalies: float = 0.0
+    chunk_size: int = 100_000
+    seed: int = 42
+
+    def __post_init__(self):
+        if self.distribution not in SERIES_DISTRIBUTIONS:
+            raise ValueError(f"Unknown series distribution: {self.distribution}")
+        if not self.fields:
+            raise ValueError("Parameter `fields` must not be empty")
+        if not self.measurements:
+            raise ValueError("Parameter `measurement` must not be empty")
+        for _, field_type in self.field_types:
+            if field_type not in FIELD_TYPES:
+                raise ValueError(f"Unknown field type: {field_type}")
+        if self.rows < 0 or self.series < 1 or self.chunk_size < 1:
+            raise ValueError("Parameters `series` and `chunk-size` must be positive, `rows` must not be negative")
+        if self.start is None:
+            self.start = parse_time(DEFAULT_SYNTHETIC_START)
+
+    @classmethod
+    def from_shape(cls, shape: str, **kwargs) -> "SyntheticDataGenerator":
+        """
+        Factory to create a generator using a preset of `SYNTHETIC_SHAPES`, with individual parameters overridden.
+        """
+        if shape not in SYNTHETIC_SHAPES:
+            raise ValueError(f"Unknown shape: {shape}")
+        return cls(**{**SYNTHETIC_SHAPES[shape], **kwargs})
+
+    @classmethod
+    def from_url(cls, url: t.Any) -> "SyntheticDataGenerator":
+        """
+        Factory to create a generator from a `testdata://synthetic/` URL and its query parameters.
+
+        Lists are separated by commas, durations use units like `ms` or `s`,
+        and the start timestamp is in RFC 3339 format, nanoseconds, or relative to now, like `-1h`.
+        """
+        query = url.query
+        kwargs: t.Dict[str, t.Any] = {}
+        for name in ["rows", "series", "chunk-size", "seed"]:
+            if name in query:
+                kwargs[name.replace("-", "_")] = int(query[name])
+        for name in ["jitter", "out-of-order", "anomalies"]:
+            if name in query:
+                kwargs[name.replace("-", "_")] = float(query[name])
+        for name in ["align", "sparse"]:
+            if name in query:
+                kwargs[name] = query[name].lower() in ["true", "1", "yes"]
+        for name in ["tags", "fields"]:
+            if name in query:
+                kwargs[name] = [item for item in query[name].split(",") if item]
+        if "measurement" in query:
+            kwargs["measurements"] = [item for item in query["measurement"].split(",") if item]
+        if "distribution" in query:
+            kwargs["distribution"] = query["distribution"]
+        if "start" in query:
+            kwargs["start"] = parse_time(query["start"])
+        if "interval" in query:
+            kwargs["interval"] = parse_duration(query["interval"])
+        if "shape" in query:
+            return cls.from_shape(query["shape"], **kwargs)
+        return cls(**kwargs)
+
+    @property
+    def chunk_count(self) -> int:
+        return math.ceil(self.rows / self.chunk_size)
+
+    @property
+    def field_types(self) -> t.List[t.Tuple[str, str]]:
+        """
+        Names and types of fields. Unnamed fields are named by their type and a counter, like `float0`.
+        """
+        result = []
+        counters: t.Dict[str, int] = {}
+        for spec in self.fields:
+            name, _, field_type = spec.rpartition(":")
+            if not name:
+                name = f"{field_type}{counters.setdefault(field_type, 0)}"
+                counters[field_type] += 1
+            result.append((name, field_type))
+        return result
+
+    @property
+    def tag_columns(self) -> t.List[str]:
+        """
+        Names of all tag columns of generated frames, including the tag marking anomalies.
+        """
+        if self.anomalies:
+            return self.tags + [ANOMALY_TAG]
+        return self.tags
+
+    @property
+    def tag_cardinality(self) -> int:
+        """
+        Number of distinct values per tag, so the combinations of tag values cover all series.
+        """
+        if not self.tags:
+            return 1
+        cardinality = max(math.ceil(self.series ** (1 / len(self.tags))), 1)
+        # Compensate for floating point imprecision of the root.
+        while cardinality ** len(self.tags) < self.series:
+            cardinality += 1
+        return cardinality
+
+    @functools.cached_property
+    def series_keys(self) -> t.List[str]:
+        """
+        Series keys in line protocol, i.e. measurement and tag set, escaped, by series identifier.
+        """
+        from influxio.io import _escape_name
+
+        measurements = [name.replace(",", "\\,").replace(" ", "\\ ") for name in self.measurements]
+        keys = []
+        for series_id in range(self.series):
+            key = measurements[series_id % len(measurements)]
+            for name, value in zip(self.tags, self.tag_values(series_id)):
+                key += f",{_escape_name(name)}={_escape_name(value)}"
+            keys.append(key)
+        return keys
+
+    def tag_values(self, series_id: t.Any) -> t.List[t.Any]:
+        """
+        Decompose series identifiers into tag values, like a number into its digits.
+        """
+        cardinality = self.tag_cardinality
+        digits = [series_id // cardinality**exponent % cardinality for exponent in range(len(self.tags))]
+        if isinstance(series_id, int):
+            return [f"{name}-{digit}" for name, digit in zip(self.tags, digits)]
+        return [
+            pl.Series(name, [f"{name}-{value}" for value in range(cardinality)], dtype=pl.Utf8).gather(digit)
+            for name, digit in zip(self.tags, digits)
+        ]
+
+    def frames(self) -> t.Generator[pl.DataFrame, None, None]:
+        """
+        Generate all chunks as Polars DataFrames.
+        """
+        for index in range(self.chunk_count):
+            yield self.frame(index)
+
+    def lineprotocol(self) -> t.Generator[bytes, None, None]:
+        """
+        Generate all chunks as InfluxDB line protocol, encoded to bytes.
+        """
+        for index in range(self.chunk_count):
+            yield self.lineprotocol_chunk(index)
+
+    def frame(self, index: int) -> pl.DataFrame:
+        """
+        Generate a single chunk as Polars DataFrame, with `measurement`, `time`, tag, and field columns.
+        """
+        chunk = self.generate(index)
+        measurements = pl.Series("measurement", self.measurements, dtype=pl.Utf8)
+        columns = [
+            measurements.gather(chunk.series_id % len(self.measurements)),
+            pl.Series("time", chunk.time, dtype=pl.Int64).cast(pl.Datetime("ns")),
+        ]
+        columns += self.tag_values(chunk.series_id)
+        if chunk.anomalies is not None:
+            columns.append(with_nulls(pl.Series(ANOMALY_TAG, ["true"] * len(chunk), dtype=pl.Utf8), chunk.anomalies))
+        return pl.DataFrame(columns + chunk.fields)
+
+    def lineprotocol_chunk(self, index: int) -> bytes:
+        """
+        Generate a single chunk as InfluxDB line protocol, encoded to bytes, including a trailing newline.
+
+        Instead of encoding tags per point, the series keys are computed once, and looked up per point.
+        """
+        from influxio.io import lineprotocol_field_set
+
+        chunk = self.generate(index)
+        if not len(chunk):
+            return b""
+        df = pl.DataFrame([pl.Series("__key", self.series_keys, dtype=pl.Utf8).gather(chunk.series_id)] + chunk.fields)
+        key = pl.col("__key")
+        if chunk.anomalies is not None:
+            key = pl.when(pl.lit(pl.Series(chunk.anomalies))).then(key + f",{ANOMALY_TAG}=true").otherwise(key)
+        line = pl.concat_str(
+            [
+                key,
+                pl.lit(" "),
+                lineprotocol_field_set(df, [field.name for field in chunk.fields]),
+                pl.lit(" "),
+                pl.Series(chunk.time).cast(pl.Utf8),
+            ]
+        )
+        buffer = io.BytesIO()
+        df.select(line).write_csv(buffer, include_header=False, quote_style="never")
+        return buffer.getvalue()
+
+    def generate(self, index: int) -> SyntheticChunk:
+        """
+        Generate series identifiers, timestamps in nanoseconds, and field values of a single chunk.
+        """
+        offset = index * self.chunk_size
+        size = max(min(self.chunk_size, self.rows - offset), 0)
+        rng = np.random.default_rng([self.seed, index])
+        position = np.arange(offset, offset + size, dtype=np.int64)
+
+        # Assign points to series.
+        if self.distribution == "roundrobin":
+            series_id = position % self.series
+        elif self.distribution == "uniform":
+            series_id = rng.integers(0, self.series, size=size)
+        else:
+            series_id = (rng.zipf(1.5, size=size) - 1) % self.series
+
+        # Compute timestamps, without overflowing for large positions.
+        rounds, remainder = np.divmod(position, self.series)
+        time = self.start + rounds * self.interval
+        if not self.align:
+            time += remainder * self.interval // self.series
+        if self.jitter:
+            displacement = int(self.jitter * self.interval)
+            time += rng.integers(-displacement, displacement + 1, size=size)
+        if self.out_of_order and size:
+            selected = rng.choice(size, size=int(round(self.out_of_order * size)), replace=False)
+            time[selected] = time[rng.permutation(selected)]
+
+        # Generate field values. Float fields fluctuate around a baseline per series.
+        fields = []
+        field_types = self.field_types
+        for name, field_type in field_types:
+            if field_type == "float":
+                baseline = np.random.default_rng([self.seed, len(fields), self.series]).uniform(0, 100, self.series)
+                values = baseline[series_id] + rng.standard_normal(size)
+            elif field_type == "int":
+                values = rng.integers(0, 1_000, size=size)
+            elif field_type == "bool":
+                values = rng.random(size) < 0.5
+            else:
+                values = pl.Series(STRING_FIELD_VALUES, dtype=pl.Utf8).gather(
+                    rng.integers(0, len(STRING_FIELD_VALUES), size=size)
+                )
+            field = pl.Series(name, values)
+            if self.sparse:
+                field = with_nulls(field, series_id % len(field_types) == len(fields))
+            fields.append(field)
+
+        anomalies = None
+        if self.anomalies:
+            anomalies = rng.random(size) < self.anomalies
+            fields.append(with_nulls(pl.Series(ANOMALY_FIELD, rng.uniform(0, 10, size)), anomalies))
+
+        return SyntheticChunk(series_id=series_id, time=time, fields=fields, anomalies=anomalies)
+
+
+def with_nulls(series: pl.Series, mask: np.ndarray) -> pl.Series:
+    """
+    Replace values of series with nulls, where the mask is false.
+    """
+    return pl.select(pl.when(pl.lit(pl.Series(mask))).then(pl.lit(series))).to_series().alias(series.name)
+
+
+def write_lineprotocol(
+    generator: SyntheticDataGenerator,
+    path: t.Union[Path, str],
+    processes: t.Optional[int] = None,
+    compresslevel: int = 6,
+) -> int:
+    """
+    Write synthetic data to a line protocol file, generating chunks in parallel worker processes.
+
+    Chunks are written in order, so the output only depends on the generator's parameters.
+    Paths ending with `.gz` are compressed using gzip. Worker processes compress each chunk
+    as a separate gzip member, and members concatenate to a valid gzip file. Compressed output
+    omits modification times, so it is reproducible, too.
+
+    Returns the number of bytes written, before compression.
+    """
+    from influxio.util.metrics import get_metrics
+
+    metrics = get_metrics()
+    compress = str(path).endswith(".gz")
+    processes = processes or os.cpu_count() or 1
+    logger.info(f"Writing synthetic line protocol to {path}. chunks={generator.chunk_count}, processes={processes}")
+    size = 0
+    with contextlib.ExitStack() as stack:
+        if processes > 1 and generator.chunk_count > 1:
+            # Use the `spawn` start method, because forking processes using Polars can deadlock.
+            context = multiprocessing.get_context("spawn")
+            pool = stack.enter_context(
+                context.Pool(
+                    processes=processes, initializer=_init_worker, initargs=(generator, compress, compresslevel)
+                )
+            )
+            chunks = pool.imap(_encode_chunk, range(generator.chunk_count))
+        else:
+            _init_worker(generator, compress, compresslevel)
+            chunks = map(_encode_chunk, range(generator.chunk_count))
+        output = stack.enter_context(open(path, "wb"))
+        for rows, length, data in metrics.iterate(chunks, "transform", consumer="write", rows=lambda item: item[0]):
+            with metrics.measure("write", rows=rows, bytes=len(data)):
+                output.write(data)
+            size += length
+        with metrics.measure("commit"):
+            output.flush()
+    return size
+
+
+_worker: t.Dict[str, t.Any] = {}
+
+
+def _init_worker(generator: SyntheticDataGenerator, compress: bool, compresslevel: int):
+    _worker.update(generator=generator, compress=compress, compresslevel=compresslevel)
+
+
+def _encode_chunk(index: int) -> t.Tuple[int, int, bytes]:
+    """
+    Generate chunk as line protocol, and optionally compress it. Returns rows, uncompressed size, and data.
+    """
+    generator: SyntheticDataGenerator = _worker["generator"]
+    data = generator.lineprotocol_chunk(index)
+    length = len(data)
+    if _worker["compress"]:
+        data = gzip.compress(data, compresslevel=_worker["compresslevel"], mtime=0)
+    rows = max(min(generator.chunk_size, generator.rows - index * generator.chunk_size), 0)
+    return rows, length, data
@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import os
+import typing as t
+import uuid
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CACHE_MAX_SIZE = 10 * 1024**3
+
+# Metadata fields of `fsspec` filesystems identifying a revision of a resource, in order of preference.
+REVISION_FIELDS = ["ETag", "etag", "Content-MD5", "Last-Modified", "LastModified", "last_modified", "mtime"]
+
+
+class ResourceCache:
+    """
+    Cache remote resources in a local directory, with size-bounded LRU eviction.
+
+    Entries are keyed on the resource URL, and its revision, i.e. the ETag or
+    Last-Modified metadata reported by the server. When the resource changes
+    on the server, a new entry is created, and the old one will eventually be
+    evicted. Access times are tracked using the modification time of the files.
+
+    Resources without any revision metadata are not cached, because changes on the
+    server could not be detected. When `unversioned` is enabled, they are cached,
+    keyed on their size instead, so changes keeping the size go unnoticed.
+    """
+
+    def __init__(
+        self, directory: t.Union[Path, str], max_size: int = DEFAULT_CACHE_MAX_SIZE, unversioned: bool = False
+    ):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.unversioned = unversioned
+
+    @classmethod
+    def from_env(cls) -> t.Optional["ResourceCache"]:
+        """
+        Factory to create a `ResourceCache`, when enabled by environment variables.
+
+        - INFLUXIO_CACHE_DIR: Directory for cached resources. Caching is disabled when not set.
+        - INFLUXIO_CACHE_MAX_SIZE: Maximum size of the cache, in bytes, or using a K, M, G, T suffix.
+        - INFLUXIO_CACHE_UNVERSIONED: Also cache resources without revision metadata, keyed on their size.
+        """
+        directory = os.environ.get("INFLUXIO_CACHE_DIR")
+        if not directory:
+            return None
+        max_size = os.environ.get("INFLUXIO_CACHE_MAX_SIZE")
+        return cls(
+            directory=directory,
+            max_size=max_size and parse_size(max_size) or DEFAULT_CACHE_MAX_SIZE,
+            unversioned=os.environ.get("INFLUXIO_CACHE_UNVERSIONED", "").lower() in ["true", "1", "yes"],
+        )
+
+    def key(self, url: str, info: t.Dict[str, t.Any]) -> t.Optional[str]:
+        """
+        Compute cache key from resource URL and revision metadata.
+
+        Returns `None` when the resource has no revision metadata, unless caching unversioned resources.
+        """
+        revision = next((str(info[field]) for field in REVISION_FIELDS if info.get(field)), None)
+        if revision is None:
+            if not self.unversioned:
+                return None
+            revision = str(info.get("size"))
+        digest = hashlib.sha256(f"{url}\n{revision}".encode("utf-8")).hexdigest()
+        suffixes = "".join(Path(url.split("?")[0]).suffixes[-2:])
+        return f"{digest}{suffixes}"
+
+    def get(self, fs: t.Any, fs_path: str, url: str) -> t.Optional[Path]:
+        """
+        Return path to local copy of remote resource, downloading it when needed.
+
+        Returns `None` when the resource can not be cached, because it has no revision metadata.
+        """
+        info = fs.info(fs_path)
+        key = self.key(url, info)
+        if key is None:
+            logger.warning(
+                f"Not caching resource without ETag or Last-Modified metadata. "
+                f"Set INFLUXIO_CACHE_UNVERSIONED=true to cache it keyed on its size. url={url}"
+            )
+            return None
+        path = self.directory / key
+        if path.exists():
+            logger.info(f"Using cached resource. url={url}, path={path}")
+            os.utime(path)
+            return path
+
+        logger.info(f"Downloading resource to cache. url={url}, path={path}")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            fs.get_file(fs_path, str(tmp_path))
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: t.Optional[Path] = None):
+        """
+        Remove least recently used entries until the cache fits into its maximum size.
+        """
+        entries = [(path, path.stat()) for path in self.directory.iterdir() if path.is_file()]
+        entries.sort(key=lambda entry: entry[1].st_mtime)
+        size = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if size <= self.max_size:
+                break
+            if path == keep or path.name.startswith("."):
+                continue
+            logger.info(f"Evicting cached resource. path={path}")
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+
+
+def parse_size(value: str) -> int:
+    """
+    Decode size in bytes, optionally using a K, M, G, or T suffix to multiply by powers of 1024.
+    """
+    value = value.strip().upper().rstrip("B").rstrip("I")
+    units = "KMGT"
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * 1024 ** (units.index(value[-1]) + 1))
+    return int(value)
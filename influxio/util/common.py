@@ -1,8 +1,11 @@
+import datetime as dt
 import json
 import logging
+import re
 import shlex
 import subprocess
 import sys
+import time
 import typing as t
 from enum import Enum
 from textwrap import dedent
@@ -54,6 +57,35 @@ def run_command(command: str) -> subprocess.CompletedProcess:
         return output
 
 
+def stream_command(command: str) -> t.Generator[bytes, None, None]:
+    """
+    Run command, and yield the lines of its standard output while it is running.
+    """
+    import tempfile
+
+    command = dedent(command).strip()
+    cmd = shlex.split(command)
+    logger.info(f"Running command: {command}")
+    # Spool stderr to a file, so the process can not block on a full pipe while stdout is being consumed.
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)  # noqa: S603
+        try:
+            yield from process.stdout
+        except GeneratorExit:
+            # The consumer stopped reading early.
+            process.terminate()
+            raise
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode("utf-8")
+            logger.error(f"Command failed (exit code {returncode}). The command was:\n{command}")
+            logger.error(message)
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=message)
+
+
 class AutoStrEnum(str, Enum):
     """
     StrEnum where enum.auto() returns the field name.
@@ -77,3 +109,64 @@ def url_fullpath(url: URL):
 
 def url_or_path(url: URL):
     return url.host or url.path
+
+
+def parse_rfc3339(value: str) -> int:
+    """
+    Decode RFC 3339 timestamp into nanoseconds since the epoch, keeping fractional seconds up to nanoseconds.
+    """
+    match = re.match(r"^(.+?)(?:\.(\d+))?(Z|[+-]\d{2}:\d{2})?$", value.strip())
+    if match is None:
+        raise ValueError(f"Invalid timestamp: {value}")
+    base, fraction, offset = match.groups()
+    timestamp = dt.datetime.fromisoformat(base + (offset or "Z").replace("Z", "+00:00"))
+    if timestamp.tzinfo is None:  # pragma: nocover
+        timestamp = timestamp.replace(tzinfo=dt.timezone.utc)
+    seconds = (timestamp - dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)) // dt.timedelta(seconds=1)
+    return seconds * 1_000_000_000 + int((fraction or "0")[:9].ljust(9, "0"))
+
+
+def format_rfc3339(value: int) -> str:
+    """
+    Encode nanoseconds since the epoch into RFC 3339 timestamp in UTC, keeping nanoseconds.
+    """
+    seconds, nanoseconds = divmod(value, 1_000_000_000)
+    timestamp = dt.datetime(1970, 1, 1) + dt.timedelta(seconds=seconds)
+    return f"{timestamp:%Y-%m-%dT%H:%M:%S}.{nanoseconds:09d}Z"
+
+
+# Units of durations, in nanoseconds.
+DURATION_UNITS = {
+    "ns": 1,
+    "us": 1_000,
+    "ms": 1_000_000,
+    "s": 1_000_000_000,
+    "m": 60_000_000_000,
+    "h": 3_600_000_000_000,
+    "d": 86_400_000_000_000,
+}
+
+
+def parse_duration(value: t.Union[int, str]) -> int:
+    """
+    Parse duration like `100ms` or `1s` into nanoseconds. Plain numbers are nanoseconds.
+    """
+    match = re.fullmatch(r"(\d+)(ns|us|ms|s|m|h|d)?", str(value).strip())
+    if not match:
+        raise ValueError(f"Invalid duration: {value}")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2) or "ns"]
+
+
+def parse_time(value: str) -> int:
+    """
+    Decode point in time into nanoseconds since the epoch.
+
+    Integers are nanoseconds, like in line protocol. Durations with a leading minus sign,
+    like `-1h`, are relative to now. Other values are RFC 3339 timestamps.
+    """
+    value = value.strip()
+    if re.match(r"^-?\d+$", value):
+        return int(value)
+    if value.startswith("-"):
+        return time.time_ns() - parse_duration(value[1:])
+    return parse_rfc3339(value)
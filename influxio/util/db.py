@@ -1,7 +1,13 @@
+import functools
+
+
+@functools.lru_cache(maxsize=None)
 def get_sqlalchemy_dialects():
     """
     Return list of available SQLAlchemy dialects.
 
+    The result is cached, because scanning entry points is slow.
+
     TODO: Synchronize with influxio.util.report.
     """
     import sqlalchemy.dialects
@@ -0,0 +1,336 @@
+import contextlib
+import contextvars
+import dataclasses
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import typing as t
+from collections import OrderedDict
+from pathlib import Path
+
+# Stages of a data transfer, in pipeline order.
+STAGES = ["read", "decode", "transform", "write", "commit"]
+
+_active: "contextvars.ContextVar[t.Optional[Metrics]]" = contextvars.ContextVar("influxio_metrics", default=None)
+
+
+@dataclasses.dataclass
+class StageMetrics:
+    """
+    Counters of a single pipeline stage.
+
+    `duration` is the time the stage was busy, and `blocked` is the time it was waiting
+    for another stage, i.e. for input from its producer, or for its consumer to accept
+    output. For I/O stages, `bytes` counts raw bytes, otherwise the in-memory size of
+    data frames. `memory_peak` is the maximum of memory allocated by a single batch of
+    work, only recorded while `tracemalloc` is tracing, i.e. when profiling.
+    """
+
+    name: str
+    rows: int = 0
+    bytes: int = 0
+    batches: int = 0
+    duration: float = 0.0
+    blocked: float = 0.0
+    memory_peak: int = 0
+
+    def add(self, rows: int = 0, bytes: int = 0, batches: int = 1):  # noqa: A002
+        self.rows += rows
+        self.bytes += bytes
+        self.batches += batches
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        data = dataclasses.asdict(self)
+        data["duration"] = round(self.duration, 6)
+        data["blocked"] = round(self.blocked, 6)
+        data["rows_per_second"] = self.duration and round(self.rows / self.duration, 1)
+        return data
+
+
+class MemoryTracker:
+    """
+    Track peak memory allocated within possibly nested windows of time, using `tracemalloc`.
+
+    `tracemalloc` only maintains a single global peak value. Before resetting it when a
+    window opens, the current peak is propagated to all windows already open.
+
+    Memory is traced process-wide, so windows opened by concurrent threads, like pipeline
+    stages, or tables loaded concurrently, also account for allocations of other threads.
+    Windows are opened and closed under a lock, so they are consistent nevertheless.
+    """
+
+    def __init__(self):
+        self.windows: t.List[t.List[int]] = []
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        # `tracemalloc.reset_peak` is available on Python 3.9 and newer.
+        return tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak")
+
+    def open(self) -> t.Optional[t.List[int]]:
+        if not self.enabled:
+            return None
+        with self.lock:
+            current, peak = tracemalloc.get_traced_memory()
+            for window in self.windows:
+                window[1] = max(window[1], peak)
+            tracemalloc.reset_peak()
+            window = [current, current]
+            self.windows.append(window)
+            return window
+
+    def close(self, window: t.Optional[t.List[int]]) -> int:
+        if window is None:
+            return 0
+        with self.lock:
+            # Windows are compared by identity, because their values may be equal.
+            index = next((index for index, item in enumerate(self.windows) if item is window), None)
+            if index is None:
+                return 0
+            del self.windows[index]
+            _, peak = tracemalloc.get_traced_memory()
+            return max(window[1], peak) - window[0]
+
+
+# Process-wide, like `tracemalloc`, see `MemoryTracker`.
+memory_tracker = MemoryTracker()
+
+
+class Metrics:
+    """
+    Collect throughput metrics per pipeline stage of a data transfer.
+
+    Adapters report to the collector activated by the caller, obtained using
+    `get_metrics()`. When no collector is active, recording is a no-op, and
+    `iterate()` returns the iterable unwrapped, so there is no overhead.
+
+    Usage::
+
+        metrics = Metrics()
+        with metrics.activate():
+            influxio.core.copy(source, target)
+        print(metrics.to_json())
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages: t.Dict[str, StageMetrics] = OrderedDict()
+        self.started: t.Optional[float] = None
+        self.finished: t.Optional[float] = None
+
+    def stage(self, name: str) -> StageMetrics:
+        # Stages may be created by concurrent workers, so use an atomic operation.
+        if name not in self.stages:
+            self.stages.setdefault(name, StageMetrics(name=name))
+        return self.stages[name]
+
+    @contextlib.contextmanager
+    def activate(self):
+        """
+        Activate collector for the current context, and measure total wall time.
+        """
+        token = _active.set(self)
+        self.started = time.time()
+        perf_started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.finished = self.started + time.perf_counter() - perf_started
+            _active.reset(token)
+
+    @contextlib.contextmanager
+    def measure(
+        self,
+        name: str,
+        rows: t.Union[int, t.Callable[[], int]] = 0,
+        bytes: t.Union[int, t.Callable[[], int]] = 0,  # noqa: A002
+    ):
+        """
+        Measure one batch of work of a stage. Time blocked meanwhile does not count as busy time.
+
+        `rows` and `bytes` can be given as callables, only called when the collector is enabled,
+        to skip computing them otherwise. Yields the `StageMetrics` instance, to count rows and
+        bytes known only after the work is done.
+        """
+        if not self.enabled:
+            yield StageMetrics(name=name)
+            return
+        if callable(rows):
+            rows = rows()
+        if callable(bytes):
+            bytes = bytes()  # noqa: A001
+        stage = self.stage(name)
+        blocked = stage.blocked
+        window = memory_tracker.open()
+        started = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.duration += time.perf_counter() - started - (stage.blocked - blocked)
+            stage.memory_peak = max(stage.memory_peak, memory_tracker.close(window))
+            stage.add(rows=rows, bytes=bytes)
+
+    def iterate(
+        self,
+        iterable: t.Iterable[t.Any],
+        name: str,
+        consumer: t.Optional[str] = None,
+        rows: t.Optional[t.Callable[[t.Any], int]] = None,
+        bytes: t.Optional[t.Callable[[t.Any], int]] = None,  # noqa: A002
+        batch: int = 1,
+    ) -> t.Iterable[t.Any]:
+        """
+        Measure a producing stage by timing each step of the iterable.
+
+        Time spent producing an item is accounted as busy time of the producer, and as
+        blocked time of the consumer. Time spent between items is accounted as blocked
+        time of the producer, waiting for the consumer.
+
+        For iterables of many small items, like lines, timing each step costs more than
+        producing the item. Using `batch`, items are pulled and timed in batches of that
+        many items, and `rows` and `bytes` are called with lists of items.
+        """
+        if not self.enabled:
+            return iterable
+        if batch > 1:
+            iterator = iter(iterable)
+            batches = iter(lambda: list(itertools.islice(iterator, batch)), [])
+            return itertools.chain.from_iterable(self._iterate(batches, name, consumer, rows, bytes))
+        return self._iterate(iterable, name, consumer, rows, bytes)
+
+    def _iterate(self, iterable, name, consumer, rows, bytes):  # noqa: A002
+        producer = self.stage(name)
+        waiting = consumer and self.stage(consumer) or None
+        iterator = iter(iterable)
+        while True:
+            window = memory_tracker.open()
+            blocked = producer.blocked
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                memory_tracker.close(window)
+                return
+            elapsed = time.perf_counter() - started
+            # Time blocked on a nested producer, like decoding batches of lines while reading them, is not busy time.
+            producer.duration += elapsed - (producer.blocked - blocked)
+            producer.memory_peak = max(producer.memory_peak, memory_tracker.close(window))
+            producer.add(rows=rows and rows(item) or 0, bytes=bytes and bytes(item) or 0)
+            if waiting is not None:
+                waiting.blocked += elapsed
+            resumed = time.perf_counter()
+            yield item
+            producer.blocked += time.perf_counter() - resumed
+
+    @property
+    def duration(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    def ordered(self) -> t.List[StageMetrics]:
+        """
+        Return stage metrics in pipeline order.
+        """
+        return sorted(self.stages.values(), key=lambda stage: STAGES.index(stage.name))
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "started": self.started,
+            "duration": round(self.duration, 6),
+            "stages": {stage.name: stage.to_dict() for stage in self.ordered()},
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Render metrics in Prometheus text exposition format.
+
+        The output is suitable for the textfile collector of the Prometheus node
+        exporter, and for submitting to a Prometheus Pushgateway.
+        """
+        lines = []
+        counters = [
+            ("rows", "rows", "Number of rows processed"),
+            ("bytes", "bytes", "Number of bytes processed"),
+            ("batches", "batches", "Number of batches processed"),
+            ("duration", "duration_seconds", "Time spent busy"),
+            ("blocked", "blocked_seconds", "Time spent waiting for other stages"),
+            ("memory_peak", "memory_peak_bytes", "Peak memory allocated by a single batch, when profiling"),
+        ]
+        for attribute, suffix, description in counters:
+            name = f"influxio_stage_{suffix}"
+            lines.append(f"# HELP {name} {description}, per stage.")
+            lines.append(f"# TYPE {name} gauge")
+            for stage in self.ordered():
+                lines.append(f'{name}{{stage="{stage.name}"}} {getattr(stage, attribute)}')
+        lines.append("# HELP influxio_copy_duration_seconds Total wall time of the transfer.")
+        lines.append("# TYPE influxio_copy_duration_seconds gauge")
+        lines.append(f"influxio_copy_duration_seconds {self.duration}")
+        lines.append("# HELP influxio_copy_finished_timestamp_seconds Time the transfer finished.")
+        lines.append("# TYPE influxio_copy_finished_timestamp_seconds gauge")
+        lines.append(f"influxio_copy_finished_timestamp_seconds {self.finished or 0}")
+        return "\n".join(lines) + "\n"
+
+    def render(self, format: str) -> str:  # noqa: A002
+        if format == "json":
+            return self.to_json() + "\n"
+        elif format == "prometheus":
+            return self.to_prometheus()
+        else:
+            raise NotImplementedError(f"Metrics format not implemented: {format}")
+
+    def write(self, format: str, output: t.Optional[str] = None):  # noqa: A002
+        """
+        Write metrics to stderr, to a file, or submit them to a Prometheus Pushgateway.
+
+        Files are written atomically, as required by the Prometheus textfile collector.
+        HTTP URLs address a Pushgateway grouping key, like `http://localhost:9091/metrics/job/influxio`.
+        Metrics are always submitted in Prometheus format there.
+        """
+        if output is None or output == "-":
+            sys.stderr.write(self.render(format))
+        elif output.startswith(("http://", "https://")):
+            import urllib.request
+
+            request = urllib.request.Request(  # noqa: S310
+                output,
+                data=self.to_prometheus().encode("utf-8"),
+                method="PUT",
+                headers={"Content-Type": "text/plain; version=0.0.4"},
+            )
+            with urllib.request.urlopen(request, timeout=30):  # noqa: S310
+                pass
+        else:
+            path = Path(output)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(self.render(format))
+            os.replace(tmp_path, path)
+
+
+_disabled = Metrics(enabled=False)
+
+
+def dataframe_size(df: t.Any) -> int:
+    """
+    Estimate in-memory size of a pandas or Polars DataFrame, or an Arrow table, in bytes.
+    """
+    if hasattr(df, "estimated_size"):
+        return int(df.estimated_size())
+    if hasattr(df, "nbytes"):
+        return int(df.nbytes)
+    return int(df.memory_usage(index=False).sum())
+
+
+def get_metrics() -> Metrics:
+    """
+    Return the active metrics collector, or a disabled one.
+    """
+    return _active.get() or _disabled
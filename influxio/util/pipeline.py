@@ -0,0 +1,128 @@
+"""
+Run the stages of a data transfer concurrently, connected by bounded queues.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+import typing as t
+
+from influxio.util.metrics import get_metrics
+
+DEFAULT_QUEUE_DEPTH = 2
+
+# How often a producer blocked on a full queue checks whether the consumer has gone away, in seconds.
+POLL_INTERVAL = 0.1
+
+T = t.TypeVar("T")
+U = t.TypeVar("U")
+
+
+class _Done:
+    """
+    Marker for the end of the items of a producer.
+    """
+
+
+class _Failure:
+    """
+    Wrapper for an exception raised by a producer, to re-raise it within the consumer.
+    """
+
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+def pipelined(
+    iterable: t.Iterable[T],
+    depth: int = DEFAULT_QUEUE_DEPTH,
+    consumer: t.Optional[str] = None,
+    name: str = "influxio-pipeline",
+) -> t.Generator[T, None, None]:
+    """
+    Iterate over an iterable on a background thread, handing over its items through a queue of at most `depth` items.
+
+    The producer runs ahead of the consumer by up to `depth` items, so both work at the same
+    time, while the memory used for buffering stays bounded. Exceptions of the producer are
+    re-raised within the consumer. When the consumer stops iterating early, the producer
+    stops after its current item. The time the consumer waits for items is accounted as
+    blocked time of the `consumer` stage. With `depth=0`, iterate within the calling thread.
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+
+    metrics = get_metrics()
+    waiting = consumer and metrics.enabled and metrics.stage(consumer) or None
+    items: "queue.Queue[t.Any]" = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item: t.Any) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except BaseException as ex:
+            put(_Failure(ex))
+            return
+        finally:
+            # Generators must be closed within the thread running them.
+            if hasattr(iterator, "close"):
+                iterator.close()
+        put(_Done)
+
+    # Run the producer within a copy of the current context, to report to the active metrics collector.
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(produce,), name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            started = time.perf_counter()
+            item = items.get()
+            if waiting is not None:
+                waiting.blocked += time.perf_counter() - started
+            if item is _Done:
+                return
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def pipeline(
+    iterable: t.Iterable[T],
+    function: t.Callable[[T], U],
+    depth: int = DEFAULT_QUEUE_DEPTH,
+    stage: t.Optional[str] = None,
+    consumer: t.Optional[str] = None,
+) -> t.Generator[U, None, None]:
+    """
+    Apply a function to the items of an iterable, running the iterable and the function on two separate threads.
+
+    The result is a pipeline of three stages, the iterable, the function, and the consumer,
+    connected by two queues of at most `depth` items each. Throughput approaches the one of
+    the slowest stage, instead of the sum of all stages. `stage` and `consumer` name the
+    stages of the function and of the consumer, for accounting the time they are blocked.
+    """
+    items = pipelined(iterable, depth=depth, consumer=stage, name="influxio-pipeline-read")
+
+    def apply():
+        try:
+            for item in items:
+                yield function(item)
+        finally:
+            items.close()
+
+    return pipelined(apply(), depth=depth, consumer=consumer, name="influxio-pipeline-transform")
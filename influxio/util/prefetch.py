@@ -0,0 +1,127 @@
+import io
+import logging
+import os
+import typing as t
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PREFETCH_BLOCK_SIZE = 8 * 1024 * 1024
+DEFAULT_PREFETCH_CONCURRENCY = 4
+
+
+class PrefetchingReader(io.RawIOBase):
+    """
+    Read a remote resource using concurrent range requests ahead of the consumer.
+
+    The resource is divided into blocks of `block_size` bytes. When reading,
+    the reader requests the current block and the `concurrency - 1` blocks
+    after it in parallel, using the `cat_file` method of an `fsspec` filesystem.
+    Fetched blocks are kept in a least-recently-used cache of at most
+    `max_blocks` entries, which bounds the memory used for buffering.
+
+    Wrap the reader into an `io.BufferedReader` to read lines efficiently.
+    """
+
+    def __init__(
+        self,
+        fs: t.Any,
+        path: str,
+        size: int,
+        block_size: int = DEFAULT_PREFETCH_BLOCK_SIZE,
+        concurrency: int = DEFAULT_PREFETCH_CONCURRENCY,
+        max_blocks: t.Optional[int] = None,
+    ):
+        super().__init__()
+        self.fs = fs
+        self.path = path
+        self.size = size
+        self.block_size = block_size
+        self.concurrency = max(concurrency, 1)
+        self.max_blocks = max(max_blocks or 2 * self.concurrency, self.concurrency)
+        self.position = 0
+        self.blocks: t.Dict[int, Future] = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="influxio-prefetch")
+
+    @classmethod
+    def from_env(cls, fs: t.Any, path: str, size: int) -> "PrefetchingReader":
+        """
+        Factory to create a `PrefetchingReader`, configured by environment variables.
+
+        - INFLUXIO_PREFETCH_BLOCK_SIZE: Size of range requests in bytes.
+        - INFLUXIO_PREFETCH_CONCURRENCY: Number of concurrent range requests.
+        - INFLUXIO_PREFETCH_MAX_BLOCKS: Maximum number of blocks kept in memory.
+        """
+        max_blocks = os.environ.get("INFLUXIO_PREFETCH_MAX_BLOCKS")
+        return cls(
+            fs=fs,
+            path=path,
+            size=size,
+            block_size=int(os.environ.get("INFLUXIO_PREFETCH_BLOCK_SIZE", DEFAULT_PREFETCH_BLOCK_SIZE)),
+            concurrency=int(os.environ.get("INFLUXIO_PREFETCH_CONCURRENCY", DEFAULT_PREFETCH_CONCURRENCY)),
+            max_blocks=max_blocks and int(max_blocks) or None,
+        )
+
+    @property
+    def block_count(self) -> int:
+        return -(-self.size // self.block_size)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"Invalid value for whence: {whence}")
+        self.position = max(self.position, 0)
+        return self.position
+
+    def readinto(self, buffer: t.Any) -> int:
+        if self.position >= self.size:
+            return 0
+        index = self.position // self.block_size
+        self.prefetch(index)
+        data = self.blocks[index].result()
+        offset = self.position - index * self.block_size
+        count = min(len(buffer), len(data) - offset)
+        buffer[:count] = data[offset : offset + count]
+        self.position += count
+        return count
+
+    def prefetch(self, index: int):
+        """
+        Submit range requests for the block at `index`, and the blocks after it.
+        """
+        for number in range(index, min(index + self.concurrency, self.block_count)):
+            if number in self.blocks:
+                self.blocks.move_to_end(number)  # type: ignore[attr-defined]
+                continue
+            start = number * self.block_size
+            end = min(start + self.block_size, self.size)
+            self.blocks[number] = self.executor.submit(self.fs.cat_file, self.path, start=start, end=end)
+
+        # Evict least recently used blocks.
+        while len(self.blocks) > self.max_blocks:
+            _, future = self.blocks.popitem(last=False)  # type: ignore[call-arg]
+            future.cancel()
+
+    def close(self):
+        if not self.closed:
+            for future in self.blocks.values():
+                future.cancel()
+            self.blocks.clear()
+            self.executor.shutdown(wait=False)
+        super().close()
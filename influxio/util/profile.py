@@ -0,0 +1,160 @@
+import cProfile
+import json
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import typing as t
+from collections import Counter
+from pathlib import Path
+
+from influxio.util.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SAMPLING_INTERVAL = 0.005
+
+
+class StackSampler:
+    """
+    Sample the call stacks of all threads periodically, and count them in collapsed format.
+
+    The output is compatible with flame graph tools like `flamegraph.pl` and speedscope.
+    Each line represents a call stack, from the thread name to the innermost frame,
+    separated by semicolons, followed by the number of samples.
+
+    https://github.com/brendangregg/FlameGraph
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLING_INTERVAL):
+        self.interval = interval
+        self.stacks: t.Counter[str] = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="influxio-sampler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.stacks[self.collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+
+    @staticmethod
+    def collapse(thread_name: str, frame: t.Any) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            module = frame.f_globals.get("__name__", code.co_filename)
+            frames.append(f"{module}:{code.co_name}")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ";".join(reversed(frames))
+
+    def write(self, path: Path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Profile CPU time and memory allocations of a whole run, writing the results to a directory.
+
+    - `profile.pstats`: Deterministic profile of the main thread, created by `cProfile`.
+      Inspect it using `python -m pstats` or snakeviz. `profile.txt` lists the top
+      functions by cumulative time.
+    - `stacks.collapsed`: Sampled call stacks of all threads, for rendering flame graphs.
+    - `memory.json`: Peak memory allocated overall, per pipeline stage, and by the top
+      allocating source lines, traced by `tracemalloc`.
+    - `dask.json`: Timings of tasks executed by the Dask scheduler, when Dask was used.
+
+    Tracing memory allocations and profiling slows down the program considerably,
+    so absolute timings are not representative.
+    """
+
+    def __init__(self, directory: t.Union[Path, str], interval: float = DEFAULT_SAMPLING_INTERVAL):
+        self.directory = Path(directory)
+        self.metrics: t.Optional[Metrics] = None
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(interval=interval)
+        self.dask_profiler: t.Any = None
+        self.started: float = 0.0
+
+    def start(self):
+        logger.info(f"Starting profiler. Output directory: {self.directory}")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.started = time.perf_counter()
+        tracemalloc.start()
+        self.start_dask()
+        self.sampler.start()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.sampler.stop()
+        duration = time.perf_counter() - self.started
+        # Exclude allocations of the stack sampler.
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, __file__)])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.profile.dump_stats(self.directory / "profile.pstats")
+        with open(self.directory / "profile.txt", "w") as f:
+            stats = pstats.Stats(self.profile, stream=f)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(50)
+        self.sampler.write(self.directory / "stacks.collapsed")
+        self.write_memory(snapshot, peak)
+        self.write_dask()
+        logger.info(f"Profiling finished after {duration:.2f} seconds. Results written to {self.directory}")
+
+    def write_memory(self, snapshot: tracemalloc.Snapshot, peak: int):
+        stages = {}
+        if self.metrics is not None:
+            stages = {stage.name: stage.memory_peak for stage in self.metrics.ordered()}
+        top = [
+            {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:25]
+        ]
+        data = {"peak": peak, "stages": stages, "top": top}
+        (self.directory / "memory.json").write_text(json.dumps(data, indent=2))
+
+    def start_dask(self):
+        """
+        Record timings of Dask tasks, when Dask is installed.
+        """
+        try:
+            from dask.diagnostics import Profiler as DaskProfiler
+        except ImportError:  # pragma: nocover
+            return
+        self.dask_profiler = DaskProfiler()
+        self.dask_profiler.register()
+
+    def write_dask(self):
+        if self.dask_profiler is None:
+            return
+        self.dask_profiler.unregister()
+        if not self.dask_profiler.results:
+            return
+        tasks = [
+            {
+                "key": str(task.key),
+                "start": task.start_time,
+                "end": task.end_time,
+                "duration": task.end_time - task.start_time,
+                "worker": task.worker_id,
+            }
+            for task in self.dask_profiler.results
+        ]
+        (self.directory / "dask.json").write_text(json.dumps({"tasks": tasks}, indent=2))
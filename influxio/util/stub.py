@@ -0,0 +1,550 @@
+import json
+import logging
+import math
+import re
+import threading
+import time
+import typing as t
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from influxio.util.common import parse_duration, parse_rfc3339
+
+if t.TYPE_CHECKING:
+    import polars as pl
+
+logger = logging.getLogger(__name__)
+
+
+# Status, body, content type, and additional headers of a response.
+Response = t.Tuple[int, bytes, t.Optional[str], t.Dict[str, str]]
+
+PRECISION_FACTORS = {"ns": 1, "us": 1_000, "ms": 1_000_000, "s": 1_000_000_000}
+
+
+class InfluxDbStub:
+    """
+    Minimal stand-in for the InfluxDB v2 HTTP API, for benchmarking the client side of influxio.
+
+    Write requests are accepted and accounted for, but their payload is discarded.
+    Query requests are answered with a static annotated CSV response, which can
+    be assigned using the `query_response` attribute.
+
+    Usage::
+
+        with InfluxDbStub() as stub:
+            influxio.core.copy("testdata://dateindex/", f"http://example:token@{stub.address}/testdrive/demo")
+    """
+
+    ORG_ID = "0000000000000001"
+    BUCKET_ID = "0000000000000002"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.query_response: bytes = b""
+        self.write_requests = 0
+        self.write_bytes = 0
+        self.write_lines = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread: t.Optional[threading.Thread] = None
+
+    def __enter__(self) -> "InfluxDbStub":
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def address(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.address}"
+
+    def start(self):
+        logger.info(f"Starting {self.__class__.__name__} server at {self.url}")
+        self.thread = threading.Thread(target=self.server.serve_forever, name="influxio-stub", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def account_write(self, body: bytes):
+        with self.lock:
+            self.write_requests += 1
+            self.write_bytes += len(body)
+            self.write_lines += body.count(b"\n") + (not body.endswith(b"\n") and len(body) > 0)
+
+    def dispatch(self, method: str, path: str, query: t.Dict[str, str], body: bytes) -> Response:
+        """
+        Route request to the handler method of the API endpoint.
+        """
+        if method == "GET" and path == "/api/v2/orgs":
+            name = query.get("org", "example")
+            return json_response(200, {"orgs": [{"id": self.ORG_ID, "name": name}]})
+        if method == "GET" and path == "/api/v2/buckets":
+            return self.find_buckets(query)
+        if method == "GET" and path in ["/health", "/ping"]:
+            return json_response(200, {"status": "pass"})
+        if method == "POST" and path == "/api/v2/write":
+            return self.write(query, body)
+        if method == "POST" and path == "/api/v2/query":
+            return self.query(query, body)
+        if method == "POST" and path == "/api/v2/buckets":
+            return self.create_bucket(json.loads(body or b"{}"))
+        if method == "POST" and path == "/api/v2/delete":
+            return self.delete(query, json.loads(body or b"{}"))
+        if method == "DELETE" and path.startswith("/api/v2/buckets/"):
+            return self.delete_bucket(path.rsplit("/", 1)[-1])
+        return error_response(404, "not found", f"Path not found: {path}")
+
+    def write(self, query: t.Dict[str, str], body: bytes) -> Response:
+        self.account_write(body)
+        return 204, b"", None, {}
+
+    def query(self, query: t.Dict[str, str], body: bytes) -> Response:
+        return 200, self.query_response, "text/csv; charset=utf-8", {}
+
+    def find_buckets(self, query: t.Dict[str, str]) -> Response:
+        return json_response(200, {"buckets": [self.bucket(query.get("name", "default"))]})
+
+    def create_bucket(self, data: t.Dict[str, t.Any]) -> Response:
+        return json_response(201, self.bucket(data.get("name", "default")))
+
+    def delete_bucket(self, bucket_id: str) -> Response:
+        return 204, b"", None, {}
+
+    def delete(self, query: t.Dict[str, str], data: t.Dict[str, t.Any]) -> Response:
+        return 204, b"", None, {}
+
+    def bucket(self, name: str, bucket_id: t.Optional[str] = None) -> t.Dict[str, t.Any]:
+        return {"id": bucket_id or self.BUCKET_ID, "orgID": self.ORG_ID, "name": name, "retentionRules": []}
+
+    def make_handler(self) -> t.Type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002
+                pass
+
+            def do_GET(self):
+                self.handle_request("GET")
+
+            def do_POST(self):
+                self.handle_request("POST")
+
+            def do_DELETE(self):
+                self.handle_request("DELETE")
+
+            def handle_request(self, method: str):
+                url = urlparse(self.path)
+                query = {name: values[0] for name, values in parse_qs(url.query).items()}
+                body = self.read_body()
+                try:
+                    response = stub.dispatch(method, url.path, query, body)
+                except Exception as ex:
+                    logger.exception(f"Request failed: {method} {self.path}")
+                    response = error_response(500, "internal error", str(ex))
+                self.send_body(*response)
+
+            def read_body(self) -> bytes:
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length)
+
+            def send_body(
+                self,
+                status: int,
+                body: bytes,
+                content_type: t.Optional[str] = None,
+                headers: t.Optional[t.Dict[str, str]] = None,
+            ):
+                self.send_response(status)
+                if content_type:
+                    self.send_header("Content-Type", content_type)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class InfluxDbFake(InfluxDbStub):
+    """
+    In-memory stand-in for the InfluxDB v2 HTTP API, for testing and benchmarking influxio offline.
+
+    Unlike `InfluxDbStub`, it keeps the data written to it, and answers queries about it.
+
+    - `/api/v2/write` appends the payload to the bucket, as-is. Payloads are decoded
+      into a columnar store of Polars DataFrames per measurement on the next query or
+      delete request, so the cost of writing stays low while benchmarking the client.
+    - `/api/v2/query` understands the Flux queries emitted by influxio: `from`, `range`,
+      `filter` by equality of columns, combined using `and` and `or`, and `pivot` to
+      the shape of one column per field. Results are returned as annotated CSV, with
+      one table per series.
+    - `/api/v2/buckets` creates, finds, and deletes buckets.
+    - `/api/v2/delete` deletes points by time range and predicate, like
+      `_measurement="foo" AND tag="bar"`.
+
+    Injecting faults emulates the behavior of a remote server under load:
+
+    - `latency`: Delay of each response, in seconds.
+    - `bandwidth`: Maximum ingestion rate of write payloads, in bytes per second.
+      Write requests are delayed accordingly, across all connections.
+    - `throttle`: Fraction of write requests rejected with `429 Too Many Requests`,
+      asking clients to retry after `retry_after` seconds. Rejections are spread
+      evenly across requests, so runs are reproducible.
+
+    Usage::
+
+        with InfluxDbFake(latency=0.01) as fake:
+            influxio.core.copy("testdata://dateindex/", f"http://example:token@{fake.address}/testdrive/demo")
+            df = fake.table("testdrive", "demo")
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        bandwidth: t.Optional[float] = None,
+        throttle: float = 0.0,
+        retry_after: int = 1,
+    ):
+        super().__init__(host=host, port=port)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.throttled_requests = 0
+        # Bucket names by identifier.
+        self.buckets: t.Dict[str, str] = {}
+        # Undecoded write payloads and their precision, by bucket name.
+        self.pending: t.Dict[str, t.List[t.Tuple[bytes, str]]] = defaultdict(list)
+        # Points by bucket name and measurement, with a `_time` column, tags, and fields.
+        self.tables: t.Dict[str, t.Dict[str, "pl.DataFrame"]] = defaultdict(dict)
+        # Names of tag columns by bucket name and measurement.
+        self.tags: t.Dict[str, t.Dict[str, t.List[str]]] = defaultdict(dict)
+        self.available_at = 0.0
+
+    def dispatch(self, method: str, path: str, query: t.Dict[str, str], body: bytes) -> Response:
+        if self.latency:
+            time.sleep(self.latency)
+        return super().dispatch(method, path, query, body)
+
+    def bucket_id(self, name: str) -> t.Optional[str]:
+        return next((bucket_id for bucket_id, bucket in self.buckets.items() if bucket == name), None)
+
+    def find_buckets(self, query: t.Dict[str, str]) -> Response:
+        buckets = [
+            self.bucket(name, bucket_id)
+            for bucket_id, name in self.buckets.items()
+            if query.get("name") in [None, name] and query.get("id") in [None, bucket_id]
+        ]
+        return json_response(200, {"buckets": buckets})
+
+    def create_bucket(self, data: t.Dict[str, t.Any]) -> Response:
+        name = data.get("name", "default")
+        with self.lock:
+            if self.bucket_id(name) is not None:
+                return error_response(422, "conflict", f"bucket with name {name} already exists")
+            bucket_id = f"{len(self.buckets) + int(self.BUCKET_ID, 16):016x}"
+            self.buckets[bucket_id] = name
+        return json_response(201, self.bucket(name, bucket_id))
+
+    def delete_bucket(self, bucket_id: str) -> Response:
+        with self.lock:
+            name = self.buckets.pop(bucket_id, None)
+            if name is None:
+                return error_response(404, "not found", "bucket not found")
+            self.pending.pop(name, None)
+            self.tables.pop(name, None)
+            self.tags.pop(name, None)
+        return 204, b"", None, {}
+
+    def write(self, query: t.Dict[str, str], body: bytes) -> Response:
+        bucket = query.get("bucket", "")
+        precision = query.get("precision", "ns")
+        if precision not in PRECISION_FACTORS:
+            return error_response(400, "invalid", f"invalid precision value: {precision}")
+        with self.lock:
+            if self.bucket_id(bucket) is None:
+                return error_response(404, "not found", f'bucket "{bucket}" not found')
+            if self.is_throttled():
+                self.throttled_requests += 1
+                headers = {"Retry-After": str(self.retry_after)}
+                return error_response(429, "too many requests", "write rate limit exceeded", headers=headers)
+            delay = self.reserve_bandwidth(len(body))
+            self.pending[bucket].append((body, precision))
+        if delay:
+            time.sleep(delay)
+        self.account_write(body)
+        return 204, b"", None, {}
+
+    def is_throttled(self) -> bool:
+        """
+        Whether to reject the current write request, so that `throttle` is the fraction of rejected requests.
+        """
+        count = self.write_requests + self.throttled_requests
+        return math.ceil((count + 1) * self.throttle) > math.ceil(count * self.throttle)
+
+    def reserve_bandwidth(self, size: int) -> float:
+        """
+        Reserve transfer time for a write payload, and return the delay until it has been ingested, in seconds.
+        """
+        if not self.bandwidth:
+            return 0.0
+        now = time.monotonic()
+        self.available_at = max(self.available_at, now) + size / self.bandwidth
+        return self.available_at - now
+
+    def query(self, query: t.Dict[str, str], body: bytes) -> Response:
+        try:
+            flux = json.loads(body)["query"]
+        except (ValueError, KeyError):
+            flux = body.decode("utf-8")
+        match = re.search(r'from\(\s*bucket\s*:\s*"([^"]+)"\s*\)', flux)
+        if match is None:
+            return error_response(400, "invalid", "query must start with a `from` call naming a bucket")
+        bucket = match.group(1)
+        if self.bucket_id(bucket) is None:
+            return error_response(404, "not found", f'could not find bucket "{bucket}"')
+        start, stop = parse_range(flux)
+        filters = [parse_filter(expression) for expression in re.findall(r"filter\(\s*fn:\s*\(r\)\s*=>(.*?)\)", flux)]
+        keep = re.search(r"keep\(\s*columns\s*:\s*\[(.*?)\]\s*\)", flux)
+        columns = keep and re.findall(r'"([^"]*)"', keep.group(1)) or None
+        aggregates = re.findall(r"aggregateWindow\(\s*every\s*:\s*(\w+)\s*,\s*fn\s*:\s*(\w+)", flux)
+        csv = self.query_tables(
+            bucket, start, stop, filters, pivot="pivot(" in flux, keep=columns, aggregates=aggregates
+        )
+        return 200, csv.encode("utf-8"), "text/csv; charset=utf-8", {}
+
+    def query_tables(
+        self,
+        bucket: str,
+        start: int,
+        stop: int,
+        filters: t.List[t.Dict[str, t.List[str]]],
+        pivot: bool,
+        keep: t.Optional[t.List[str]] = None,
+        aggregates: t.Optional[t.List[t.Tuple[str, str]]] = None,
+    ) -> str:
+        """
+        Select points of bucket, and format them as annotated CSV, with one table per series.
+
+        `keep` selects the columns to keep, dropping all other tags. `aggregates` are pairs of
+        window duration and function of `aggregateWindow()` calls, see `aggregate_window`.
+        """
+        import polars as pl
+
+        from influxio.io import dataframe_to_annotated_csv
+
+        sections = []
+        for measurement, tags, df in self.select(bucket, start, stop, filters):
+            fields = [name for name in df.columns if name not in tags and name != "_time"]
+            if aggregates:
+                df = aggregate_window(df, tags, fields, aggregates)
+                fields = [name for name in df.columns if name not in tags and name != "_time"]
+            if keep is not None:
+                tags = [tag for tag in tags if tag in keep]
+            bounds = [
+                pl.lit(start).cast(pl.Datetime("ns")).alias("_start"),
+                pl.lit(stop).cast(pl.Datetime("ns")).alias("_stop"),
+            ]
+            if pivot:
+                df = df.select(*bounds, "_time", pl.lit(measurement).alias("_measurement"), *tags, *fields)
+                frames = [df]
+            else:
+                frames = [
+                    df.filter(pl.col(field).is_not_null()).select(
+                        *bounds,
+                        "_time",
+                        pl.col(field).alias("_value"),
+                        pl.lit(field).alias("_field"),
+                        pl.lit(measurement).alias("_measurement"),
+                        *tags,
+                    )
+                    for field in fields
+                ]
+            for frame in frames:
+                for table in frame.partition_by(tags, maintain_order=True) if tags else [frame]:
+                    # Series only carry the tags and fields they have been written with.
+                    table = table.select(name for name in table.columns if table[name].null_count() < len(table))
+                    if table.is_empty():
+                        continue
+                    group = ["_start", "_stop", "_field"] + tags
+                    sections.append(dataframe_to_annotated_csv(table, table=len(sections), tag_columns=group))
+        return "".join(sections)
+
+    def select(
+        self, bucket: str, start: int, stop: int, filters: t.List[t.Dict[str, t.List[str]]]
+    ) -> t.Generator[t.Tuple[str, t.List[str], "pl.DataFrame"], None, None]:
+        """
+        Select points of all measurements within time range `[start, stop)`, matching all filters.
+
+        Filters map column names to accepted values. The `_field` column selects field columns.
+        """
+        import polars as pl
+
+        with self.lock:
+            self.decode(bucket)
+            tables = dict(self.tables[bucket])
+            tags = dict(self.tags[bucket])
+        for measurement, df in tables.items():
+            df = df.filter(pl.col("_time") >= start, pl.col("_time") < stop)
+            fields = [name for name in df.columns if name not in tags[measurement] and name != "_time"]
+            for criteria in filters:
+                for name, values in criteria.items():
+                    if name == "_measurement":
+                        df = df if measurement in values else df.clear()
+                    elif name == "_field":
+                        fields = [field for field in fields if field in values]
+                    elif name in df.columns:
+                        df = df.filter(pl.col(name).is_in(values))
+                    else:
+                        df = df.clear()
+            df = df.select("_time", *tags[measurement], *fields).filter(
+                pl.any_horizontal(pl.col(fields).is_not_null()) if fields else pl.lit(False)
+            )
+            if not df.is_empty():
+                yield measurement, tags[measurement], df.sort(tags[measurement] + ["_time"], maintain_order=True)
+
+    def delete(self, query: t.Dict[str, str], data: t.Dict[str, t.Any]) -> Response:
+        import polars as pl
+
+        bucket = query.get("bucket", "")
+        start = parse_rfc3339(data["start"])
+        stop = parse_rfc3339(data["stop"])
+        criteria = dict(re.findall(r'(\w+)\s*=\s*"([^"]*)"', data.get("predicate", "")))
+        with self.lock:
+            if self.bucket_id(bucket) is None:
+                return error_response(404, "not found", f'bucket "{bucket}" not found')
+            self.decode(bucket)
+            for measurement, df in list(self.tables[bucket].items()):
+                if criteria.get("_measurement", measurement) != measurement:
+                    continue
+                selected = (pl.col("_time") >= start) & (pl.col("_time") <= stop)
+                for name, value in criteria.items():
+                    if name != "_measurement":
+                        selected &= pl.col(name).eq_missing(value) if name in df.columns else pl.lit(False)
+                self.tables[bucket][measurement] = df.filter(~selected)
+        return 204, b"", None, {}
+
+    def decode(self, bucket: str):
+        """
+        Decode pending write payloads of bucket into its tables. Invoked while holding the lock.
+        """
+        import polars as pl
+
+        from influxio.io import read_lineprotocol
+
+        if not self.pending[bucket]:
+            return
+        records: t.Dict[str, t.List[t.Dict[str, t.Any]]] = defaultdict(list)
+        tags: t.Dict[str, t.Dict[str, None]] = defaultdict(dict)
+        now = time.time_ns()
+        for body, precision in self.pending.pop(bucket):
+            factor = PRECISION_FACTORS[precision]
+            for point in read_lineprotocol(line for line in body.splitlines() if line.strip()):
+                timestamp = now if point["time"] is None else point["time"] * factor
+                records[point["measurement"]].append({"_time": timestamp, **point["tags"], **point["fields"]})
+                tags[point["measurement"]].update(dict.fromkeys(point["tags"]))
+        for measurement, items in records.items():
+            df = pl.from_dicts(items, infer_schema_length=None)
+            if measurement in self.tables[bucket]:
+                df = pl.concat([self.tables[bucket][measurement], df], how="diagonal_relaxed")
+            self.tables[bucket][measurement] = df
+            known = self.tags[bucket].setdefault(measurement, [])
+            known += [name for name in tags[measurement] if name not in known]
+
+    def table(self, bucket: str, measurement: str) -> "pl.DataFrame":
+        """
+        Return all points of measurement, with a `_time` column, tags, and fields, in order of writing.
+        """
+        import polars as pl
+
+        with self.lock:
+            self.decode(bucket)
+            return self.tables[bucket].get(measurement, pl.DataFrame())
+
+
+def json_response(status: int, data: t.Any, headers: t.Optional[t.Dict[str, str]] = None) -> Response:
+    return status, json.dumps(data).encode("utf-8"), "application/json", headers or {}
+
+
+def error_response(status: int, code: str, message: str, headers: t.Optional[t.Dict[str, str]] = None) -> Response:
+    return json_response(status, {"code": code, "message": message}, headers=headers)
+
+
+def parse_range(flux: str) -> t.Tuple[int, int]:
+    """
+    Decode time range of Flux query into nanoseconds since the epoch. Without a range, all times are selected.
+    """
+    start, stop = -(2**63), 2**63 - 1
+    match = re.search(r"range\((.*?)\)\s*(\||$)", flux, flags=re.DOTALL)
+    if match is not None:
+        stop = time.time_ns()
+        for name, value in re.findall(r"(start|stop)\s*:\s*([^,]+?)\s*(?:,|$)", match.group(1)):
+            if name == "start":
+                start = parse_flux_time(value)
+            else:
+                stop = parse_flux_time(value)
+    return start, stop
+
+
+def parse_flux_time(value: str) -> int:
+    """
+    Decode Flux time value into nanoseconds since the epoch. Integers are seconds, like in Flux.
+    """
+    value = value.strip()
+    if value == "now()":
+        return time.time_ns()
+    if re.match(r"^-?\d+$", value):
+        return int(value) * PRECISION_FACTORS["s"]
+    if value.startswith("-"):
+        return time.time_ns() - parse_duration(value[1:])
+    return parse_rfc3339(value)
+
+
+def aggregate_window(
+    df: "pl.DataFrame", tags: t.List[str], fields: t.List[str], aggregates: t.List[t.Tuple[str, str]]
+) -> "pl.DataFrame":
+    """
+    Aggregate points of a measurement into windows labeled by their start, renaming fields like `<field>_<function>`.
+
+    Like `aggregateWindow(createEmpty: false, timeSrc: "_start")`, followed by a `map()`
+    call renaming the fields, and a `union()` of the aggregates of all functions.
+    """
+    import polars as pl
+
+    every = parse_duration(aggregates[0][0])
+    return (
+        df.with_columns(pl.col("_time") // every * every)
+        .group_by([*tags, "_time"], maintain_order=True)
+        .agg(
+            getattr(pl.col(field).drop_nulls(), function)().alias(f"{field}_{function}")
+            for field in fields
+            for _, function in aggregates
+        )
+    )
+
+
+def parse_filter(expression: str) -> t.Dict[str, t.List[str]]:
+    """
+    Decode Flux predicate function body into accepted values by column name.
+
+    Comparisons of the same column are considered alternatives, comparisons of different columns all need to match.
+    """
+    criteria: t.Dict[str, t.List[str]] = defaultdict(list)
+    for dotted, quoted, value in re.findall(r'r(?:\.(\w+)|\["([^"]+)"\])\s*==\s*"([^"]*)"', expression):
+        criteria[dotted or quoted].append(value)
+    return dict(criteria)
@@ -52,3 +52,13 @@ def line_protocol_url_basic():
 @pytest.fixture
 def line_protocol_file_irregular():
     return Path("tests/testdata/air-sensor-data-irregular.lp")
+
+
+@pytest.fixture
+def annotated_csv_file_basic():
+    return Path("tests/testdata/basic.csv")
+
+
+@pytest.fixture
+def annotated_csv_file_mixed():
+    return Path("tests/testdata/mixed.csv")
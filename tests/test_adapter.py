@@ -53,6 +53,14 @@ def test_cratedb_adapter_if_exists():
     assert adapter.if_exists == "append"
 
 
+def test_cratedb_adapter_table_options():
+    adapter = SqlAlchemyAdapter.from_url("crate://localhost:4200/testdrive/basic?shards=6&replicas=0-1&partition=day")
+    assert adapter.dburi == "crate://localhost:4200/?schema=testdrive"
+    assert adapter.shards == 6
+    assert adapter.replicas == "0-1"
+    assert adapter.partition == "day"
+
+
 def test_file_adapter_ilp_file():
     adapter = FileAdapter.from_url("file://foo.lp")
     assert adapter.output.path == "foo.lp"
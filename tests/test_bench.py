@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from influxio.bench import Benchmark
+from influxio.cli import cli
+
+
+@pytest.fixture(scope="module")
+def bench_report(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("bench")
+    return Benchmark(rows=500, workdir=workdir).run(isolate=False)
+
+
+@pytest.mark.parametrize("name", ["ilp-to-sqlite", "ilp-to-parquet", "dataframe-to-ilp", "api-read", "api-write"])
+def test_bench_scenario(bench_report, name):
+    """
+    Verify benchmark scenarios succeed, and report throughput metrics.
+    """
+    result = next(item for item in bench_report["scenarios"] if item["name"] == name)
+    assert result["status"] == "ok", result["message"]
+    assert result["rows"] == 500
+    assert result["bytes"] > 0
+    assert result["rows_per_second"] > 0
+    assert result["mb_per_second"] > 0
+    assert result["cpu_time"] > 0
+    assert result["peak_rss_mb"] > 0
+
+
+def test_bench_engine_export_skipped(bench_report):
+    result = next(item for item in bench_report["scenarios"] if item["name"] == "engine-export")
+    assert result["status"] == "skipped"
+
+
+def test_bench_unknown_scenario():
+    with pytest.raises(ValueError) as ex:
+        Benchmark(rows=10).run(["foo"])
+    assert ex.match("Unknown benchmark scenario: foo")
+
+
+def test_bench_cli(tmp_path):
+    """
+    CLI test: Invoke `influxio bench`, running a single scenario in a separate process.
+    """
+    report_file = tmp_path / "report.json"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        args=["bench", "--rows=100", "--scenario=dataframe-to-ilp", f"--output={report_file}"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    report = json.loads(report_file.read_text())
+    assert report["rows"] == 100
+    assert [item["name"] for item in report["scenarios"]] == ["dataframe-to-ilp"]
+    assert report["scenarios"][0]["status"] == "ok"
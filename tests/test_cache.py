@@ -0,0 +1,102 @@
+import logging
+import os
+import time
+
+import fsspec
+import pytest
+
+from influxio.io import cache_resource
+from influxio.io import open as open_resource
+from influxio.util.cache import ResourceCache, parse_size
+
+
+@pytest.fixture
+def memory_fs():
+    fs = fsspec.filesystem("memory")
+    fs.pipe("/cache/basic.lp", b"basic,id=1 price=0.42 1414747376000000000\n")
+    fs.pipe("/cache/large.lp", b"x" * 600)
+    yield fs
+    fs.rm("/cache", recursive=True)
+
+
+def test_cache_key():
+    cache = ResourceCache("cache")
+    key = cache.key("https://example.org/data.lp.gz?foo=bar", {"ETag": '"abc"', "size": 42})
+    assert key.endswith(".lp.gz")
+    assert key != cache.key("https://example.org/data.lp.gz?foo=bar", {"ETag": '"def"', "size": 42})
+    assert key != cache.key("https://example.org/data.lp.gz?foo=bar", {"Last-Modified": "Fri, 31 Oct 2014", "size": 42})
+
+
+def test_cache_key_unversioned():
+    """
+    Resources without revision metadata are only keyed on their size, when enabled explicitly.
+    """
+    assert ResourceCache("cache").key("https://example.org/data.lp", {"size": 42}) is None
+    cache = ResourceCache("cache", unversioned=True)
+    assert cache.key("https://example.org/data.lp", {"size": 42}) != cache.key("https://example.org/data.lp", {})
+
+
+def test_cache_hit(tmp_path, memory_fs, monkeypatch):
+    cache = ResourceCache(tmp_path, unversioned=True)
+    path = cache.get(memory_fs, "/cache/basic.lp", url="memory://cache/basic.lp")
+    assert path.read_bytes().startswith(b"basic,id=1")
+
+    # Second access uses the cached file.
+    monkeypatch.setattr(memory_fs, "get_file", None)
+    assert cache.get(memory_fs, "/cache/basic.lp", url="memory://cache/basic.lp") == path
+
+
+def test_cache_eviction(tmp_path, memory_fs):
+    cache = ResourceCache(tmp_path, max_size=1_000, unversioned=True)
+    basic = cache.get(memory_fs, "/cache/basic.lp", url="memory://cache/basic.lp")
+    os.utime(basic, (time.time() - 60, time.time() - 60))
+    large = cache.get(memory_fs, "/cache/large.lp", url="memory://cache/large.lp")
+    assert basic.exists()
+    assert large.exists()
+
+    # Adding another entry exceeds the maximum size, so the least recently used one is evicted.
+    memory_fs.pipe("/cache/more.lp", b"y" * 400)
+    more = cache.get(memory_fs, "/cache/more.lp", url="memory://cache/more.lp")
+    assert not basic.exists()
+    assert large.exists()
+    assert more.exists()
+
+
+def test_cache_unversioned_skipped(tmp_path, memory_fs, caplog):
+    """
+    Resources without revision metadata are not cached by default.
+    """
+    cache = ResourceCache(tmp_path)
+    with caplog.at_level(logging.WARNING):
+        assert cache.get(memory_fs, "/cache/basic.lp", url="memory://cache/basic.lp") is None
+    assert "Not caching resource without ETag or Last-Modified metadata" in caplog.text
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_resource_enabled(tmp_path, memory_fs, monkeypatch):
+    monkeypatch.setenv("INFLUXIO_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("INFLUXIO_CACHE_UNVERSIONED", "true")
+    path = cache_resource("memory://cache/basic.lp")
+    assert path.parent == tmp_path
+    with open_resource("memory://cache/basic.lp") as fp:
+        assert fp.read().startswith(b"basic,id=1")
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_cache_resource_unversioned(tmp_path, memory_fs, monkeypatch):
+    monkeypatch.setenv("INFLUXIO_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("INFLUXIO_CACHE_UNVERSIONED", raising=False)
+    assert cache_resource("memory://cache/basic.lp") == "memory://cache/basic.lp"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_resource_disabled(memory_fs, monkeypatch):
+    monkeypatch.delenv("INFLUXIO_CACHE_DIR", raising=False)
+    assert cache_resource("memory://cache/basic.lp") == "memory://cache/basic.lp"
+    assert cache_resource("tests/testdata/basic.lp") == "tests/testdata/basic.lp"
+
+
+def test_parse_size():
+    assert parse_size("42") == 42
+    assert parse_size("2K") == 2048
+    assert parse_size("1.5GiB") == int(1.5 * 1024**3)
@@ -1,3 +1,5 @@
+import json
+
 from click.testing import CliRunner
 
 from influxio.cli import cli
@@ -15,3 +17,20 @@ def test_info():
         catch_exceptions=False,
     )
     assert result.exit_code == 0
+
+
+def test_inspect(line_protocol_file_basic):
+    """
+    CLI test: Invoke `influxio inspect`
+    """
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli,
+        args=["inspect", f"file://{line_protocol_file_basic}"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    report = json.loads(result.stdout)
+    assert report["measurements"]["basic"]["rows"] == 2
+    assert report["measurements"]["basic"]["tags"]["name"] == {"count": 2, "cardinality": 2}
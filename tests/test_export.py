@@ -67,7 +67,7 @@ def test_export_cratedb_default(caplog, influxdb, provision_influxdb, cratedb):
 
     # Verify execution.
     assert f"Copying from {source_url} to {target_url}" in caplog.messages
-    assert "Loading dataframes into RDBMS/SQL database using pandas/Dask" in caplog.messages
+    assert "Loading dataframes into RDBMS/SQL database" in caplog.messages
 
     # Verify number of records in target database.
     cratedb.refresh_table()
@@ -91,13 +91,11 @@ def test_export_cratedb_no_data(caplog, influxdb, provision_influxdb, cratedb):
 
     # Verify execution.
     assert f"Copying from {source_url} to {target_url}" in caplog.messages
-    assert "Loading dataframes into RDBMS/SQL database using pandas/Dask" in caplog.messages
+    assert "Loading dataframes into RDBMS/SQL database" in caplog.messages
     assert "No data has been loaded from InfluxDB" in caplog.messages
 
-    # Verify number of records in target database.
-    cratedb.refresh_table()
-    records = cratedb.read_records()
-    assert len(records) == 0
+    # Verify target table has not been created, because its schema is derived from the data.
+    assert not cratedb.table_exists()
 
 
 def test_export_cratedb_fail_if_target_exists(caplog, influxdb, provision_influxdb, cratedb):
@@ -185,7 +183,7 @@ def test_export_postgresql(caplog, influxdb, provision_influxdb, postgresql):
 
     # Verify execution.
     assert f"Copying from {source_url} to {target_url}" in caplog.messages
-    assert "Loading dataframes into RDBMS/SQL database using pandas/Dask" in caplog.messages
+    assert "Loading dataframes into RDBMS/SQL database" in caplog.messages
 
     # Verify number of records in target database.
     records = postgresql.read_records()
@@ -205,7 +203,7 @@ def test_export_sqlite(caplog, influxdb, provision_influxdb, sqlite, sqlite_url)
 
     # Verify execution.
     assert f"Copying from {source_url} to {target_url}" in caplog.messages
-    assert "Loading dataframes into RDBMS/SQL database using pandas/Dask" in caplog.messages
+    assert "Loading dataframes into RDBMS/SQL database" in caplog.messages
 
     # Verify number of records in target database.
     records = sqlite.read_records()
@@ -0,0 +1,92 @@
+import polars as pl
+import pytest
+
+import influxio.core
+from influxio.inspection import DataProfile, HyperLogLog
+from influxio.util.stub import InfluxDbFake
+
+
+@pytest.mark.parametrize("count", [0, 10, 1_000, 100_000])
+def test_hyperloglog_estimate(count):
+    """
+    Estimates are exact for small cardinalities, and within a few standard errors otherwise.
+    """
+    sketch = HyperLogLog()
+    values = pl.Series([f"value-{number}" for number in range(count)])
+    sketch.add(values)
+    sketch.add(values)
+    assert abs(sketch.estimate() - count) <= max(3 * sketch.error * count, 1)
+
+
+def test_hyperloglog_update():
+    first, second = HyperLogLog(precision=12), HyperLogLog(precision=12)
+    first.add(pl.Series(range(0, 6000)))
+    second.add(pl.Series(range(4000, 10000)))
+    first.update(second)
+    assert abs(first.estimate() - 10000) <= 3 * first.error * 10000
+    with pytest.raises(ValueError) as ex:
+        first.update(HyperLogLog(precision=10))
+    assert ex.match("Unable to merge HyperLogLog sketches of different precision")
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=20)
+
+
+def test_data_profile():
+    """
+    Series are identified by measurement and tag set, independently of the columns of a batch.
+    """
+    profile = DataProfile()
+    profile.add(
+        pl.DataFrame(
+            {
+                "time": [1, 2, 3],
+                "measurement": ["weather", "weather", "power"],
+                "station": ["a", "b", None],
+                "temperature": [21.5, float("nan"), None],
+                "watts": [None, None, 1200],
+            }
+        )
+    )
+    profile.add(pl.DataFrame({"time": [4], "station": ["a"], "temperature": [25.5]}), measurement="weather")
+    report = profile.to_dict()
+    assert report["rows"] == 4
+    assert report["series"] == 3
+    assert report["time"] == {"min": "1970-01-01T00:00:00.000000001Z", "max": "1970-01-01T00:00:00.000000004Z"}
+    weather = report["measurements"]["weather"]
+    assert weather["series"] == 2
+    assert weather["tags"] == {"station": {"count": 3, "cardinality": 2}}
+    assert weather["fields"] == {"temperature": {"count": 3, "types": {"float": 3}, "min": 21.5, "max": 25.5}}
+    assert report["measurements"]["power"]["fields"]["watts"]["types"] == {"integer": 1}
+
+
+def test_inspect_lineprotocol(line_protocol_file_industrial):
+    report = influxio.core.inspect(f"file://{line_protocol_file_industrial}?start=2022-01-14T00:00:00Z")
+    assert report["source"].startswith("file://")
+    assert report["rows"] == 5
+    assert sorted(report["measurements"]) == ["Füllstände", "Gasanalyse", "Stromproduktion"]
+    fill = report["measurements"]["Füllstände"]
+    assert fill["rows"] == 2
+    assert fill["time"] == {"min": "2022-01-16T04:45:16.000000000Z", "max": "2022-01-16T04:45:46.000000000Z"}
+    assert fill["fields"] == {"Gassack": {"count": 2, "types": {"float": 2}, "min": 73.4375, "max": 73.64004516601562}}
+
+
+def test_inspect_synthetic():
+    """
+    Series cardinality of synthetic data is estimated without materializing its series.
+    """
+    report = influxio.core.inspect("testdata://synthetic/?rows=20000&series=5000&chunk-size=3000")
+    assert report["rows"] == 20000
+    synthetic = report["measurements"]["synthetic"]
+    assert abs(synthetic["series"] - 5000) <= 3 * report["sketch"]["error"] * 5000
+    assert sorted(synthetic["tags"]) == ["host", "region"]
+
+
+def test_inspect_api():
+    with InfluxDbFake() as fake:
+        url = f"http://example:token@{fake.address}/testdrive/demo"
+        influxio.core.copy("testdata://dateindex/?rows=25", url)
+        report = influxio.core.inspect(url)
+    demo = report["measurements"]["demo"]
+    assert demo["rows"] == 25
+    assert demo["series"] == 1
+    assert sorted(demo["fields"]) == ["A", "B", "C", "D"]
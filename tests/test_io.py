@@ -0,0 +1,600 @@
+import datetime as dt
+import io
+
+import fsspec
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from influxio.io import (
+    MappedLineReader,
+    SqlWritePlanner,
+    WindowAggregator,
+    adbc_driver,
+    cratedb_table_ddl,
+    dataframe_to_annotated_csv,
+    dataframe_to_sql,
+    polars_to_lineprotocol,
+    read_annotated_csv,
+    read_arrow_ipc,
+    read_parquet,
+    storage_options,
+)
+from influxio.util.prefetch import PrefetchingReader
+
+
+@pytest.fixture
+def frame_basic() -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "measurement": ["basic", "basic"],
+            "time": [dt.datetime(2014, 10, 31, 9, 22, 56), dt.datetime(2014, 10, 31, 9, 22, 58)],
+            "fruits": ["apple,banana", "pear"],
+            "id": ["1", "2"],
+            "name": ["foo", "bar"],
+            "price": [0.42, 0.84],
+        }
+    )
+
+
+def test_polars_to_lineprotocol_basic(frame_basic):
+    lines = polars_to_lineprotocol(frame_basic)
+    assert lines.to_list() == [
+        r"basic,fruits=apple\,banana,id=1,name=foo price=0.42 1414747376000000000",
+        r"basic,fruits=pear,id=2,name=bar price=0.84 1414747378000000000",
+    ]
+
+
+def test_polars_to_lineprotocol_types_and_nulls():
+    df = pl.DataFrame(
+        {
+            "time": [1, 2, 3],
+            "host": ["a b", None, "c"],
+            "count": [1, None, None],
+            "ratio": [0.5, float("nan"), None],
+            "ok": [True, False, None],
+        }
+    )
+    lines = polars_to_lineprotocol(df, measurement="some measurement")
+    assert lines.to_list() == [
+        r"some\ measurement,host=a\ b count=1i,ratio=0.5,ok=true 1",
+        r"some\ measurement ok=false 2",
+    ]
+
+
+def test_polars_to_lineprotocol_string_field():
+    df = pl.DataFrame({"time": [1], "message": ['say "hello"']})
+    lines = polars_to_lineprotocol(df, measurement="log", tag_columns=[])
+    assert lines.to_list() == [r'log message="say \"hello\"" 1']
+
+
+def test_polars_to_lineprotocol_without_measurement():
+    with pytest.raises(ValueError) as ex:
+        polars_to_lineprotocol(pl.DataFrame({"time": [1], "value": [1.0]}))
+    assert ex.match("Unable to convert data frame without measurement name to line protocol")
+
+
+def test_read_parquet_projection(tmp_path, frame_basic):
+    path = tmp_path / "basic.parquet"
+    pq.write_table(frame_basic.to_arrow(), path, row_group_size=1)
+    frames = list(read_parquet(path, columns=["time", "price"], batch_size=1))
+    assert len(frames) == 2
+    assert frames[0].columns == ["time", "price"]
+    assert pl.concat(frames)["price"].to_list() == [0.42, 0.84]
+
+
+@pytest.mark.parametrize("streaming", [False, True], ids=["file", "stream"])
+def test_read_arrow_ipc(tmp_path, frame_basic, streaming):
+    path = tmp_path / "basic.arrow"
+    table = frame_basic.to_arrow()
+    with pa.OSFile(str(path), "wb") as sink:
+        writer = pa.ipc.new_stream if streaming else pa.ipc.new_file
+        with writer(sink, table.schema) as ipc:
+            ipc.write_table(table, max_chunksize=1)
+    frames = list(read_arrow_ipc(path, columns=["name"]))
+    assert len(frames) == 2
+    assert pl.concat(frames)["name"].to_list() == ["foo", "bar"]
+
+
+def test_read_annotated_csv_flux(annotated_csv_file_basic):
+    """
+    Read annotated CSV in the output format of Flux queries, pivoting `_field` and `_value`.
+    """
+    with open(annotated_csv_file_basic, "rb") as fp:
+        df = pl.concat(read_annotated_csv(fp))
+    assert df.columns == ["time", "measurement", "fruits", "id", "name", "price"]
+    assert df.schema["time"] == pl.Datetime("ns", "UTC")
+    assert df["fruits"].to_list() == ["apple,banana", "pear"]
+    assert df["price"].to_list() == [0.42, 0.84]
+
+
+@pytest.mark.parametrize("block_size", [64, 200, 1_000_000])
+def test_read_annotated_csv_flux_mixed(annotated_csv_file_mixed, block_size):
+    """
+    Pivot fields of different types, read from different blocks and sections, into the same rows.
+    """
+    with open(annotated_csv_file_mixed, "rb") as fp:
+        frames = list(read_annotated_csv(fp, block_size=block_size))
+    assert len(frames) == 1
+    df = frames[0]
+    assert df.columns == ["time", "measurement", "host", "usage", "count"]
+    assert df.schema["usage"] == pl.Float64
+    assert df.schema["count"] == pl.Int64
+    assert df.select(["host", "usage", "count"]).rows() == [
+        ("a", 1.5, 1),
+        ("a", 2.5, 2),
+        ("a", 3.5, 3),
+        ("b", 10.5, 10),
+        ("b", 20.5, 20),
+    ]
+
+
+def test_read_annotated_csv_flux_spill(annotated_csv_file_mixed):
+    """
+    Pivoting fields spilled to disk beyond the memory limit yields the same points as pivoting them in memory.
+    """
+    with open(annotated_csv_file_mixed, "rb") as fp:
+        expected = pl.concat(read_annotated_csv(fp, block_size=64))
+    with open(annotated_csv_file_mixed, "rb") as fp:
+        frames = list(read_annotated_csv(fp, block_size=64, pivot_limit=1))
+    assert len(frames) > 1
+    df = pl.concat(frames).select(expected.columns).sort(["host", "time"])
+    assert df.equals(expected)
+
+
+@pytest.mark.parametrize("block_size", [16, 64, 1_000_000])
+def test_read_annotated_csv_quoted(block_size):
+    """
+    Quoted values spanning multiple lines, including empty lines and lines starting with `#`, are kept intact.
+    """
+    note = "first line\n#second line\n\nafter an empty line"
+    data = "\n".join(
+        [
+            "#datatype measurement,tag,string,dateTime:number",
+            "m,host,note,time",
+            f'cpu,a,"{note}",1577836800000000000',
+            'cpu,b,"say ""hi""",1577836801000000000',
+            "",
+            "#datatype measurement,tag,long,dateTime:number",
+            "m,host,count,time",
+            "cpu,a,42,1577836800000000000",
+        ]
+    )
+    frames = list(read_annotated_csv(io.BytesIO(data.encode()), block_size=block_size))
+    # Small blocks split sections into multiple data frames.
+    notes = pl.concat([df for df in frames if "note" in df.columns])
+    assert notes["note"].to_list() == [note, 'say "hi"']
+    assert [df["count"].to_list() for df in frames if "count" in df.columns] == [[42]]
+
+
+def test_read_annotated_csv_extended():
+    """
+    Read extended annotated CSV, including `#default` annotations and multiple sections.
+    """
+    data = io.StringIO("""
+#datatype measurement,tag,double,dateTime:number
+#default ,,,
+m,host,usage,time
+cpu,a,1.5,1577836800000000000
+
+#datatype measurement,tag,long,ignored,dateTime:number
+#default cpu,unknown,,,
+m,host,count,comment,time
+,,42,foo,1577836800000000000
+""".lstrip())
+    frames = list(read_annotated_csv(data))
+    assert len(frames) == 2
+    assert frames[0].to_dicts() == [
+        {"measurement": "cpu", "host": "a", "usage": 1.5, "time": dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)}
+    ]
+    assert frames[1].to_dicts() == [
+        {"measurement": "cpu", "host": "unknown", "count": 42, "time": dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)}
+    ]
+
+
+def test_annotated_csv_roundtrip(frame_basic):
+    """
+    Write annotated CSV, and read it back, using small blocks to exercise chunking.
+    """
+    data = dataframe_to_annotated_csv(frame_basic) + dataframe_to_annotated_csv(frame_basic, table=1)
+    header = """
+#group,false,false,true,false,true,true,true,false
+#datatype,string,long,string,dateTime:RFC3339,string,string,string,double
+#default,_result,,,,,,,
+,result,table,_measurement,_time,fruits,id,name,price
+,,0,basic,2014-10-31T09:22:56Z,"apple,banana",1,foo,0.42
+"""
+    assert data.startswith(header.lstrip())
+    frames = list(read_annotated_csv(io.BytesIO(data.encode()), block_size=64))
+    df = pl.concat(frames)
+    assert len(df) == 4
+    assert df.drop("time").to_dicts() == frame_basic.drop("time").to_dicts() * 2
+
+
+@pytest.mark.parametrize(
+    "content,lines",
+    [
+        (b"", []),
+        (b"a\nbb\n", [b"a", b"bb"]),
+        (b"a\n\nccc", [b"a", b"ccc"]),
+        (b"x" * 100 + b"\ny", [b"x" * 100, b"y"]),
+    ],
+    ids=["empty", "trailing-newline", "no-trailing-newline", "long-line"],
+)
+def test_mapped_line_reader(tmp_path, content, lines):
+    path = tmp_path / "data.lp"
+    path.write_bytes(content)
+    with MappedLineReader(path, block_size=4) as reader:
+        assert list(reader.readlines()) == lines
+        assert reader.buffer.tobytes() == content
+
+
+def test_mapped_line_reader_range(line_protocol_file_industrial):
+    """
+    Readers restricted to byte ranges aligned to line boundaries read the lines of their range.
+    """
+    with MappedLineReader(line_protocol_file_industrial) as reader:
+        lines = list(reader.readlines())
+    assert len(lines) == 8
+    middle = line_protocol_file_industrial.read_bytes().index(b"\n", 100) + 1
+    partial = []
+    for start, end in [(0, middle), (middle, None)]:
+        with MappedLineReader(line_protocol_file_industrial, start=start, end=end) as reader:
+            partial.append(list(reader.readlines()))
+    assert partial[0] and partial[1]
+    assert partial[0] + partial[1] == lines
+
+
+@pytest.mark.parametrize("count", [1, 3, 8, 100])
+def test_mapped_line_reader_split(line_protocol_file_industrial, count):
+    """
+    Byte ranges are aligned to line boundaries, and cover all lines once.
+    """
+    size = line_protocol_file_industrial.stat().st_size
+    with MappedLineReader(line_protocol_file_industrial) as reader:
+        ranges = reader.split(count)
+        lines = list(reader.readlines())
+    # Ranges start at the line following their share of the file, so short lines may share ranges.
+    assert 0 < len(ranges) <= min(count, len(lines))
+    if count <= 3:
+        assert len(ranges) == count
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == size
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    partial = []
+    for start, end in ranges:
+        with MappedLineReader(line_protocol_file_industrial, start=start, end=end) as reader:
+            partial += list(reader.readlines())
+    assert partial == lines
+
+
+def test_prefetching_reader():
+    """
+    Read resource using concurrent range requests, with a bounded block cache.
+    """
+    fs = fsspec.filesystem("memory")
+    content = b"".join(f"line {index}\n".encode() for index in range(1_000))
+    fs.pipe("/prefetch.lp", content)
+    reader = PrefetchingReader(fs, "/prefetch.lp", size=len(content), block_size=100, concurrency=3, max_blocks=4)
+    with io.BufferedReader(reader, buffer_size=64) as buffer:
+        assert buffer.readline() == b"line 0\n"
+        assert len(reader.blocks) <= 4
+        assert buffer.read() == content[7:]
+        assert len(reader.blocks) <= 4
+        buffer.seek(-8, io.SEEK_END)
+        assert buffer.read() == b"line 999\n"[-8:]
+
+
+def test_storage_options_s3_anonymous(monkeypatch, tmp_path):
+    monkeypatch.delenv("AWS_ACCESS_KEY_ID", raising=False)
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    monkeypatch.setenv("AWS_SHARED_CREDENTIALS_FILE", str(tmp_path / "credentials"))
+    assert storage_options("s3://bucket/data.lp") == ("s3://bucket/data.lp", {"anon": True})
+
+
+def test_storage_options_s3_url_credentials():
+    path, options = storage_options("s3://key:secret@bucket/data.lp?region=eu-central-1")
+    assert path == "s3://bucket/data.lp"
+    assert options == {
+        "key": "key",
+        "secret": "secret",
+        "client_kwargs": {"region_name": "eu-central-1"},
+        "anon": False,
+    }
+
+
+def test_storage_options_s3_environment(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "key")
+    assert storage_options("s3://bucket/data.lp") == ("s3://bucket/data.lp", {"anon": False})
+
+
+def test_storage_options_http():
+    url = "https://example.org/data.lp?signature=foo"
+    assert storage_options(url) == (url, {})
+
+
+def read_sql(dburi: str, table: str) -> pl.DataFrame:
+    import sqlalchemy as sa
+
+    engine = sa.create_engine(dburi)
+    with engine.connect() as connection:
+        rows = connection.execute(sa.text(f'SELECT * FROM "{table}"')).mappings().fetchall()  # noqa: S608
+    engine.dispose()
+    return pl.DataFrame([dict(row) for row in rows])
+
+
+@pytest.mark.parametrize("engine", ["arrow", "threads", "dask"])
+def test_dataframe_to_sql(tmp_path, frame_basic, engine):
+    dburi = f"sqlite:///{tmp_path / 'basic.sqlite'}"
+    frame = frame_basic.with_columns(pl.Series("count", [1, None]), pl.Series("active", [True, False]))
+    dataframe_to_sql(frame, dburi=dburi, tablename="basic", engine=engine)
+    df = read_sql(dburi, "basic")
+    assert df.columns == ["time", "fruits", "id", "name", "price", "count", "active"]
+    assert df["fruits"].to_list() == ["apple,banana", "pear"]
+    assert df["price"].to_list() == [0.42, 0.84]
+    assert df["count"].to_list() == [1, None]
+    assert df["active"].cast(pl.Boolean).to_list() == [True, False]
+    assert df["time"].cast(pl.Utf8).str.starts_with("2014-10-31 09:22:56").to_list() == [True, False]
+
+
+def test_dataframe_to_sql_if_exists(tmp_path, frame_basic):
+    dburi = f"sqlite:///{tmp_path / 'basic.sqlite'}"
+    dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic", engine="arrow")
+    with pytest.raises(ValueError) as ex:
+        dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic", engine="arrow")
+    assert ex.match("Table 'basic' already exists.")
+    dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic", if_exists="append", engine="arrow")
+    assert len(read_sql(dburi, "basic")) == 4
+    dataframe_to_sql(frame_basic.head(1), dburi=dburi, tablename="basic", if_exists="replace", engine="arrow")
+    assert len(read_sql(dburi, "basic")) == 1
+    with pytest.raises(ValueError) as ex:
+        dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic", if_exists="Hotzenplotz", engine="arrow")
+    assert ex.match("'Hotzenplotz' is not valid for if_exists")
+
+
+def test_dataframe_to_sql_upsert(tmp_path, frame_basic):
+    """
+    Upserting overlapping data updates existing rows, and inserts new ones. The last write wins.
+    """
+    dburi = f"sqlite:///{tmp_path / 'basic.sqlite'}"
+    assert dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic", if_exists="upsert") == 2
+    update = pl.concat(
+        [
+            frame_basic.with_columns(price=pl.Series([1.42, 1.84])),
+            frame_basic.head(1).with_columns(id=pl.lit("3"), price=pl.lit(0.1)),
+            frame_basic.head(1).with_columns(price=pl.lit(2.42)),
+        ]
+    )
+    assert dataframe_to_sql(update, dburi=dburi, tablename="basic", if_exists="upsert", chunksize=2) == 3
+    df = read_sql(dburi, "basic").sort("id")
+    assert df["id"].to_list() == ["1", "2", "3"]
+    assert df["price"].to_list() == [2.42, 1.84, 0.1]
+
+
+def test_dataframe_to_sql_upsert_keys(tmp_path, frame_basic):
+    """
+    Upserting into a table created before adds a unique index on the explicitly selected key columns.
+    """
+    dburi = f"sqlite:///{tmp_path / 'basic.sqlite'}"
+    dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic", engine="arrow")
+    update = frame_basic.with_columns(name=pl.lit("baz"))
+    dataframe_to_sql(update, dburi=dburi, tablename="basic", if_exists="upsert", keys=["time", "id"])
+    df = read_sql(dburi, "basic")
+    assert df["name"].to_list() == ["baz", "baz"]
+
+    with pytest.raises(ValueError) as ex:
+        dataframe_to_sql(update, dburi=dburi, tablename="basic", if_exists="upsert", keys=["time", "unknown"])
+    assert ex.match("Key columns not found: unknown")
+    with pytest.raises(ValueError) as ex:
+        dataframe_to_sql(update.drop("time"), dburi=dburi, tablename="basic", if_exists="upsert")
+    assert ex.match("Upserts need key columns, but data has no time column")
+
+
+def test_dataframe_to_sql_upsert_sparse_tag(tmp_path):
+    """
+    Missing values of sparse tags are stored as empty strings, so upserting them again updates the rows.
+    """
+    dburi = f"sqlite:///{tmp_path / 'sparse.sqlite'}"
+    frame = pl.DataFrame(
+        {"time": [1, 1, 2], "host": ["a", None, None], "region": [None, None, "eu"], "value": [1, 2, 3]}
+    )
+    dataframe_to_sql(frame.head(1), dburi=dburi, tablename="sparse", engine="arrow")
+    dataframe_to_sql(frame, dburi=dburi, tablename="sparse", if_exists="upsert")
+    dataframe_to_sql(
+        frame.with_columns(value=pl.col("value") * 10), dburi=dburi, tablename="sparse", if_exists="upsert"
+    )
+    df = read_sql(dburi, "sparse").sort(["time", "host"])
+    assert df.rows() == [(1, "", "", 20), (1, "a", "", 10), (2, "", "eu", 30)]
+
+
+def test_dataframe_to_sql_pandas_batches(tmp_path, frame_basic):
+    """
+    Insert pandas dataframe in multiple batches, omitting its index.
+    """
+    dburi = f"sqlite:///{tmp_path / 'basic.sqlite'}"
+    frame = pl.concat([frame_basic] * 5).to_pandas().set_index("time")
+    assert dataframe_to_sql(frame, dburi=dburi, tablename="basic", chunksize=3, engine="arrow") == 10
+    df = read_sql(dburi, "basic")
+    assert df.columns == ["fruits", "id", "name", "price"]
+    assert len(df) == 10
+
+
+def test_dataframe_to_sql_adbc(tmp_path, frame_basic):
+    pytest.importorskip("adbc_driver_sqlite")
+    dburi = f"sqlite:///{tmp_path / 'basic.sqlite'}"
+    assert adbc_driver(dburi) is not None
+    dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic")
+    dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic", if_exists="append")
+    df = read_sql(dburi, "basic")
+    assert len(df) == 4
+    assert df["name"].to_list() == ["foo", "bar", "foo", "bar"]
+    with pytest.raises(ValueError) as ex:
+        dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic")
+    assert ex.match("Table 'basic' already exists.")
+
+
+def test_dataframe_to_sql_unknown_engine(frame_basic):
+    assert adbc_driver("crate://localhost:4200") is None
+    with pytest.raises(ValueError) as ex:
+        dataframe_to_sql(frame_basic, dburi="sqlite://", tablename="basic", engine="foo")
+    assert ex.match("Unknown SQL write engine: foo")
+
+
+def test_dataframe_to_sql_threads(tmp_path, frame_basic):
+    dburi = f"sqlite:///{tmp_path / 'basic.sqlite'}"
+    frame = pl.concat([frame_basic] * 50)
+    assert dataframe_to_sql(frame, dburi=dburi, tablename="basic", chunksize=7, engine="threads") == 100
+    assert read_sql(dburi, "basic")["name"].value_counts()["count"].to_list() == [50, 50]
+
+
+def test_sql_write_planner(monkeypatch):
+    monkeypatch.setattr("influxio.io.adbc_driver", lambda dburi: None)
+    planner = SqlWritePlanner(threads_rows=100, threads_bytes=1_000, dask_rows=10_000, dask_bytes=100_000)
+    dburi = "postgresql://localhost/testdrive"
+    assert planner.plan(dburi, rows=10, size=100) == "arrow"
+    assert planner.plan(dburi, rows=100, size=100) == "threads"
+    assert planner.plan(dburi, rows=10, size=1_000) == "threads"
+    assert planner.plan(dburi, rows=10_000, size=100) == "dask"
+    assert planner.plan(dburi, rows=10, size=100_000) == "dask"
+    # SQLite permits a single writer only.
+    assert planner.plan("sqlite:///test.sqlite", rows=1_000, size=100) == "arrow"
+    assert planner.plan("sqlite:///test.sqlite", rows=10_000, size=100) == "arrow"
+
+
+def test_sql_write_planner_adbc(monkeypatch):
+    """
+    ADBC is selected above its thresholds, only for databases with an ADBC driver installed.
+    """
+    monkeypatch.setattr("influxio.io.adbc_driver", lambda dburi: object() if dburi.startswith("postgresql") else None)
+    planner = SqlWritePlanner(threads_rows=100, adbc_rows=1_000, adbc_bytes=10_000, dask_rows=10_000)
+    dburi = "postgresql://localhost/testdrive"
+    assert planner.plan(dburi, rows=10, size=100) == "arrow"
+    assert planner.plan(dburi, rows=100, size=100) == "threads"
+    assert planner.plan(dburi, rows=1_000, size=100) == "adbc"
+    assert planner.plan(dburi, rows=10, size=10_000) == "adbc"
+    assert planner.plan(dburi, rows=10_000, size=100) == "adbc"
+    # CrateDB is loaded using its bulk endpoint, unless an ADBC driver is installed.
+    assert planner.plan("crate://localhost/", rows=10, size=100) == "dask"
+    assert planner.plan("crate://localhost/", rows=1_000, size=100) == "dask"
+    monkeypatch.setattr("influxio.io.adbc_driver", lambda dburi: object())
+    assert planner.plan("crate://localhost/", rows=10, size=100) == "dask"
+    assert planner.plan("crate://localhost/", rows=1_000, size=100) == "adbc"
+    # SQLite connections are not pooled, so ADBC is used whatever the size.
+    assert planner.plan("sqlite:///test.sqlite", rows=10, size=100) == "adbc"
+
+
+def test_sql_write_planner_from_env(monkeypatch):
+    assert SqlWritePlanner.from_env() == SqlWritePlanner()
+    monkeypatch.setenv("INFLUXIO_SQL_THREADS_ROWS", "10")
+    monkeypatch.setenv("INFLUXIO_SQL_ADBC_ROWS", "100")
+    monkeypatch.setenv("INFLUXIO_SQL_DASK_BYTES", "1M")
+    monkeypatch.setenv("INFLUXIO_SQL_THREADS", "8")
+    assert SqlWritePlanner.from_env() == SqlWritePlanner(threads_rows=10, adbc_rows=100, dask_bytes=1024**2, threads=8)
+
+
+def test_dataframe_to_sql_planner(tmp_path, frame_basic, caplog):
+    """
+    The planner selects the engine, unless given explicitly.
+    """
+    dburi = f"sqlite:///{tmp_path / 'basic.sqlite'}"
+    dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic", planner=SqlWritePlanner(dask_rows=2))
+    assert f"engine={'adbc' if adbc_driver(dburi) else 'arrow'}" in caplog.text
+    dataframe_to_sql(frame_basic, dburi=dburi, tablename="basic", if_exists="append", engine="arrow")
+    assert "engine=arrow" in caplog.text
+    assert len(read_sql(dburi, "basic")) == 4
+
+
+def test_cratedb_table_ddl():
+    schema = pa.schema(
+        [
+            ("measurement", pa.string()),
+            ("time", pa.timestamp("ns", tz="UTC")),
+            ("sensor", pa.dictionary(pa.int32(), pa.string())),
+            ("temperature", pa.float64()),
+            ("count", pa.int64()),
+            ("active", pa.bool_()),
+            ("comment", pa.null()),
+        ]
+    )
+    assert cratedb_table_ddl(schema, tablename="basic") == (
+        'CREATE TABLE "basic" ("time" TIMESTAMP WITH TIME ZONE, "sensor" TEXT, "temperature" DOUBLE PRECISION, '
+        '"count" BIGINT, "active" BOOLEAN) WITH (column_policy = \'dynamic\')'
+    )
+    assert cratedb_table_ddl(
+        schema, tablename="basic", schemaname="testdrive", shards=6, replicas="0-1", partition="day"
+    ) == (
+        'CREATE TABLE "testdrive"."basic" ("time" TIMESTAMP WITH TIME ZONE, "sensor" TEXT, '
+        '"temperature" DOUBLE PRECISION, "count" BIGINT, "active" BOOLEAN, '
+        '"time_day" TIMESTAMP WITH TIME ZONE GENERATED ALWAYS AS date_trunc(\'day\', "time")) '
+        'CLUSTERED INTO 6 SHARDS PARTITIONED BY ("time_day") '
+        "WITH (column_policy = 'dynamic', number_of_replicas = '0-1')"
+    )
+
+
+def test_cratedb_table_ddl_invalid():
+    schema = pa.schema([("value", pa.float64())])
+    with pytest.raises(ValueError) as ex:
+        cratedb_table_ddl(schema, tablename="basic", partition="day")
+    assert ex.match("Partitioning a table needs a timestamp column")
+    with pytest.raises(ValueError) as ex:
+        cratedb_table_ddl(schema, tablename="basic", partition="fortnight")
+    assert ex.match("Unknown partition interval: fortnight")
+    with pytest.raises(ValueError) as ex:
+        cratedb_table_ddl(schema, tablename="basic", replicas="1'; DROP TABLE basic; --")
+    assert ex.match("Invalid number of replicas")
+
+
+def test_window_aggregator():
+    """
+    Batches are aggregated into windows per series, also when windows span batches.
+    """
+    aggregator = WindowAggregator(every=10, functions=["mean", "max", "count", "first", "last", "sum"])
+    aggregator.add(pl.DataFrame({"time": [15, 1, 2], "sensor": ["a", "a", "b"], "value": [5.0, 1.0, None]}))
+    aggregator.add(pl.DataFrame({"time": [3, 12, 4], "sensor": ["a", "a", "b"], "value": [3.0, 7.0, 4.0]}))
+    assert aggregator.result().to_dicts() == [
+        {
+            "sensor": "a",
+            "time": 0,
+            "value_mean": 2.0,
+            "value_max": 3.0,
+            "value_count": 2,
+            "value_first": 1.0,
+            "value_last": 3.0,
+            "value_sum": 4.0,
+        },
+        {
+            "sensor": "a",
+            "time": 10,
+            "value_mean": 6.0,
+            "value_max": 7.0,
+            "value_count": 2,
+            "value_first": 7.0,
+            "value_last": 5.0,
+            "value_sum": 12.0,
+        },
+        {
+            "sensor": "b",
+            "time": 0,
+            "value_mean": 4.0,
+            "value_max": 4.0,
+            "value_count": 1,
+            "value_first": 4.0,
+            "value_last": 4.0,
+            "value_sum": 4.0,
+        },
+    ]
+
+
+def test_window_aggregator_timestamps():
+    """
+    Windows of timestamp columns keep their data type, and only numeric fields are averaged.
+    """
+    aggregator = WindowAggregator(every=60_000_000_000, functions=["mean", "last"], tag_columns=[])
+    time = pl.Series([dt.datetime(2024, 1, 1, 0, 0, 30), dt.datetime(2024, 1, 1, 0, 1, 30)])
+    aggregator.add(pl.DataFrame({"time": time.dt.replace_time_zone("UTC"), "status": ["ok", "fail"], "value": [1, 2]}))
+    df = aggregator.result()
+    assert df.schema["time"] == pl.Datetime("us", "UTC")
+    assert df.columns == ["time", "status_last", "value_mean", "value_last"]
+    assert df["time"].dt.minute().to_list() == [0, 1]
+    assert WindowAggregator(every=10, functions=["mean"]).result().is_empty()
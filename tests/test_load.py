@@ -1,7 +1,16 @@
+import threading
+import time
 from pathlib import Path
 
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
 import influxio.core
-from influxio.adapter import SqlAlchemyAdapter
+from influxio.adapter import ArrowFileAdapter, SqlAlchemyAdapter
+from influxio.io import dataframes_from_lineprotocol
+from influxio.model import DataFormat, Rollup
+from influxio.testdata import SyntheticDataGenerator, write_lineprotocol
 
 
 def test_load_lineprotocol_to_sqlite_file_basic(line_protocol_file_basic, caplog):
@@ -81,3 +90,344 @@ def test_load_lineprotocol_to_sqlite_url(line_protocol_url_basic, caplog):
     db = SqlAlchemyAdapter.from_url(target_url)
     records = db.read_records(table="basic")
     assert len(records) == 2
+
+
+@pytest.mark.parametrize("suffix", ["parquet", "arrow"])
+def test_load_columnar_to_sqlite_file(line_protocol_file_industrial, tmp_path, suffix, caplog):
+    """
+    Load Parquet and Arrow IPC files into SQLite, one table per measurement.
+    """
+
+    # Provision source file from line protocol data.
+    with open(line_protocol_file_industrial, "rb") as fp:
+        frame = pl.concat(dataframes_from_lineprotocol(fp).values(), how="diagonal")
+    source_path = tmp_path / f"industrial.{suffix}"
+    if suffix == "parquet":
+        frame.write_parquet(source_path)
+    else:
+        frame.write_ipc(source_path)
+
+    # Define source and target URLs.
+    source_url = f"file://{source_path}?batch-size=3"
+    target_url = f"sqlite:///{tmp_path}/export.sqlite"
+
+    # Transfer data.
+    influxio.core.copy(source_url, target_url)
+
+    # Verify execution.
+    assert f"Reading {DataFormat.from_name(str(source_path)).value} data. source={source_path}" in caplog.messages
+
+    # Verify number of records in target database.
+    db = SqlAlchemyAdapter.from_url(target_url)
+    assert len(db.read_records(table="Füllstände")) == 4
+    assert len(db.read_records(table="Gasanalyse")) == 2
+    assert len(db.read_records(table="Stromproduktion")) == 2
+
+
+def test_load_annotated_csv_to_sqlite_file(annotated_csv_file_basic, tmp_path, caplog):
+    """
+    Load annotated CSV file into SQLite.
+    """
+
+    # Define source and target URLs.
+    source_url = f"file://{annotated_csv_file_basic}"
+    target_url = f"sqlite:///{tmp_path}/export.sqlite"
+
+    # Transfer data.
+    influxio.core.copy(source_url, target_url)
+
+    # Verify execution.
+    assert f"Reading ANNOTATED_CSV data. source={annotated_csv_file_basic}" in caplog.messages
+
+    # Verify records in target database.
+    db = SqlAlchemyAdapter.from_url(target_url)
+    records = db.read_records(table="basic")
+    assert len(records) == 2
+    assert records[0]["fruits"] == "apple,banana"
+    assert records[0]["price"] == 0.42
+
+
+def test_load_annotated_csv_mixed_to_sqlite_file(annotated_csv_file_mixed, tmp_path):
+    """
+    Load annotated CSV file with fields of different types into SQLite, one row per point.
+    """
+    target_url = f"sqlite:///{tmp_path}/export.sqlite"
+    influxio.core.copy(f"file://{annotated_csv_file_mixed}", target_url)
+    records = SqlAlchemyAdapter.from_url(target_url).read_records(table="cpu")
+    assert len(records) == 5
+    assert records[0]["usage"] == 1.5
+    assert records[0]["count"] == 1
+
+
+def test_convert_annotated_csv_to_lineprotocol(annotated_csv_file_basic, tmp_path):
+    """
+    Convert annotated CSV file into line protocol file.
+    """
+    ilp_path = tmp_path / "basic.lp"
+    influxio.core.copy(f"file://{annotated_csv_file_basic}", f"file://{ilp_path}")
+    assert ilp_path.read_text() == r"""
+basic,fruits=apple\,banana,id=1,name=foo price=0.42 1414747376000000000
+basic,fruits=pear,id=2,name=bar price=0.84 1414747378000000000
+""".lstrip()
+
+
+def test_convert_parquet_to_annotated_csv(line_protocol_file_basic, tmp_path):
+    """
+    Convert Parquet file into annotated CSV file.
+    """
+    with open(line_protocol_file_basic, "rb") as fp:
+        frame = dataframes_from_lineprotocol(fp)["basic"]
+    parquet_path = tmp_path / "basic.parquet"
+    csv_path = tmp_path / "basic.csv"
+    frame.write_parquet(parquet_path)
+    influxio.core.copy(f"file://{parquet_path}", f"file://{csv_path}")
+    lines = csv_path.read_text().splitlines()
+    assert lines[1] == "#datatype,string,long,string,dateTime:RFC3339,string,string,string,double"
+    assert lines[3].startswith(",result,table,_measurement,_time,")
+    assert lines[4].startswith(",,0,basic,2014-10-31T09:22:56Z,")
+    assert len(lines) == 7
+
+
+class RecordingSqlAlchemyAdapter(SqlAlchemyAdapter):
+    """
+    Record the threads loading each table, instead of writing to a database.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = {}
+
+    def write(self, source, table=None):
+        if table == "broken":
+            raise ValueError("Loading table failed")
+        time.sleep(0.05)
+        self.threads[table] = threading.current_thread().name
+
+
+def test_load_tables_concurrently():
+    """
+    Tables are loaded concurrently, up to `table-concurrency` at a time.
+    """
+    adapter = RecordingSqlAlchemyAdapter("crate://localhost/testdrive?table-concurrency=4")
+    frames = {f"table{index}": pl.DataFrame({"value": [index]}) for index in range(4)}
+    started = time.perf_counter()
+    adapter.write_tables(frames)
+    assert time.perf_counter() - started < 0.15
+    assert sorted(adapter.threads) == sorted(frames)
+    assert len(set(adapter.threads.values())) == 4
+
+    with pytest.raises(ValueError) as ex:
+        adapter.write_tables({"broken": frames["table0"], **frames})
+    assert ex.match("Loading table failed")
+
+
+def test_load_tables_sqlite_sequentially():
+    """
+    SQLite permits a single writer only, so tables are loaded one after another.
+    """
+    adapter = RecordingSqlAlchemyAdapter("sqlite:///export.sqlite?table-concurrency=4")
+    adapter.write_tables({f"table{index}": pl.DataFrame({"value": [index]}) for index in range(2)})
+    assert set(adapter.threads.values()) == {threading.current_thread().name}
+
+
+def test_load_lineprotocol_to_sqlite_upsert(line_protocol_file_industrial, tmp_path):
+    """
+    Loading the same data twice using `if-exists=upsert` does not duplicate rows.
+    """
+    target_url = f"sqlite:///{tmp_path / 'export.sqlite'}?if-exists=upsert"
+    influxio.core.copy(f"file://{line_protocol_file_industrial}", target_url)
+    influxio.core.copy(f"file://{line_protocol_file_industrial}", target_url)
+    db = SqlAlchemyAdapter.from_url(target_url)
+    assert len(db.read_records(table="Füllstände")) == 4
+    assert len(db.read_records(table="Gasanalyse")) == 2
+
+
+class FailingSource(ArrowFileAdapter):
+    """
+    Source yielding a single data frame, and failing afterwards.
+    """
+
+    def read_df(self):
+        yield pl.DataFrame({"time": [1, 2], "value": [42.42, 43.43]})
+        raise IOError("Reading data failed")
+
+
+def test_load_replace_shadow_table(line_protocol_file_basic, tmp_path):
+    """
+    Replacing a table loads data into a shadow table, and swaps it with the target table at the end.
+    When loading fails, the target table is kept.
+    """
+    target_url = f"sqlite:///{tmp_path / 'export.sqlite'}?table=basic&if-exists=replace"
+    influxio.core.copy(f"file://{line_protocol_file_basic}", target_url)
+    influxio.core.copy(f"file://{line_protocol_file_basic}", target_url)
+    db = SqlAlchemyAdapter.from_url(target_url)
+    assert len(db.read_records(table="basic")) == 2
+    assert not db.table_exists("basic__influxio_tmp")
+
+    with pytest.raises(IOError) as ex:
+        db.write(FailingSource(path="failing.parquet", format=DataFormat.PARQUET))
+    assert ex.match("Reading data failed")
+    assert len(db.read_records(table="basic")) == 2
+    assert not db.table_exists("basic__influxio_tmp")
+
+
+class BatchedSource(ArrowFileAdapter):
+    """
+    Source yielding data of two measurements in multiple batches, optionally failing afterwards.
+    """
+
+    fail = False
+    offset = 0
+
+    def read_df(self):
+        for batch in range(3):
+            time = self.offset + batch
+            yield pl.DataFrame({"time": [time], "measurement": [f"m{batch % 2}"], "value": [batch + 0.5]})
+        if self.fail:
+            raise IOError("Reading data failed")
+
+
+def test_load_replace_shadow_table_batches(tmp_path):
+    """
+    Replacing tables of multiple measurements, loaded in multiple batches, swaps in all batches at the end.
+    """
+    db = SqlAlchemyAdapter.from_url(f"sqlite:///{tmp_path / 'export.sqlite'}?if-exists=replace")
+    db.write(BatchedSource(path="batched.parquet", format=DataFormat.PARQUET))
+    db = SqlAlchemyAdapter.from_url(f"sqlite:///{tmp_path / 'export.sqlite'}?if-exists=replace")
+    db.write(BatchedSource(path="batched.parquet", format=DataFormat.PARQUET))
+    assert [record["time"] for record in db.read_records(table="m0")] == [0, 2]
+    assert [record["time"] for record in db.read_records(table="m1")] == [1]
+
+    source = BatchedSource(path="batched.parquet", format=DataFormat.PARQUET)
+    source.fail = True
+    source.offset = 10
+    db = SqlAlchemyAdapter.from_url(f"sqlite:///{tmp_path / 'export.sqlite'}?if-exists=replace")
+    with pytest.raises(IOError) as ex:
+        db.write(source)
+    assert ex.match("Reading data failed")
+    assert [record["time"] for record in db.read_records(table="m0")] == [0, 2]
+    assert [record["time"] for record in db.read_records(table="m1")] == [1]
+    assert not db.table_exists("m0__influxio_tmp")
+    assert not db.table_exists("m1__influxio_tmp")
+
+
+def test_load_lineprotocol_to_sqlite_batches(tmp_path):
+    """
+    Loading line protocol in batches appends them to one table per measurement, adding fields of later batches.
+    """
+    source_path = tmp_path / "input.lp"
+    source_path.write_text(
+        "m0,host=a value=1 1\n"
+        "m1,host=a count=1i 1\n"
+        "m0,host=b value=2 2\n"
+        'm0,host=c,region=eu value=3,status="ok" 3\n'
+    )
+    for _ in range(2):
+        db = SqlAlchemyAdapter.from_url(f"sqlite:///{tmp_path / 'export.sqlite'}?if-exists=replace")
+        db.from_lineprotocol(source_path, batch_size=1)
+    assert db.read_records(table="m0") == [
+        {"time": 1, "host": "a", "value": 1.0, "region": None, "status": None},
+        {"time": 2, "host": "b", "value": 2.0, "region": None, "status": None},
+        {"time": 3, "host": "c", "value": 3.0, "region": "eu", "status": "ok"},
+    ]
+    assert db.read_records(table="m1") == [{"time": 1, "host": "a", "count": 1}]
+    assert not db.table_exists("m0__influxio_tmp")
+
+
+def test_load_lineprotocol_to_sqlite_selection(line_protocol_file_industrial, tmp_path):
+    """
+    Load line protocol file into SQLite, selecting a time range and fields while decoding.
+    """
+    source_url = f"file://{line_protocol_file_industrial}?start=2022-01-14T00:00:00Z&fields=Gassack,Methan"
+    target_url = f"sqlite:///{tmp_path}/export.sqlite"
+    influxio.core.copy(source_url, target_url)
+
+    db = SqlAlchemyAdapter.from_url(target_url)
+    records = db.read_records(table="Füllstände")
+    assert [record["Gassack"] for record in records] == [73.64004516601562, 73.4375]
+    assert "Endlager" not in records[0]
+    assert not db.table_exists("Stromproduktion")
+
+
+def test_load_parquet_to_sqlite_selection(line_protocol_file_basic, tmp_path, caplog):
+    """
+    Load Parquet file into SQLite, skipping row groups outside of the selected time range.
+    """
+    with open(line_protocol_file_basic, "rb") as fp:
+        frame = dataframes_from_lineprotocol(fp)["basic"]
+    source_path = tmp_path / "basic.parquet"
+    frame.write_parquet(source_path, row_group_size=1)
+
+    source_url = f"file://{source_path}?start=1414747377000000000&tags=name&tag.fruits=pear"
+    target_url = f"sqlite:///{tmp_path}/export.sqlite"
+    influxio.core.copy(source_url, target_url)
+
+    assert "Selected row groups by time range. row_groups=1" in caplog.messages
+    records = SqlAlchemyAdapter.from_url(target_url).read_records(table="basic")
+    assert records == [{"time": 1414747378000000000, "name": "bar", "price": 0.84}]
+
+
+def test_load_lineprotocol_to_sqlite_rollup(line_protocol_file_industrial, tmp_path):
+    """
+    Load aggregates of line protocol file into SQLite, into one table per measurement and window duration.
+    """
+    source_url = f"file://{line_protocol_file_industrial}?aggregate=mean,count&every=1h,1d"
+    target_url = f"sqlite:///{tmp_path}/export.sqlite"
+    influxio.core.copy(source_url, target_url)
+
+    db = SqlAlchemyAdapter.from_url(target_url)
+    assert not db.table_exists("Füllstände")
+    records = [record for record in db.read_records(table="Füllstände_1h") if record["Gassack_count"]]
+    assert len(records) == 1
+    assert records[0]["time"] == 1642305600000000000
+    assert records[0]["Gassack_mean"] == (73.64004516601562 + 73.4375) / 2
+    assert records[0]["Gassack_count"] == 2
+    assert records[0]["Endlager_mean"] is None
+    assert len(db.read_records(table="Füllstände_1d")) == 2
+
+
+def test_rollup_lineprotocol_batches(tmp_path):
+    """
+    Aggregating line protocol batch by batch yields the same rollups as aggregating all data at once.
+    """
+    generator = SyntheticDataGenerator(
+        rows=2_000, series=6, measurements=["m0", "m1"], sparse=True, jitter=0.5, out_of_order=0.1
+    )
+    path = tmp_path / "input.lp"
+    write_lineprotocol(generator, path, processes=1)
+    rollup = Rollup(functions=Rollup.FUNCTIONS, windows=["10s", "1m"])
+    with open(path, "rb") as fp:
+        expected = rollup.aggregate_tables(dataframes_from_lineprotocol(fp))
+
+    db = SqlAlchemyAdapter.from_url(f"sqlite:///{tmp_path}/export.sqlite")
+    with open(path, "rb") as fp:
+        tables = db.rollup_lineprotocol(fp, rollup, batch_size=256)
+    assert sorted(tables) == sorted(expected) == ["m0_10s", "m0_1m", "m1_10s", "m1_1m"]
+    for name, df in expected.items():
+        assert_frame_equal(tables[name], df, check_column_order=False)
+
+
+def test_load_parquet_to_sqlite_rollup(line_protocol_file_basic, tmp_path):
+    """
+    Load aggregates of Parquet file into SQLite, with a selected target table.
+    """
+    with open(line_protocol_file_basic, "rb") as fp:
+        frame = dataframes_from_lineprotocol(fp)["basic"]
+    source_path = tmp_path / "basic.parquet"
+    frame.write_parquet(source_path)
+
+    source_url = f"file://{source_path}?aggregate=max&every=1m&tags=id"
+    target_url = f"sqlite:///{tmp_path}/export.sqlite?table=prices"
+    influxio.core.copy(source_url, target_url)
+
+    records = SqlAlchemyAdapter.from_url(target_url).read_records(table="prices_1m")
+    assert records == [
+        {"id": "1", "time": 1414747320000000000, "price_max": 0.42},
+        {"id": "2", "time": 1414747320000000000, "price_max": 0.84},
+    ]
+
+
+def test_rollup_unsupported_target(line_protocol_file_basic, tmp_path):
+    with pytest.raises(NotImplementedError) as ex:
+        influxio.core.copy(f"file://{line_protocol_file_basic}?aggregate=max&every=1m", f"file://{tmp_path}/out.lp")
+    assert ex.match("Rolling up data is only supported when loading data into SQL databases")
@@ -0,0 +1,179 @@
+"""
+Peak memory regression tests for large transfers.
+
+Each scenario runs `influxio copy` in a subprocess, once on an input of a single chunk,
+and once on a large input, and compares the peak resident set sizes of both runs.
+When data is streamed in chunks, peak memory does not depend on the size of the input,
+so the growth of peak memory is bounded by a budget relative to the size of a chunk.
+
+The tests are marked as `slow`, and deselected by the `addopts` of the pytest configuration. Run them using::
+
+    pytest -m slow tests/test_memory.py
+
+Input sizes are configured in gigabytes, like `INFLUXIO_MEMORY_TEST_SIZES=1,5`.
+"""
+
+import dataclasses
+import os
+import subprocess
+import sys
+import threading
+import time
+import typing as t
+from pathlib import Path
+
+import pytest
+
+from influxio.testdata import SyntheticDataGenerator, write_lineprotocol
+
+pytestmark = pytest.mark.slow
+
+# Number of rows per chunk, for sources generating data in chunks.
+CHUNK_ROWS = 100_000
+
+
+@dataclasses.dataclass
+class MemoryScenario:
+    """
+    A copy operation, and its budget of peak memory growth, in multiples of the size of a chunk of line protocol.
+
+    `source` and `target` are templates for URLs, with `{rows}`, `{input}`, and `{output}` placeholders.
+    """
+
+    name: str
+    source: str
+    target: str
+    budget: float
+
+    def command(self, rows: int, input_path: Path, output_path: Path) -> t.List[str]:
+        variables = {"rows": rows, "chunk_rows": CHUNK_ROWS, "input": input_path, "output": output_path}
+        return [
+            sys.executable,
+            "-c",
+            "from influxio.cli import cli; cli()",
+            "copy",
+            self.source.format(**variables),
+            self.target.format(**variables),
+        ]
+
+
+SCENARIOS = [
+    MemoryScenario(
+        name="synthetic-to-lineprotocol",
+        source="testdata://synthetic/?rows={rows}&chunk-size={chunk_rows}&processes=1",
+        target="file://{output}/output.lp",
+        budget=4,
+    ),
+    MemoryScenario(
+        name="synthetic-to-sqlite",
+        source="testdata://synthetic/?rows={rows}&chunk-size={chunk_rows}",
+        target="sqlite:///{output}/output.sqlite?table=synthetic",
+        budget=8,
+    ),
+    MemoryScenario(
+        name="lineprotocol-to-sqlite",
+        source="file://{input}",
+        target="sqlite:///{output}/output.sqlite",
+        budget=8,
+    ),
+]
+
+
+def input_sizes() -> t.List[float]:
+    """
+    Decode list of input sizes in gigabytes from environment variable.
+    """
+    return [float(value) for value in os.environ.get("INFLUXIO_MEMORY_TEST_SIZES", "1").split(",")]
+
+
+def generator(rows: int) -> SyntheticDataGenerator:
+    return SyntheticDataGenerator(rows=rows, chunk_size=CHUNK_ROWS)
+
+
+@pytest.fixture(scope="session")
+def chunk_bytes() -> int:
+    """
+    Size of a chunk of synthetic data, in line protocol format.
+    """
+    return len(generator(CHUNK_ROWS).lineprotocol_chunk(0))
+
+
+@pytest.fixture(scope="session", params=input_sizes(), ids=lambda value: f"{value:g}GB")
+def input_rows(request, chunk_bytes) -> int:
+    return int(request.param * 1024**3 / chunk_bytes) * CHUNK_ROWS
+
+
+@pytest.fixture(scope="session")
+def input_file(tmp_path_factory, input_rows) -> Path:
+    """
+    Generate synthetic line protocol file of the requested size, once per session.
+    """
+    path = tmp_path_factory.mktemp("memory") / "input.lp"
+    write_lineprotocol(generator(input_rows), path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def small_input_file(tmp_path_factory) -> Path:
+    path = tmp_path_factory.mktemp("memory") / "input.lp"
+    write_lineprotocol(generator(CHUNK_ROWS), path)
+    return path
+
+
+def run_peak_rss(command: t.List[str], limit: t.Optional[int] = None) -> int:
+    """
+    Run command in a subprocess, and return its peak resident set size, in bytes.
+
+    When the resident set size exceeds the limit, the process is terminated early,
+    and the limit is reported, to fail quickly, and to protect the host from running
+    out of memory. Monitoring uses the `/proc` filesystem, so it is only available on Linux.
+    """
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)  # noqa: S603
+    exceeded = threading.Event()
+    finished = threading.Event()
+
+    def monitor():
+        status = Path(f"/proc/{process.pid}/status")
+        while not finished.is_set():
+            try:
+                rss = next(line for line in status.read_text().splitlines() if line.startswith("VmRSS:"))
+            except (OSError, StopIteration):
+                break
+            if int(rss.split()[1]) * 1024 > limit:
+                exceeded.set()
+                process.kill()
+                break
+            time.sleep(0.1)
+
+    if limit is not None and sys.platform == "linux":
+        threading.Thread(target=monitor, daemon=True).start()
+    stderr = process.stderr.read()
+    # Wait for the process using `wait4`, to get the resource usage of this process only.
+    _, status, usage = os.wait4(process.pid, 0)
+    finished.set()
+    process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    if exceeded.is_set():
+        return t.cast(int, limit) + 1
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, stderr=stderr)
+    # Linux reports kilobytes, macOS reports bytes.
+    if sys.platform == "darwin":
+        return usage.ru_maxrss
+    return usage.ru_maxrss * 1024
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=lambda scenario: scenario.name)
+def test_peak_memory(scenario: MemoryScenario, tmp_path, chunk_bytes, input_rows, input_file, small_input_file):
+    """
+    Copying a large input must not need considerably more memory than copying a single chunk.
+    """
+    (tmp_path / "baseline").mkdir()
+    baseline = run_peak_rss(scenario.command(CHUNK_ROWS, small_input_file, tmp_path / "baseline"))
+    budget = int(scenario.budget * chunk_bytes)
+    peak = run_peak_rss(scenario.command(input_rows, input_file, tmp_path), limit=baseline + budget)
+    growth = peak - baseline
+    sys.stderr.write(
+        f"{scenario.name}: baseline={baseline / 1024**2:.0f}MB, peak={peak / 1024**2:.0f}MB, "
+        f"budget={budget / 1024**2:.0f}MB\n"
+    )
+    assert growth <= budget, f"Peak memory grew by {growth / 1024**2:.0f}MB, budget is {budget / 1024**2:.0f}MB"
@@ -0,0 +1,158 @@
+import json
+import time
+import tracemalloc
+
+from click.testing import CliRunner
+
+from influxio.cli import cli
+from influxio.util.metrics import Metrics, get_metrics
+
+
+def slow(items, delay):
+    for item in items:
+        time.sleep(delay)
+        yield item
+
+
+def test_metrics_disabled():
+    """
+    Without an active collector, recording is a no-op, and iterables are not wrapped.
+    """
+    metrics = get_metrics()
+    items = [1, 2, 3]
+    assert metrics.iterate(items, "read") is items
+    with metrics.measure("write", rows=3, bytes=lambda: 1 / 0):
+        pass
+    assert metrics.stages == {}
+
+
+def test_metrics_iterate_batch():
+    """
+    Items are measured in batches, and counted using the lists of items of each batch.
+    """
+    metrics = Metrics()
+    with metrics.activate():
+        with metrics.measure("write", rows=lambda: 5, bytes=lambda: 42):
+            pass
+        items = metrics.iterate(
+            iter(["a", "bb", "ccc", "d", "e"]), "read", rows=len, bytes=lambda batch: len("".join(batch)), batch=2
+        )
+        assert list(items) == ["a", "bb", "ccc", "d", "e"]
+    assert metrics.stages["write"].rows == 5
+    assert metrics.stages["write"].bytes == 42
+    read = metrics.stages["read"]
+    assert read.rows == 5
+    assert read.bytes == 8
+    assert read.batches == 3
+
+
+def test_metrics_blocked_time():
+    """
+    Time spent by the producer is accounted as blocked time of the consumer, and vice versa.
+    """
+    metrics = Metrics()
+    with metrics.activate():
+        assert get_metrics() is metrics
+        for item in metrics.iterate(slow(["a", "bb"], 0.02), "read", consumer="write", rows=len, bytes=len):
+            with metrics.measure("write", rows=1, bytes=len(item)):
+                time.sleep(0.01)
+    assert get_metrics() is not metrics
+
+    read = metrics.stages["read"]
+    write = metrics.stages["write"]
+    assert read.rows == 3
+    assert read.batches == 2
+    assert write.rows == 2
+    assert write.bytes == 3
+    assert read.duration >= 0.04
+    assert write.blocked == read.duration
+    assert 0.02 <= write.duration < 0.04
+    assert read.blocked >= 0.02
+    assert metrics.duration >= 0.06
+
+
+def test_metrics_prometheus():
+    metrics = Metrics()
+    with metrics.activate():
+        with metrics.measure("write", rows=42, bytes=1024):
+            pass
+        with metrics.measure("read", rows=42):
+            pass
+    text = metrics.to_prometheus()
+    assert "# TYPE influxio_stage_rows gauge" in text
+    assert 'influxio_stage_rows{stage="write"} 42' in text
+    assert 'influxio_stage_bytes{stage="write"} 1024' in text
+    assert "influxio_copy_duration_seconds" in text
+    # Stages are reported in pipeline order.
+    assert text.index('{stage="read"}') < text.index('{stage="write"}')
+
+
+def test_copy_stats_json(tmp_path, line_protocol_file_industrial):
+    """
+    CLI test: Invoke `influxio copy --stats=json`, and verify the per-stage report.
+    """
+    stats_file = tmp_path / "stats.json"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        args=[
+            "copy",
+            f"file://{line_protocol_file_industrial}",
+            f"sqlite:///{tmp_path / 'industrial.sqlite'}?table=industrial",
+            "--stats=json",
+            f"--stats-output={stats_file}",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    stats = json.loads(stats_file.read_text())
+    assert list(stats["stages"].keys()) == ["read", "decode", "write"]
+    assert stats["stages"]["read"]["rows"] == 8
+    assert 0 < stats["stages"]["read"]["bytes"] <= line_protocol_file_industrial.stat().st_size
+    assert stats["stages"]["decode"]["rows"] == 8
+    assert stats["stages"]["write"]["rows"] == 8
+    assert stats["stages"]["write"]["batches"] == 3
+
+
+def test_copy_stats_prometheus(tmp_path, annotated_csv_file_basic):
+    """
+    CLI test: Invoke `influxio copy --stats=prometheus`, writing a textfile for the node exporter.
+    """
+    stats_file = tmp_path / "influxio.prom"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        args=[
+            "copy",
+            f"file://{annotated_csv_file_basic}",
+            f"file://{tmp_path / 'basic.lp'}",
+            "--stats=prometheus",
+            f"--stats-output={stats_file}",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    text = stats_file.read_text()
+    assert 'influxio_stage_rows{stage="transform"} 2' in text
+    assert 'influxio_stage_batches{stage="commit"} 1' in text
+
+
+def test_memory_tracker_nested():
+    """
+    Peak memory of an outer window includes the peak of nested windows.
+    """
+    tracemalloc.start()
+    try:
+        metrics = Metrics()
+        with metrics.activate():
+            with metrics.measure("decode"):
+                with metrics.measure("read"):
+                    data = bytearray(2_000_000)
+                del data
+                with metrics.measure("transform"):
+                    pass
+    finally:
+        tracemalloc.stop()
+    assert metrics.stages["read"].memory_peak >= 2_000_000
+    assert metrics.stages["decode"].memory_peak >= 2_000_000
+    assert metrics.stages["transform"].memory_peak < 100_000
@@ -1,6 +1,7 @@
+import polars as pl
 import pytest
 
-from influxio.model import DataFormat, OutputFile
+from influxio.model import DataFormat, OutputFile, Rollup, Selection
 
 
 def test_data_format_from_name_success():
@@ -61,3 +62,78 @@ def test_output_file_failure_scheme(tmp_path):
     with pytest.raises(NotImplementedError) as ex:
         DataFormat.from_url("file://-?format=bar")
     assert ex.match("Invalid data format: bar")
+
+
+def test_data_format_columnar_success():
+    assert DataFormat.from_name("foo.parquet") is DataFormat.PARQUET
+    assert DataFormat.from_name("foo.arrow") is DataFormat.ARROW_IPC
+    assert DataFormat.from_name("foo.feather") is DataFormat.ARROW_IPC
+    assert DataFormat.from_url("file://-?format=parquet") is DataFormat.PARQUET
+    assert DataFormat.PARQUET.is_columnar
+    assert not DataFormat.LINE_PROTOCOL_UNCOMPRESSED.is_columnar
+
+
+def test_selection_from_url():
+    selection = Selection.from_url(
+        "file:///data.lp?start=2024-01-01T00:00:00Z&stop=1704070800000000000&fields=a,b&tags=x&tag.y=1,2&format=lp"
+    )
+    assert selection == Selection(
+        start=1704067200000000000, stop=1704070800000000000, fields=["a", "b"], tags=["x"], where={"y": ["1", "2"]}
+    )
+    assert selection
+    assert not Selection.from_url("file:///data.lp?format=lp")
+    assert Selection.is_parameter("tag.y")
+    assert not Selection.is_parameter("format")
+
+
+def test_selection_flux():
+    assert Selection().flux() == "|> range(start: 0, stop: now())"
+    selection = Selection(start=1704067200000000000, fields=["a"], tags=["x"], where={"y": ["1", '"2"']})
+    assert selection.flux().splitlines() == [
+        "|> range(start: 2024-01-01T00:00:00.000000000Z, stop: now())",
+        '|> filter(fn: (r) => r["_field"] == "a")',
+        '|> filter(fn: (r) => r["y"] == "1" or r["y"] == "\\"2\\"")',
+        '|> keep(columns: ["_start", "_stop", "_time", "_measurement", "_field", "_value", "x"])',
+    ]
+
+
+def test_selection_apply():
+    df = pl.DataFrame(
+        {
+            "time": [1, 2, 3],
+            "measurement": ["m", "m", "m"],
+            "x": ["a", "b", "a"],
+            "y": ["c", "d", "e"],
+            "value": [1.0, 2.0, 3.0],
+            "other": [1, 2, 3],
+        }
+    )
+    result = Selection(start=2, stop=4, fields=["value"], tags=["x"], where={"y": ["c", "e"]}).apply(df)
+    assert result.to_dicts() == [{"time": 3, "measurement": "m", "x": "a", "value": 3.0}]
+    assert Selection(where={"z": ["a"]}).apply(df).is_empty()
+
+
+def test_rollup_from_url():
+    rollup = Rollup.from_url("file:///data.lp?aggregate=mean,max&every=1m,1h&format=lp")
+    assert rollup == Rollup(functions=["mean", "max"], windows=["1m", "1h"])
+    assert rollup.table("demo", "1m") == "demo_1m"
+    assert not Rollup.from_url("file:///data.lp")
+    with pytest.raises(ValueError) as ex:
+        Rollup.from_url("file:///data.lp?aggregate=mean")
+    assert ex.match("Rolling up data needs both aggregate functions and window durations")
+    with pytest.raises(ValueError) as ex:
+        Rollup.from_url("file:///data.lp?aggregate=median&every=1m")
+    assert ex.match("Aggregate function not supported: median")
+    with pytest.raises(ValueError) as ex:
+        Rollup.from_url("file:///data.lp?aggregate=mean&every=1fortnight")
+    assert ex.match("Invalid duration: 1fortnight")
+
+
+def test_rollup_flux():
+    assert Rollup(functions=["mean"], windows=["1m"]).flux("data", "1m") == (
+        'data |> aggregateWindow(every: 1m, fn: mean, createEmpty: false, timeSrc: "_start") '
+        '|> map(fn: (r) => ({r with _field: r._field + "_mean"}))'
+    )
+    flux = Rollup(functions=["mean", "max"], windows=["1m"]).flux("data", "1h")
+    assert flux.startswith("union(tables: [")
+    assert "aggregateWindow(every: 1h, fn: max, " in flux
@@ -0,0 +1,114 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import influxio.core
+from influxio.util.metrics import Metrics
+from influxio.util.pipeline import pipeline, pipelined
+from influxio.util.stub import InfluxDbFake
+
+
+def slow(items, delay, produced=None):
+    for item in items:
+        time.sleep(delay)
+        if produced is not None:
+            produced.append(item)
+        yield item
+
+
+def test_pipelined_order():
+    assert list(pipelined(range(100), depth=3)) == list(range(100))
+    assert list(pipeline(range(100), lambda item: item * 2, depth=1)) == list(range(0, 200, 2))
+
+
+def test_pipelined_threads():
+    """
+    Items are produced on a background thread, unless the queue depth is zero.
+    """
+
+    def producer():
+        yield threading.current_thread()
+
+    assert next(pipelined(producer(), depth=1)) is not threading.current_thread()
+    assert next(pipelined(producer(), depth=0)) is threading.current_thread()
+
+
+def test_pipelined_exception():
+    """
+    Exceptions of the producer are re-raised within the consumer, after the items produced before.
+    """
+
+    def producer():
+        yield 1
+        raise ValueError("Producer failed")
+
+    items = []
+    with pytest.raises(ValueError) as ex:
+        for item in pipeline(producer(), lambda item: item + 1):
+            items.append(item)
+    assert ex.match("Producer failed")
+    assert items == [2]
+
+
+def test_pipelined_close():
+    """
+    When the consumer stops early, the producer stops, after filling the queue at most.
+    """
+    produced = []
+    items = pipelined(slow(range(100), 0.001, produced), depth=2)
+    assert next(items) == 0
+    items.close()
+    assert len(produced) <= 4
+    assert not any(thread.name.startswith("influxio-pipeline") for thread in threading.enumerate())
+
+
+def test_pipeline_overlap():
+    """
+    Reading, transforming, and writing run concurrently, so the total time approaches the one of the slowest stage.
+    """
+
+    def transform(item):
+        time.sleep(0.03)
+        return item
+
+    started = time.perf_counter()
+    for _ in pipeline(slow(range(8), 0.03), transform, depth=2):
+        time.sleep(0.03)
+    # Running the stages one after another takes 8 * 3 * 0.03 = 0.72 seconds.
+    assert time.perf_counter() - started < 0.5
+
+
+def test_pipeline_metrics():
+    """
+    Stages running on background threads report to the active metrics collector.
+    """
+
+    def transform(item):
+        with metrics.measure("transform", rows=1):
+            time.sleep(0.02)
+        return item
+
+    metrics = Metrics()
+    with metrics.activate():
+        frames = metrics.iterate(slow(["a", "bb"], 0.02), "read", rows=len)
+        for _ in pipeline(frames, transform, stage="transform", consumer="write"):
+            pass
+    assert metrics.stages["read"].rows == 3
+    assert metrics.stages["read"].duration >= 0.04
+    assert metrics.stages["transform"].rows == 2
+    assert metrics.stages["transform"].duration >= 0.04
+    assert metrics.stages["transform"].blocked > 0
+    assert metrics.stages["write"].blocked >= 0.04
+
+
+@pytest.mark.parametrize("depth", [0, 2])
+def test_copy_influxdb_to_sqlite_pipelined(tmp_path, depth):
+    target = tmp_path / "export.sqlite"
+    with InfluxDbFake(latency=0.01) as fake:
+        url = f"http://example:token@{fake.address}/testdrive/demo"
+        influxio.core.copy("testdata://dateindex/?rows=25", url)
+        influxio.core.copy(url, f"sqlite:///{target}?table=demo&queue-depth={depth}")
+    with sqlite3.connect(target) as connection:
+        assert connection.execute("SELECT COUNT(*), SUM(A IS NOT NULL) FROM demo").fetchone() == (25, 25)
@@ -0,0 +1,44 @@
+import json
+import pstats
+
+from click.testing import CliRunner
+
+from influxio.cli import cli
+
+
+def test_copy_profile(tmp_path, line_protocol_file_industrial):
+    """
+    CLI test: Invoke `influxio --profile=... copy`, and verify the profiling results.
+    """
+    profile_path = tmp_path / "profile"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        args=[
+            f"--profile={profile_path}",
+            "copy",
+            f"file://{line_protocol_file_industrial}",
+            f"sqlite:///{tmp_path / 'industrial.sqlite'}?table=industrial&engine=dask",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+
+    stats = pstats.Stats(str(profile_path / "profile.pstats"))
+    assert any(function == "from_lineprotocol" for _, _, function in stats.stats.keys())
+    assert "cumulative" in (profile_path / "profile.txt").read_text()
+
+    stacks = (profile_path / "stacks.collapsed").read_text().splitlines()
+    assert stacks
+    stack, count = stacks[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert ";" in stack
+
+    memory = json.loads((profile_path / "memory.json").read_text())
+    assert memory["peak"] > 0
+    assert list(memory["stages"].keys()) == ["read", "decode", "write"]
+    assert memory["stages"]["write"] > 0
+    assert memory["top"]
+
+    dask = json.loads((profile_path / "dask.json").read_text())
+    assert any("to_sql" in task["key"] for task in dask["tasks"])
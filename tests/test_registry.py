@@ -0,0 +1,139 @@
+from importlib.metadata import EntryPoint
+
+import pytest
+
+import influxio.core
+import influxio.registry
+from influxio.adapter import ArrowFileAdapter, FileAdapter, InfluxDbApiAdapter, SqlAlchemyAdapter
+from influxio.registry import AdapterRegistry
+from influxio.util.db import get_sqlalchemy_dialects
+
+
+class DummySink:
+    """
+    Sink adapter of another package, recording the data frames written to it.
+    """
+
+    frames: list = []
+
+    def __init__(self, url, progress: bool = False):
+        self.url = url
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        return cls(url, **kwargs)
+
+    def write_df(self, df):
+        self.frames.append(df)
+
+    def write(self, source):
+        for df in source.read_df():
+            self.write_df(df)
+
+
+class DummySource(ArrowFileAdapter):
+    """
+    Source adapter of another package, yielding a single data frame.
+    """
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        return cls(path="dummy", format=None, measurement="dummy", **kwargs)
+
+    def read_df(self):
+        import polars as pl
+
+        yield pl.DataFrame({"time": [1, 2], "value": [42.42, 43.43]})
+
+
+@pytest.fixture
+def registry(monkeypatch) -> AdapterRegistry:
+    """
+    Provide a registry which discovers the dummy adapters per entry points.
+    """
+    eps = [
+        EntryPoint(name="dummy", value="tests.test_registry:DummySink", group="influxio.adapters"),
+        EntryPoint(name="dummysource", value="tests.test_registry:DummySource", group="influxio.adapters"),
+    ]
+    monkeypatch.setattr(influxio.registry, "entry_points", lambda group: [ep for ep in eps if ep.group == group])
+    registry = AdapterRegistry()
+    registry.register_sink("http", "influxio.adapter:InfluxDbApiAdapter")
+    registry.register_sink("file", "influxio.adapter:FileAdapter", progress=True)
+    monkeypatch.setattr(influxio.core, "registry", registry)
+    DummySink.frames = []
+    return registry
+
+
+def test_registry_builtin_sinks(registry):
+    assert registry.sink("http://localhost:8086/testdrive/demo") is InfluxDbApiAdapter
+    assert registry.sink("file://export.lp") is FileAdapter
+    assert registry.sink("sqlite:///export.sqlite") is SqlAlchemyAdapter
+    assert registry.sink("crate+psycopg://localhost/testdrive") is SqlAlchemyAdapter
+
+
+def test_registry_sink_options(registry):
+    """
+    Built-in sinks are created using the arguments they have been registered with, other sinks with `progress`.
+    """
+    assert registry.resolve_sink("http://localhost:8086/testdrive/demo") == (InfluxDbApiAdapter, {})
+    assert registry.resolve_sink("file://export.lp") == (FileAdapter, {"progress": True})
+    assert registry.resolve_sink("sqlite:///export.sqlite") == (SqlAlchemyAdapter, {"progress": True})
+    assert registry.resolve_sink("dummy://foo") == (DummySink, {"progress": True})
+    assert registry.create_sink("file://export.lp").progress is True
+
+
+def test_registry_unknown_sink(registry):
+    with pytest.raises(NotImplementedError) as ex:
+        registry.sink("foo://bar")
+    assert ex.match("Data sink not implemented: foo://bar")
+
+
+def test_registry_entry_point_sink(registry):
+    assert registry.sink("dummy://foo") is DummySink
+    assert registry.sink("dummy+bar://foo") is DummySink
+    assert registry.source("dummy://foo") is None
+    assert registry.source("http://localhost:8086/testdrive/demo") is None
+
+
+def test_registry_entry_point_source(registry):
+    assert registry.source("dummysource://foo") is DummySource
+
+
+def test_registry_override_builtin(registry):
+    """
+    Adapters of other packages take precedence over built-in adapters.
+    """
+    registry.entry_points["sqlite"] = registry.entry_points["dummy"]
+    assert registry.sink("sqlite:///export.sqlite") is DummySink
+
+
+def test_registry_lazy_loading(registry):
+    """
+    Adapters are imported on first use, and only once.
+    """
+    assert registry.loaded == {}
+    registry.sink("dummy://foo")
+    assert list(registry.loaded) == ["tests.test_registry:DummySink"]
+
+
+def test_registry_cached_scans(registry):
+    """
+    Entry points and SQLAlchemy dialects are scanned once.
+    """
+    registry.clear()
+    registry.sink("sqlite:///export.sqlite")
+    registry.sink("sqlite:///export.sqlite")
+    assert get_sqlalchemy_dialects.cache_info().misses == 1
+    assert registry.entry_points is registry.entry_points
+
+
+def test_copy_entry_point_sink(registry):
+    influxio.core.copy("testdata://dateindex/?rows=15", "dummy://foo")
+    assert len(DummySink.frames) == 1
+    assert len(DummySink.frames[0]) == 15
+
+
+def test_copy_entry_point_source_to_file(registry, tmp_path):
+    target = tmp_path / "dummy.lp"
+    influxio.core.copy("dummysource://foo", f"file://{target}")
+    assert target.read_text() == "dummy value=42.42 1\ndummy value=43.43 2\n"
@@ -0,0 +1,88 @@
+import subprocess
+import sys
+
+import pytest
+
+# Maximum cumulative import time of the CLI module, relative to the import time of `click`,
+# measured within the same interpreter, so the budget does not depend on the speed of the machine.
+# Currently, the factor is about 6.5. Importing SQLAlchemy or pandas on top would add about 12 or 20.
+IMPORT_TIME_FACTOR = 15
+
+HEAVY_MODULES = [
+    "dask",
+    "fsspec",
+    "influx_line",
+    "influxdb_client",
+    "numpy",
+    "pandas",
+    "polars",
+    "psycopg2",
+    "pyarrow",
+    "sqlalchemy",
+    "sqlalchemy_utils",
+]
+
+
+def import_times(module: str):
+    """
+    Import module in a pristine interpreter, and decode the output of `-X importtime`.
+
+    Returns a mapping of all imported module names to their cumulative import time, in microseconds.
+    """
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", ["influxio.cli", "influxio.core"])
+def test_import_no_heavy_dependencies(module):
+    """
+    Importing the CLI and the dispatcher must not load any heavy dependencies.
+    """
+    times = import_times(module)
+    assert module in times
+    loaded = [name for name in HEAVY_MODULES if name in times]
+    assert loaded == []
+
+
+def test_import_no_unix_only_modules():
+    """
+    Importing the CLI must not load standard library modules only available on Unix, to keep it working on Windows.
+    """
+    times = import_times("influxio.cli")
+    assert "resource" not in times
+
+
+def test_import_time_budget():
+    """
+    Importing the CLI must stay within the import time budget, relative to importing `click`.
+    """
+    times = import_times("influxio.cli")
+    assert times["influxio.cli"] < IMPORT_TIME_FACTOR * times["click"]
+
+
+def test_help_no_heavy_dependencies():
+    """
+    Invoking `influxio --help` must not load any heavy dependencies.
+    """
+    code = (
+        "import sys\n"
+        "from influxio.cli import cli\n"
+        "try:\n"
+        "    cli(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print('loaded=' + ','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n"
+    )
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)  # noqa: S603
+    assert process.stdout.splitlines()[-1] == "loaded="
@@ -0,0 +1,198 @@
+import time
+
+import polars as pl
+import pytest
+
+import influxio.core
+from influxio.adapter import InfluxDbApiAdapter, SqlAlchemyAdapter
+from influxio.util.stub import InfluxDbFake, parse_filter, parse_range, parse_rfc3339
+
+LINES = b"""
+weather,station=a,region=north temperature=21.5,humidity=60i 1700000000000000000
+weather,station=b,region=south temperature=25.5 1700000000000000000
+weather,station=a,region=north temperature=22.0,humidity=58i 1700000060000000000
+power,meter=x watts=1200.0 1700000000000000000
+"""
+
+
+@pytest.fixture
+def fake():
+    with InfluxDbFake() as fake:
+        yield fake
+
+
+def adapter(fake: InfluxDbFake, measurement: str = "weather") -> InfluxDbApiAdapter:
+    return InfluxDbApiAdapter.from_url(f"http://example:token@{fake.address}/testdrive/{measurement}")
+
+
+def write_lines(fake: InfluxDbFake, data: bytes = LINES):
+    api = adapter(fake)
+    api.ensure_bucket()
+    api.client.write_api(write_options=_synchronous()).write(bucket="testdrive", record=data)
+
+
+def _synchronous():
+    from influxdb_client.client.write_api import SYNCHRONOUS
+
+    return SYNCHRONOUS
+
+
+def test_fake_write_and_store(fake):
+    write_lines(fake)
+    df = fake.table("testdrive", "weather")
+    assert sorted(df.columns) == ["_time", "humidity", "region", "station", "temperature"]
+    assert df["temperature"].to_list() == [21.5, 25.5, 22.0]
+    assert df["humidity"].to_list() == [60, None, 58]
+    assert sorted(fake.tags["testdrive"]["weather"]) == ["region", "station"]
+    assert fake.write_lines == 5
+
+
+def test_fake_read_df(fake):
+    write_lines(fake)
+    df = pl.concat([pl.from_pandas(df) for df in adapter(fake).read_df()], how="diagonal")
+    assert len(df) == 3
+    assert set(df.columns) == {"time", "measurement", "station", "region", "temperature", "humidity"}
+    assert df.filter(pl.col("station") == "a")["humidity"].to_list() == [60, 58]
+    assert df["measurement"].unique().to_list() == ["weather"]
+
+
+def test_fake_read_df_selection(fake):
+    """
+    Selection of time range, fields, and tags is pushed down into the Flux query.
+    """
+    write_lines(fake)
+    url = f"http://example:token@{fake.address}/testdrive/weather"
+    api = InfluxDbApiAdapter.from_url(
+        f"{url}?start=1700000030000000000&fields=temperature&tags=station&tag.region=north"
+    )
+    df = pl.concat([pl.from_pandas(df) for df in api.read_df()], how="diagonal")
+    assert set(df.columns) == {"time", "measurement", "station", "temperature"}
+    assert df["temperature"].to_list() == [22.0]
+
+
+def test_fake_copy_rollup(fake, tmp_path):
+    """
+    Aggregates are computed by the server, and loaded into one table per window duration.
+    """
+    write_lines(fake)
+    url = f"http://example:token@{fake.address}/testdrive/weather?aggregate=mean,max&every=1m,1h&fields=temperature"
+    target = f"sqlite:///{tmp_path}/export.sqlite?table=weather"
+    influxio.core.copy(url, target)
+    db = SqlAlchemyAdapter.from_url(target)
+    records = db.read_records(table="weather_1m")
+    assert [(record["station"], record["temperature_mean"], record["temperature_max"]) for record in records] == [
+        ("a", 21.5, 21.5),
+        ("a", 22.0, 22.0),
+        ("b", 25.5, 25.5),
+    ]
+    records = db.read_records(table="weather_1h")
+    assert [(record["station"], record["temperature_mean"]) for record in records] == [("a", 21.75), ("b", 25.5)]
+
+
+def test_fake_read_records(fake):
+    write_lines(fake)
+    records = adapter(fake, "power").read_records()
+    assert len(records) == 1
+    assert records[0]["_field"] == "watts"
+    assert records[0]["_value"] == 1200.0
+    assert records[0]["meter"] == "x"
+
+
+def test_fake_query_filter(fake):
+    write_lines(fake)
+    tables = adapter(fake).client.query_api().query("""
+        from(bucket: "testdrive")
+            |> range(start: 2023-11-14T22:14:00Z, stop: 2023-11-14T22:14:30Z)
+            |> filter(fn: (r) => r._measurement == "weather" and r["station"] == "a")
+            |> filter(fn: (r) => r._field == "temperature" or r._field == "humidity")
+        """)
+    values = sorted((record.get_field(), record.get_value()) for table in tables for record in table.records)
+    assert values == [("humidity", 58), ("temperature", 22.0)]
+
+
+def test_fake_precision(fake):
+    write_lines(fake, b"weather,station=c temperature=1.0 1700000000")
+    api = adapter(fake)
+    api.client.write_api(write_options=_synchronous()).write(
+        bucket="testdrive", record="weather,station=d temperature=2.0 1700000000", write_precision="s"
+    )
+    assert fake.table("testdrive", "weather")["_time"].to_list() == [1700000000, 1700000000000000000]
+
+
+def test_fake_delete(fake):
+    write_lines(fake)
+    api = adapter(fake)
+    api.client.delete_api().delete(
+        start="2023-11-14T22:13:00Z", stop="2023-11-14T22:13:30Z", predicate='station="a"', bucket="testdrive"
+    )
+    assert fake.table("testdrive", "weather")["station"].to_list() == ["b", "a"]
+    api.delete_measurement()
+    assert fake.table("testdrive", "weather").is_empty()
+    assert len(fake.table("testdrive", "power")) == 1
+
+
+def test_fake_buckets(fake):
+    api = adapter(fake)
+    with pytest.raises(KeyError):
+        api.get_bucket_id()
+    api.ensure_bucket()
+    api.ensure_bucket()
+    assert list(fake.buckets.values()) == ["testdrive"]
+    api.delete_bucket()
+    assert fake.buckets == {}
+
+
+def test_fake_unknown_bucket(fake):
+    from influxdb_client.rest import ApiException
+
+    with pytest.raises(ApiException) as ex:
+        adapter(fake).client.write_api(write_options=_synchronous()).write(bucket="unknown", record=LINES)
+    assert ex.value.status == 404
+
+
+def test_fake_copy_roundtrip(fake):
+    url = f"http://example:token@{fake.address}/testdrive/demo"
+    influxio.core.copy("testdata://dateindex/?rows=25", url)
+    df = fake.table("testdrive", "demo")
+    assert len(df) == 25
+    assert sorted(df.columns) == ["A", "B", "C", "D", "_time"]
+
+
+def test_fake_latency():
+    with InfluxDbFake(latency=0.05) as fake:
+        started = time.perf_counter()
+        adapter(fake).ensure_bucket()
+        assert time.perf_counter() - started >= 0.1
+
+
+def test_fake_bandwidth():
+    with InfluxDbFake(bandwidth=len(LINES) * 4) as fake:
+        api = adapter(fake)
+        api.ensure_bucket()
+        write_api = api.client.write_api(write_options=_synchronous())
+        started = time.perf_counter()
+        for _ in range(3):
+            write_api.write(bucket="testdrive", record=LINES)
+        assert time.perf_counter() - started >= 0.7
+
+
+def test_fake_throttle():
+    """
+    Rejected write requests are retried by the client, so no data is lost.
+    """
+    with InfluxDbFake(throttle=0.5, retry_after=1) as fake:
+        influxio.core.copy("testdata://dateindex/?rows=10", f"http://example:token@{fake.address}/testdrive/demo")
+        assert fake.throttled_requests == 1
+        assert fake.write_requests == 1
+        assert len(fake.table("testdrive", "demo")) == 10
+
+
+def test_parse_query():
+    assert parse_range('from(bucket: "foo") |> filter(fn: (r) => true)') == (-(2**63), 2**63 - 1)
+    assert parse_range("range(start: 0, stop: 2024-01-01T00:00:00.5Z)") == (0, 1704067200500000000)
+    assert parse_filter('r._measurement == "foo" and r["a b"] == "x" or r["a b"] == "y"') == {
+        "_measurement": ["foo"],
+        "a b": ["x", "y"],
+    }
+    assert parse_rfc3339("1677-09-21T00:12:43.145224194Z") == -(2**63) + 2
+    assert parse_rfc3339("2024-01-01T01:00:00.000000001+01:00") == 1704067200000000001
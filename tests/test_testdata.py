@@ -0,0 +1,184 @@
+import dataclasses
+import gzip
+
+import polars as pl
+import pytest
+from yarl import URL
+
+import influxio.core
+from influxio.io import polars_to_lineprotocol
+from influxio.testdata import (
+    ANOMALY_FIELD,
+    ANOMALY_TAG,
+    SyntheticDataGenerator,
+    write_lineprotocol,
+)
+from influxio.util.common import parse_duration, parse_time
+
+
+def test_synthetic_frames_shape():
+    generator = SyntheticDataGenerator(
+        rows=2_500, series=30, chunk_size=1_000, fields=["float", "int", "bool", "string"]
+    )
+    frames = list(generator.frames())
+    assert [len(df) for df in frames] == [1_000, 1_000, 500]
+    df = pl.concat(frames)
+    assert df.columns == ["measurement", "time", "host", "region", "float0", "int0", "bool0", "string0"]
+    assert df.schema["time"] == pl.Datetime("ns")
+    assert df.schema["float0"] == pl.Float64
+    assert df.schema["int0"] == pl.Int64
+    assert df.schema["bool0"] == pl.Boolean
+    assert df.schema["string0"] == pl.Utf8
+    assert df.select(pl.struct("host", "region").n_unique()).item() == 30
+
+
+def test_synthetic_reproducible():
+    generator = SyntheticDataGenerator(rows=1_000, series=10, distribution="uniform", jitter=0.5, out_of_order=0.1)
+    assert generator.frame(0).equals(dataclasses.replace(generator).frame(0))
+    assert not generator.frame(0).equals(SyntheticDataGenerator(rows=1_000, series=10, seed=43).frame(0))
+
+
+def test_synthetic_epoch():
+    # The epoch is a valid start timestamp, not a missing one.
+    generator = SyntheticDataGenerator(rows=4, series=4, start=0)
+    assert generator.start == 0
+    assert str(generator.frame(0)["time"][0]) == "1970-01-01 00:00:00"
+
+
+def test_synthetic_timestamps():
+    generator = SyntheticDataGenerator(rows=100, series=4, start=parse_time("2024-01-01T00:00:00Z"))
+    time = generator.frame(0)["time"]
+    assert time.is_sorted()
+    assert str(time[0]) == "2024-01-01 00:00:00"
+    # Each series gets one point per interval.
+    assert str(time[4]) == "2024-01-01 00:00:01"
+    expected = generator.generate(0).time
+
+    generator = SyntheticDataGenerator(rows=100, series=4, jitter=0.25)
+    time = generator.generate(0).time
+    assert abs(time - expected).max() <= 250_000_000
+    assert (time != expected).any()
+
+    generator = SyntheticDataGenerator(rows=100, series=4, out_of_order=0.2)
+    assert not generator.frame(0)["time"].is_sorted()
+
+
+def test_synthetic_zipf_distribution():
+    generator = SyntheticDataGenerator(rows=10_000, series=100, distribution="zipf", tags=["sensor"])
+    counts = generator.frame(0)["sensor"].value_counts(sort=True)["count"]
+    assert counts[0] > 10_000 / 100 * 10
+
+
+def test_synthetic_lineprotocol():
+    generator = SyntheticDataGenerator(rows=250, series=7, chunk_size=100, fields=["float", "int", "bool", "string"])
+    expected = "".join(
+        "\n".join(polars_to_lineprotocol(df, tag_columns=generator.tags).to_list()) + "\n" for df in generator.frames()
+    )
+    data = b"".join(generator.lineprotocol())
+    assert data.decode("utf-8") == expected
+    assert data.count(b"\n") == 250
+
+
+def test_synthetic_escaping():
+    generator = SyntheticDataGenerator(rows=1, series=1, measurements=["my measurement"], tags=["a b"], fields=["int"])
+    assert next(generator.lineprotocol()).startswith(b"my\\ measurement,a\\ b=a\\ b-0 int0=")
+
+
+def test_synthetic_from_url():
+    url = URL(
+        "testdata://synthetic/?rows=42&series=7&tags=sensor&fields=float,bool&distribution=uniform"
+        "&measurement=foo&start=2024-06-01T00:00:00Z&interval=100ms&jitter=0.1&out-of-order=0.05&chunk-size=10&seed=1"
+    )
+    generator = SyntheticDataGenerator.from_url(url)
+    assert generator == SyntheticDataGenerator(
+        rows=42,
+        series=7,
+        tags=["sensor"],
+        fields=["float", "bool"],
+        distribution="uniform",
+        measurements=["foo"],
+        start=1717200000000000000,
+        interval=100_000_000,
+        jitter=0.1,
+        out_of_order=0.05,
+        chunk_size=10,
+        seed=1,
+    )
+
+
+def test_synthetic_invalid():
+    with pytest.raises(ValueError) as ex:
+        SyntheticDataGenerator(distribution="foo")
+    assert ex.match("Unknown series distribution: foo")
+    with pytest.raises(ValueError) as ex:
+        SyntheticDataGenerator(fields=["float", "foo"])
+    assert ex.match("Unknown field type: foo")
+    with pytest.raises(ValueError) as ex:
+        parse_duration("1 fortnight")
+    assert ex.match("Invalid duration: 1 fortnight")
+
+
+def test_copy_synthetic_to_lineprotocol(tmp_path):
+    target = tmp_path / "synthetic.lp"
+    influxio.core.copy("testdata://synthetic/?rows=1000&series=10&chunk-size=300", f"file://{target}")
+    lines = target.read_text().splitlines()
+    assert len(lines) == 1000
+    assert lines[0].startswith("synthetic,host=host-0,region=region-0 float0=")
+
+
+@pytest.mark.parametrize("shape", ["air-sensor", "industrial"])
+def test_synthetic_shape_lineprotocol(shape):
+    generator = SyntheticDataGenerator.from_shape(shape, rows=500, chunk_size=200)
+    expected = "".join(
+        "\n".join(polars_to_lineprotocol(df, tag_columns=generator.tag_columns).to_list()) + "\n"
+        for df in generator.frames()
+    )
+    assert b"".join(generator.lineprotocol()).decode("utf-8") == expected
+
+
+def test_synthetic_shape_industrial():
+    generator = SyntheticDataGenerator.from_url(URL("testdata://synthetic/?shape=industrial&rows=2100"))
+    df = pl.concat(generator.frames(), how="diagonal")
+    assert df["measurement"].n_unique() == 3
+    # Sparse series leave out some of their fields.
+    fields = df.drop("measurement", "time")
+    assert 0 < fields.null_count().sum_horizontal().item() < fields.width * len(df)
+
+
+def test_synthetic_align():
+    generator = SyntheticDataGenerator(rows=100, series=4, interval=10_000_000_000, align=True)
+    time = generator.frame(0)["time"].dt.epoch("ns")
+    assert (time % 10_000_000_000 == 0).all()
+    assert time.n_unique() == 25
+
+
+def test_synthetic_anomalies():
+    generator = SyntheticDataGenerator(rows=10_000, series=10, anomalies=0.01)
+    df = generator.frame(0)
+    anomalies = df.filter(pl.col(ANOMALY_TAG) == "true")
+    assert 50 < len(anomalies) < 200
+    assert anomalies[ANOMALY_FIELD].null_count() == 0
+    assert df.filter(pl.col(ANOMALY_TAG).is_null())[ANOMALY_FIELD].null_count() == 10_000 - len(anomalies)
+
+
+@pytest.mark.parametrize("suffix", [".lp", ".lp.gz"])
+def test_write_lineprotocol(tmp_path, suffix):
+    generator = SyntheticDataGenerator.from_shape("air-sensor", rows=1_000, chunk_size=300)
+    expected = b"".join(generator.lineprotocol())
+    single = tmp_path / f"single{suffix}"
+    multiple = tmp_path / f"multiple{suffix}"
+    assert write_lineprotocol(generator, single, processes=1) == len(expected)
+    assert write_lineprotocol(generator, multiple, processes=2) == len(expected)
+    data = multiple.read_bytes()
+    assert single.read_bytes() == data
+    if suffix == ".lp.gz":
+        data = gzip.decompress(data)
+    assert data == expected
+
+
+def test_copy_synthetic_to_lineprotocol_compressed(tmp_path):
+    target = tmp_path / "synthetic.lp.gz"
+    influxio.core.copy("testdata://synthetic/?rows=1000&series=10&chunk-size=300&processes=2", f"file://{target}")
+    lines = gzip.decompress(target.read_bytes()).decode("utf-8").splitlines()
+    assert len(lines) == 1000
+    assert lines[0].startswith("synthetic,host=host-0,region=region-0 float0=")